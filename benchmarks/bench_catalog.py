@@ -0,0 +1,150 @@
+"""
+Бенчмарк поиска по каталогу (services/catalog_service.py, handlers/catalog.py):
+загрузка синтетического каталога из CSV, построение индекса в памяти, время поиска
+для запросов разной длины и inline-запросы через Dispatcher (подписчик / без подписки).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_catalog
+    python -m benchmarks.bench_catalog --skus 10000 50000 --queries 2000
+"""
+import argparse
+import asyncio
+import csv
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import BENCH_DIR, bootstrap, reset_db, populate_active_subscribers, Timer
+
+bootstrap("catalog")
+
+BRANDS = (
+    "Chanel", "Dior", "Tom Ford", "Lattafa", "Armaf", "Rasasi", "Ajmal", "Amouage", "Montale", "Mancera",
+    "Kilian", "Creed", "Givenchy", "Guerlain", "Hermes", "Al Haramain", "Swiss Arabian", "Zimaya",
+)
+WORDS = (
+    "oud", "rose", "amber", "musk", "vanilla", "noir", "intense", "royal", "gold", "black", "white",
+    "wood", "leather", "night", "velvet", "saffron", "jasmine", "oriental", "tobacco", "santal",
+    "уд", "роза", "амбра", "мускус", "ваниль", "ночь", "бархат", "шафран", "жасмин", "табак",
+)
+CATEGORIES = ("Масляные духи", "Дубайские оригиналы", "Отливанты", "Наборы")
+VOLUMES = ("3 мл", "6 мл", "12 мл", "30 мл", "50 мл", "100 мл")
+QUERIES = {
+    "1 char": ("r", "a", "m", "у"),
+    "2 chars": ("ro", "am", "lа", "ша"),
+    "word": ("vanilla", "saffron", "lattafa", "жасмин", "tobacco"),
+    "substring": ("anil", "affr", "mouag", "смин"),
+    "2 words": ("oud rose", "tom ford noir", "ваниль ночь", "amouage gold"),
+    "miss": ("zzzz", "qwerty"),
+}
+SUBSCRIBERS = 1_000
+
+
+def write_catalog(path: Path, skus: int, seed: int = 1):
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["sku", "name", "brand", "category", "volume", "price", "description"])
+        writer.writeheader()
+        for i in range(1, skus + 1):
+            brand = rnd.choice(BRANDS)
+            name = " ".join(w.capitalize() for w in rnd.sample(WORDS, rnd.randint(1, 3)))
+            writer.writerow({
+                "sku": f"SKU{i:06d}",
+                "name": f"{brand} {name}",
+                "brand": brand,
+                "category": rnd.choice(CATEGORIES),
+                "volume": rnd.choice(VOLUMES),
+                "price": rnd.randrange(300, 15000, 50),
+                "description": f"Аромат {name.lower()} от {brand}",
+            })
+
+
+def _pct(values: list[float], q: float) -> float:
+    from benchmarks.harness import percentile
+    return percentile(values, q) * 1000
+
+
+async def main_async(args):
+    import logging
+    from database.base import get_engine, get_session
+    from monitoring import sql as sql_monitoring
+    from services.catalog_service import CatalogIndex, CatalogService
+
+    logging.basicConfig(level=logging.ERROR)
+    engine = get_engine()
+    sql_monitoring.install(engine, slow_query_ms=float("inf"), n_plus_one_threshold=10**9)
+
+    from benchmarks.harness import Harness
+    harness = Harness()
+    rnd = random.Random(args.seed)
+
+    for skus in args.skus:
+        path = BENCH_DIR / f"catalog_{skus}.csv"
+        write_catalog(path, skus)
+        await reset_db()
+        await populate_active_subscribers(SUBSCRIBERS)
+        CatalogService.invalidate_index()
+
+        async for session in get_session():
+            with Timer() as t_import:
+                result = await CatalogService.import_file(session, str(path))
+            with Timer() as t_build:
+                index = await CatalogService.get_index(session)
+            break
+        assert len(index) == result.added
+        # Память самого индекса (позиции уже загружены): повторная сборка под tracemalloc
+        tracemalloc.start()
+        copy = CatalogIndex(index.entries)
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del copy
+        print(
+            f"\n== {skus} SKUs: import {t_import.elapsed:.2f}s ({result.added / t_import.elapsed:.0f} rows/s), "
+            f"load + index build {t_build.elapsed * 1000:.0f} ms, index memory {retained / 2**20:.1f} MiB"
+        )
+
+        print(f"{'query':<12} {'n':>6} {'hits avg':>9} {'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8}")
+        for kind, queries in QUERIES.items():
+            timings, hits = [], 0
+            for _ in range(args.queries):
+                start = time.perf_counter()
+                _, total = index.search(rnd.choice(queries), limit=20)
+                timings.append(time.perf_counter() - start)
+                hits += total
+            print(
+                f"{kind:<12} {len(timings):>6} {hits / len(timings):>9.0f} "
+                f"{_pct(timings, 50):>8.3f} {_pct(timings, 95):>8.3f} {_pct(timings, 99):>8.3f}"
+            )
+
+        # Через Dispatcher: проверка подписки (кэш), поиск и ответ Bot API
+        harness.reset()
+        all_queries = [q for queries in QUERIES.values() for q in queries]
+        for _ in range(args.queries):
+            await harness.inline_query(10_000_000 + rnd.randint(1, SUBSCRIBERS), rnd.choice(all_queries), "subscriber")
+            await harness.inline_query(90_000_000 + rnd.randint(1, SUBSCRIBERS), rnd.choice(all_queries), "no subscription")
+        print(f"{'inline_query':<16} {'n':>6} {'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8} {'SQL avg':>8}")
+        for label in ("subscriber", "no subscription"):
+            results = [r for r in harness.results if r.label == label]
+            timings = [r.seconds for r in results]
+            statements = sum(r.statements for r in results) / len(results)
+            print(
+                f"{label:<16} {len(results):>6} {_pct(timings, 50):>8.2f} {_pct(timings, 95):>8.2f} "
+                f"{_pct(timings, 99):>8.2f} {statements:>8.2f}"
+            )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skus", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--queries", type=int, default=1_000, help="запросов каждого вида")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Нагрузочный бенчмарк обработчиков: сценарии пользователей прогоняются через настоящий Dispatcher
+(все роутеры из handlers/) с фиктивной сессией Bot API и файловой SQLite.
+
+Сценарии:
+    viral_start    — новые пользователи приходят по реферальной ссылке: /start <код>
+    menu           — существующий подписчик листает меню
+    questionnaire  — /start, выбор тарифа, анкета (ФИО, телефон) и тестовая оплата
+
+Новые сценарии запускаются с заданной частотой (--rate, сценариев в секунду; 0 — без ограничения),
+шаги внутри сценария идут последовательно, как у живого пользователя.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_dispatcher
+    python -m benchmarks.bench_dispatcher --scenarios menu --users 500 --rate 50 --api-latency 0.05
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import bootstrap, reset_db, populate_active_subscribers
+
+bootstrap("dispatcher")
+
+from benchmarks.harness import Harness, patch_external_services, percentile  # noqa: E402
+
+NEW_USER_ID_BASE = 50_000_000
+MENU_STEPS = ("my_subscription", "referral_program", "back_to_menu", "get_catalog", "back_to_menu", "renew_subscription")
+
+
+async def viral_start(harness: Harness, user_id: int, ctx: dict):
+    code = f"R{random.randint(1, ctx['subscribers']):07d}"
+    await harness.send_message(user_id, f"/start {code}", label="/start REFCODE")
+
+
+async def menu(harness: Harness, user_id: int, ctx: dict):
+    subscriber_id = 10_000_000 + random.randint(1, ctx["subscribers"])
+    await harness.send_message(subscriber_id, "/start")
+    for data in MENU_STEPS:
+        await harness.click(subscriber_id, data)
+
+
+async def questionnaire(harness: Harness, user_id: int, ctx: dict):
+    await harness.send_message(user_id, "/start")
+    await harness.click(user_id, f"select_tariff_{random.choice(ctx['tariff_ids'])}", label="select_tariff")
+    await harness.send_message(user_id, "Иванов", label="surname")
+    await harness.send_message(user_id, "Иван", label="name")
+    await harness.send_message(user_id, "Иванович", label="patronymic")
+    await harness.send_message(user_id, f"+79{user_id % 10**9:09d}", label="phone")
+    payment_data = harness.last_callback_data(user_id, "test_payment_")
+    if payment_data:
+        await harness.click(user_id, payment_data, label="test_payment")
+
+
+SCENARIOS = {
+    "viral_start": viral_start,
+    "menu": menu,
+    "questionnaire": questionnaire,
+}
+
+
+async def _prepare(subscribers: int) -> dict:
+    from sqlalchemy import select
+    from database.base import get_session
+    from database.models import Tariff
+
+    await reset_db()
+    await populate_active_subscribers(subscribers)
+    async for session in get_session():
+        tariff_ids = list((await session.execute(select(Tariff.id))).scalars())
+        break
+    return {"subscribers": subscribers, "tariff_ids": tariff_ids}
+
+
+async def run_scenario(harness: Harness, name: str, users: int, rate: float, ctx: dict, first_user_id: int):
+    harness.reset()
+    scenario = SCENARIOS[name]
+    interval = 1 / rate if rate else 0
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(users):
+        if interval:
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(scenario(harness, first_user_id + i, ctx)))
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    errors = [o for o in outcomes if isinstance(o, Exception)]
+    return elapsed, errors
+
+
+def _report(name: str, harness: Harness, elapsed: float, errors: list):
+    results = harness.results
+    print(f"\n== {name}: {len(results)} updates in {elapsed:.2f}s, {len(results) / elapsed:.1f} updates/s"
+          + (f", {len(errors)} failed scenarios ({errors[0]!r})" if errors else ""))
+    print(f"{'step':<22} {'n':>6} {'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8} {'SQL avg':>8} {'SQL max':>8}")
+
+    by_label = defaultdict(list)
+    for r in results:
+        by_label[r.label].append(r)
+    for label, items in list(by_label.items()) + [("ALL", results)]:
+        latencies = [r.seconds * 1000 for r in items]
+        statements = [r.statements for r in items]
+        print(
+            f"{label:<22} {len(items):>6} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} "
+            f"{percentile(latencies, 99):>8.1f} {sum(statements) / len(statements):>8.1f} {max(statements):>8}"
+        )
+    api_calls = ", ".join(f"{method}={count}" for method, count in harness.session.requests.most_common())
+    print(f"Bot API calls: {api_calls}")
+
+
+async def main_async(args):
+    import logging
+    from database.base import get_engine
+    from monitoring import sql as sql_monitoring
+
+    logging.basicConfig(level=logging.ERROR)
+    engine = get_engine()
+    sql_monitoring.install(engine)
+    patch_external_services()
+    random.seed(args.seed)
+
+    ctx = await _prepare(args.subscribers)
+    harness = Harness(api_latency=args.api_latency)
+    first_user_id = NEW_USER_ID_BASE
+    for name in args.scenarios:
+        elapsed, errors = await run_scenario(harness, name, args.users, args.rate, ctx, first_user_id)
+        first_user_id += args.users
+        _report(name, harness, elapsed, errors)
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=200, help="сценариев на каждый тип")
+    parser.add_argument("--rate", type=float, default=0, help="новых сценариев в секунду (0 — без ограничения)")
+    parser.add_argument("--subscribers", type=int, default=10_000, help="подписчиков в БД перед прогоном")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка ответа Bot API, с")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
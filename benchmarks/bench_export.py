@@ -0,0 +1,91 @@
+"""
+Бенчмарк выгрузки подписчиков: время и пиковый RSS в зависимости от размера базы.
+Каждый замер выполняется в отдельном процессе, чтобы пиковый RSS не накапливался.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_export                 # 1k, 10k, 100k
+    python -m benchmarks.bench_export --sizes 1000 50000 --formats txt csv
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import bootstrap, reset_db, populate_active_subscribers, peak_rss_mb, Timer
+
+
+def _db_name(size: int) -> str:
+    return f"export_{size}"
+
+
+async def _populate(size: int):
+    await reset_db()
+    await populate_active_subscribers(size)
+
+
+async def _run(fmt: str) -> dict:
+    from database.base import get_session
+    from services.export_service import ExportService
+
+    rss_before = peak_rss_mb()
+    async for session in get_session():
+        with Timer() as t:
+            file, count = await ExportService.export_active_subscribers(session=session, fmt=fmt)
+            file.seek(0, 2)
+            size_bytes = file.tell()
+            file.close()
+        break
+    return {
+        "rows": count,
+        "seconds": round(t.elapsed, 3),
+        "file_mb": round(size_bytes / 1024 / 1024, 2),
+        "rss_before_mb": round(rss_before, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def _child(args: list[str]) -> str:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_export", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    return out.stdout.strip().splitlines()[-1] if out.stdout.strip() else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--formats", nargs="+", default=["txt", "csv", "jsonl"])
+    parser.add_argument("--populate", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--run", nargs=2, metavar=("SIZE", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.populate:
+        bootstrap(_db_name(args.populate))
+        asyncio.run(_populate(args.populate))
+        return
+    if args.run:
+        bootstrap(_db_name(int(args.run[0])))
+        print(json.dumps(asyncio.run(_run(args.run[1]))))
+        return
+
+    print(f"{'rows':>8} {'fmt':>6} {'time, s':>9} {'file, MB':>9} {'RSS before':>11} {'peak RSS':>9}")
+    for size in args.sizes:
+        _child(["--populate", str(size)])
+        for fmt in args.formats:
+            r = json.loads(_child(["--run", str(size), fmt]))
+            print(
+                f"{r['rows']:>8} {fmt:>6} {r['seconds']:>9} {r['file_mb']:>9} "
+                f"{r['rss_before_mb']:>11} {r['peak_rss_mb']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
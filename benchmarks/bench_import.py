@@ -0,0 +1,158 @@
+"""
+Бенчмарк массового импорта подписчиков (services/bulk_import.py): строк в секунду и SQL-запросов
+для CSV и JSONL разного размера. В файле ~2% заведомо ошибочных строк; часть telegram_id
+уже есть в базе. Для сравнения — построчная загрузка в духе прежнего run_seed
+(get_or_create_user, поиск тарифа и активной подписки на каждую строку) на небольшом объёме.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --sizes 1000 100000 --formats csv --baseline-rows 500
+"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import BENCH_DIR, bootstrap, reset_db, populate_active_subscribers, Timer
+
+bootstrap("import")
+
+TARIFFS = ("Месячный", "Полгода", "Годовой", "monthly", "yearly")
+EXISTING_USERS = 1_000
+
+
+def write_file(path: Path, fmt: str, rows: int, seed: int = 1):
+    """Сгенерировать файл импорта; telegram_id 10_000_001..  совпадают с уже существующими пользователями"""
+    rnd = random.Random(seed)
+    fields = ["telegram_id", "fio", "phone", "tariff", "start_date", "end_date"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        for i in range(1, rows + 1):
+            day = 1 + i % 28
+            record = {
+                "telegram_id": 10_000_000 + i,
+                "fio": f"Фамилия{i} Имя{i} Отчество{i}",
+                "phone": f"+79{i:09d}",
+                "tariff": rnd.choice(TARIFFS),
+                "start_date": f"{day:02d}.02.2026",
+                "end_date": f"{day:02d}.03.2026",
+            }
+            if rnd.random() < 0.02:
+                record[rnd.choice(["telegram_id", "tariff", "end_date"])] = "???"
+            if writer:
+                writer.writerow(record)
+            else:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+async def _import(path: Path, fmt: str, dry_run: bool = False):
+    from database.base import get_session
+    from monitoring import sql as sql_monitoring
+    from services.bulk_import import BulkImportService
+
+    async for session in get_session():
+        with sql_monitoring.track_queries("bench:import") as stats, Timer() as t:
+            result = await BulkImportService.import_file(session, str(path), fmt=fmt, dry_run=dry_run)
+        break
+    return result, t.elapsed, stats.count
+
+
+async def _row_by_row(path: Path, fmt: str, limit: int):
+    """Прежний подход: несколько запросов и коммитов на каждую строку"""
+    from sqlalchemy import select
+    from database.base import get_session
+    from database.models import Subscription, SubscriptionStatus
+    from monitoring import sql as sql_monitoring
+    from services.bulk_import import iter_records, parse_date
+    from services.tariff_service import TariffService
+    from services.user_service import UserService
+
+    added = 0
+    async for session in get_session():
+        with sql_monitoring.track_queries("bench:row_by_row") as stats, Timer() as t:
+            with open(path, encoding="utf-8", newline="") as stream:
+                for n, (_, record) in enumerate(iter_records(stream, fmt)):
+                    if n >= limit:
+                        break
+                    try:
+                        user, _ = await UserService.get_or_create_user(
+                            session=session, telegram_id=int(record["telegram_id"]), first_name=record["fio"],
+                        )
+                        tariff = await TariffService.get_tariff_by_name(session=session, name=record["tariff"])
+                        if not tariff:
+                            continue
+                        r = await session.execute(select(Subscription).where(
+                            Subscription.user_id == user.id,
+                            Subscription.status == SubscriptionStatus.ACTIVE,
+                        ))
+                        if r.scalars().first():
+                            continue
+                        session.add(Subscription(
+                            user_id=user.id,
+                            tariff_id=tariff.id,
+                            status=SubscriptionStatus.ACTIVE,
+                            start_date=parse_date(record["start_date"]),
+                            end_date=parse_date(record["end_date"]),
+                        ))
+                        added += 1
+                    except (ValueError, KeyError):
+                        continue
+            await session.commit()
+        break
+    return min(limit, n + 1), added, t.elapsed, stats.count
+
+
+async def main_async(args):
+    import logging
+    from database.base import get_engine
+    from monitoring import sql as sql_monitoring
+
+    logging.basicConfig(level=logging.ERROR)
+    engine = get_engine()
+    sql_monitoring.install(engine, slow_query_ms=float("inf"), n_plus_one_threshold=10**9)
+
+    print(f"{'rows':>8} {'fmt':>6} {'mode':>12} {'time, s':>8} {'rows/s':>9} {'SQL':>6} {'added':>7} {'skipped':>8} {'errors':>7}")
+    for size in args.sizes:
+        for fmt in args.formats:
+            path = BENCH_DIR / f"import_{size}.{fmt}"
+            write_file(path, fmt, size)
+            await reset_db()
+            await populate_active_subscribers(min(EXISTING_USERS, size // 10))
+
+            for mode, dry_run in (("dry-run", True), ("import", False), ("re-import", False)):
+                result, elapsed, statements = await _import(path, fmt, dry_run=dry_run)
+                print(
+                    f"{size:>8} {fmt:>6} {mode:>12} {elapsed:>8.2f} {result.processed / elapsed:>9.0f} "
+                    f"{statements:>6} {result.added:>7} {result.skipped:>8} {len(result.errors):>7}"
+                )
+
+    if args.baseline_rows:
+        fmt = args.formats[0]
+        path = BENCH_DIR / f"import_baseline.{fmt}"
+        write_file(path, fmt, args.baseline_rows)
+        await reset_db()
+        rows, added, elapsed, statements = await _row_by_row(path, fmt, args.baseline_rows)
+        print(
+            f"{rows:>8} {fmt:>6} {'row-by-row':>12} {elapsed:>8.2f} {rows / elapsed:>9.0f} "
+            f"{statements:>6} {added:>7} {'-':>8} {'-':>7}"
+        )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--formats", nargs="+", choices=["csv", "jsonl"], default=["csv", "jsonl"])
+    parser.add_argument("--baseline-rows", type=int, default=2_000, help="0 — без построчного сравнения")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
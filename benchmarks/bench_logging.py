@@ -0,0 +1,134 @@
+"""
+Бенчмарк логирования: задержка обработчиков при разных настройках логов.
+Подписчики параллельно проходят /start и меню через Dispatcher (benchmarks/harness.py), логи пишутся
+в файл с искусственной задержкой записи — так ведёт себя stdout, когда его медленно читает
+сборщик логов контейнера.
+
+Режимы:
+    off   — уровень WARNING: обработчики почти ничего не пишут
+    sync  — как раньше: StreamHandler пишет текст прямо из event loop'а
+    queue — monitoring/logs.py: очередь + поток записи, JSON, прореживание по LOG_RATE_LIMITS
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_logging
+    python -m benchmarks.bench_logging --users 200 --concurrency 50 --sink-latency-ms 2
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import BENCH_DIR, bootstrap, reset_db, populate_active_subscribers
+
+bootstrap("logging")
+
+MODES = ("off", "sync", "queue")
+MENU_STEPS = ("my_subscription", "referral_program", "back_to_menu", "get_catalog", "back_to_menu")
+SUBSCRIBERS = 1_000
+
+
+class SlowSink:
+    """Файл, каждая запись в который занимает latency секунд"""
+
+    def __init__(self, path: Path, latency: float):
+        self.file = open(path, "w", encoding="utf-8")
+        self.latency = latency
+        self.lines = 0
+
+    def write(self, text: str):
+        if self.latency:
+            time.sleep(self.latency)
+        self.lines += 1
+        self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def configure(mode: str, sink: SlowSink):
+    """Настроить логирование под режим; для queue возвращает QueueListener"""
+    from config import settings
+    from monitoring.logs import TEXT_FORMAT, setup_logging
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    if mode == "queue":
+        return setup_logging(level="INFO", fmt="json", rate_limits=settings.LOG_RATE_LIMITS, stream=sink)
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.WARNING if mode == "off" else logging.INFO)
+    return None
+
+
+async def run_users(harness, users: int, concurrency: int, rnd: random.Random):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def user():
+        async with semaphore:
+            user_id = 10_000_000 + rnd.randint(1, SUBSCRIBERS)
+            await harness.send_message(user_id, "/start")
+            for data in MENU_STEPS:
+                await harness.click(user_id, data)
+
+    await asyncio.gather(*(user() for _ in range(users)))
+
+
+async def main_async(args):
+    from benchmarks.harness import Harness, percentile
+    from database.base import get_engine
+    from monitoring import sql as sql_monitoring
+
+    logging.getLogger().setLevel(logging.ERROR)
+    sql_monitoring.install(get_engine(), slow_query_ms=float("inf"), n_plus_one_threshold=10**9)
+    await reset_db()
+    await populate_active_subscribers(SUBSCRIBERS)
+    harness = Harness()
+    rnd = random.Random(args.seed)
+
+    # Прогрев: кэши тарифов, компиляция запросов
+    await run_users(harness, 20, args.concurrency, rnd)
+
+    print(f"sink latency {args.sink_latency_ms} ms per line, {args.users} users x {1 + len(MENU_STEPS)} updates, "
+          f"concurrency {args.concurrency}")
+    print(f"{'mode':<6} {'updates/s':>10} {'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8} {'lines':>7}")
+    for mode in args.modes:
+        sink = SlowSink(BENCH_DIR / f"logging_{mode}.log", args.sink_latency_ms / 1000)
+        listener = configure(mode, sink)
+        harness.reset()
+        start = time.perf_counter()
+        await run_users(harness, args.users, args.concurrency, rnd)
+        elapsed = time.perf_counter() - start
+        if listener:
+            listener.stop()  # дописать очередь, чтобы посчитать строки
+        configure("off", sink)
+        timings = [r.seconds * 1000 for r in harness.results]
+        print(
+            f"{mode:<6} {len(timings) / elapsed:>10.0f} {percentile(timings, 50):>8.2f} "
+            f"{percentile(timings, 95):>8.2f} {percentile(timings, 99):>8.2f} {sink.lines:>7}"
+        )
+        sink.close()
+    await get_engine().dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--sink-latency-ms", type=float, default=1.0, help="задержка записи одной строки лога")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
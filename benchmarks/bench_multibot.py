@@ -0,0 +1,114 @@
+"""
+Бенчмарк нескольких ботов в одном процессе (BOTS_FILE): сколько памяти добавляет каждый бот
+и не растёт ли задержка обработки апдейтов, когда диспетчер обслуживает всех сразу.
+Каждый бот — свой профиль настроек и свой файл SQLite; Bot API подменён фиктивной сессией.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_multibot
+    python -m benchmarks.bench_multibot --bots 10 --users 200
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import BENCH_DIR, bootstrap, reset_db, populate_active_subscribers
+
+bootstrap("multibot")
+
+SUBSCRIBERS = 1_000
+
+
+def current_rss_mb() -> float:
+    """Текущий RSS процесса, МБ (Linux)"""
+    import os
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+async def main_async(args):
+    import gc
+    import logging
+    from aiogram import Bot
+    from aiogram.types import Update
+    from benchmarks.harness import MockedSession, percentile
+    from config import Settings, use_bot
+    from database.base import get_engine
+    from monitoring import sql as sql_monitoring
+
+    logging.basicConfig(level=logging.ERROR)
+    from main import create_dispatcher
+
+    session = MockedSession()
+    update_ids = itertools.count(1)
+    rnd = random.Random(args.seed)
+
+    def message_update(bot: Bot, user_id: int, text: str) -> Update:
+        return Update.model_validate({
+            "update_id": next(update_ids),
+            "message": {
+                "message_id": next(update_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+                "text": text,
+            },
+        }, context={"bot": bot})
+
+    gc.collect()
+    baseline = current_rss_mb()
+    profiles, bots = [], []
+    print(f"{'bots':>5} {'RSS, MB':>8} {'+per bot':>9}")
+    for i in range(1, args.bots + 1):
+        profile = Settings(
+            BOT_NAME=f"brand{i}",
+            BOT_TOKEN=f"{200_000 + i}:bench",
+            BOT_USERNAME=f"brand{i}_bot",
+            DATABASE_URL=f"sqlite+aiosqlite:///{BENCH_DIR / f'multibot_{i}.db'}",
+        )
+        with use_bot(profile):
+            sql_monitoring.install(get_engine())
+            await reset_db()
+            await populate_active_subscribers(SUBSCRIBERS)
+        profiles.append(profile)
+        bots.append(Bot(token=profile.BOT_TOKEN, session=session))
+        gc.collect()
+        rss = current_rss_mb()
+        print(f"{i:>5} {rss:>8.1f} {(rss - baseline) / i:>9.1f}")
+
+    # Обработчик /start у подписчиков: пользователь, подписка и тарифы из БД «своего» бота
+    dp = create_dispatcher({bot.id: profile for profile, bot in zip(profiles, bots)})
+    timings = {profile.BOT_NAME: [] for profile in profiles}
+    for _ in range(args.users):
+        for profile, bot in zip(profiles, bots):
+            update = message_update(bot, 10_000_000 + rnd.randint(1, SUBSCRIBERS), "/start")
+            start = time.perf_counter()
+            await dp.feed_update(bot, update)
+            timings[profile.BOT_NAME].append(time.perf_counter() - start)
+
+    everything = [t for values in timings.values() for t in values]
+    print(f"\n/start, {args.users} per bot: p50 {percentile(everything, 50) * 1000:.2f} ms, "
+          f"p95 {percentile(everything, 95) * 1000:.2f} ms, RSS {current_rss_mb():.1f} MB")
+    slowest = max(timings, key=lambda name: percentile(timings[name], 95))
+    print(f"slowest bot by p95: {slowest} ({percentile(timings[slowest], 95) * 1000:.2f} ms)")
+
+    from database.base import dispose_engines
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--users", type=int, default=100, help="апдейтов /start на каждого бота")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Бенчмарк read-моделей (services/read_models.py): память на строку и время массовых выборок
+активных подписок — ORM-объекты, строки Row из Core-запроса и компактные NamedTuple.
+
+Память — прирост tracemalloc, пока результат жив (на строку), и пик во время выборки.
+Каждый вариант выполняется в новой сессии, чтобы identity map предыдущего не мешал замеру.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_read_models
+    python -m benchmarks.bench_read_models --subscribers 100000
+"""
+import argparse
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import bootstrap, reset_db, populate_active_subscribers
+
+bootstrap("read_models")
+
+
+def _active_where():
+    from datetime import datetime
+    from sqlalchemy import and_
+    from database.models import Subscription, SubscriptionStatus
+
+    return and_(
+        Subscription.status == SubscriptionStatus.ACTIVE,
+        Subscription.end_date > datetime.utcnow(),
+    )
+
+
+async def orm_subscriptions(session) -> list:
+    """Как было: полные ORM-объекты Subscription"""
+    from sqlalchemy import select
+    from database.models import Subscription
+
+    stmt = select(Subscription).where(_active_where()).order_by(Subscription.end_date.asc())
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def core_rows(session) -> list:
+    """Core-запрос тех же колонок, строки Row"""
+    from sqlalchemy import select
+    from database.models import Subscription
+
+    stmt = select(
+        Subscription.id,
+        Subscription.user_id,
+        Subscription.tariff_id,
+        Subscription.start_date,
+        Subscription.end_date,
+    ).where(_active_where()).order_by(Subscription.end_date.asc())
+    result = await session.execute(stmt)
+    return list(result.all())
+
+
+async def read_model_rows(session) -> list:
+    from services.subscription_service import SubscriptionService
+
+    return await SubscriptionService.get_all_active_subscriptions(session=session)
+
+
+async def state_rows_before(session) -> list:
+    """Как было: состояние для отчёта с end_date как datetime"""
+    from sqlalchemy import select
+    from database.models import Subscription
+    from services.subscription_service import SubscriptionService
+
+    stmt = select(Subscription.user_id, Subscription.end_date, Subscription.tariff_id).where(
+        _active_where(), ~SubscriptionService._has_newer_active_subscription(),
+    )
+    result = await session.execute(stmt)
+    return list(result.all())
+
+
+async def state_rows_after(session) -> list:
+    from services.subscription_service import SubscriptionService
+
+    return await SubscriptionService.get_active_subscribers_state(session=session)
+
+
+async def measure(fetch) -> tuple[int, float, float, float]:
+    """Returns: (строк, секунд, байт на строку в результате, пик байт на строку)"""
+    from database.base import get_session
+
+    async for session in get_session():
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        rows = await fetch(session)
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        count = len(rows)
+        del rows
+        break
+    per_row = (current - before) / max(count, 1)
+    peak_per_row = (peak - before) / max(count, 1)
+    return count, elapsed, per_row, peak_per_row
+
+
+async def main_async(args):
+    import logging
+    from database.base import get_engine
+
+    logging.basicConfig(level=logging.ERROR)
+    await reset_db()
+    await populate_active_subscribers(args.subscribers)
+
+    cases = [
+        ("active subscriptions", "ORM objects", orm_subscriptions),
+        ("active subscriptions", "Core Row", core_rows),
+        ("active subscriptions", "read model", read_model_rows),
+        ("report state", "Row+datetime", state_rows_before),
+        ("report state", "read model", state_rows_after),
+    ]
+    # Прогрев: компиляция запросов и импорт модулей не входят в замер
+    for _, _, fetch in cases:
+        await measure(fetch)
+
+    print(f"{args.subscribers} subscribers (tracemalloc on, times are inflated)")
+    print(f"{'query':<22} {'rows as':<14} {'rows':>7} {'time, s':>8} {'B/row':>7} {'peak B/row':>11}")
+    for name, variant, fetch in cases:
+        count, elapsed, per_row, peak_per_row = await measure(fetch)
+        print(f"{name:<22} {variant:<14} {count:>7} {elapsed:>8.2f} {per_row:>7.0f} {peak_per_row:>11.0f}")
+    await get_engine().dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=50_000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
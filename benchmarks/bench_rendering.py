@@ -0,0 +1,111 @@
+"""
+Бенчмарк рендеринга больших отчётов (services/rendering.py): задержка event loop'а,
+пока формируется ежедневный отчёт и выгрузка на N подписчиков — в основном процессе
+(RENDER_WORKERS=0) и в пуле процессов.
+
+Отчёт строится после пустого снимка: все подписчики попадают в «Новые» — худший случай.
+Задержку измеряет задача, которая просыпается каждые 10 мс (как обработчики апдейтов ждут своей очереди).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_rendering
+    python -m benchmarks.bench_rendering --subscribers 100000 --workers 2
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import bootstrap, reset_db, populate_active_subscribers
+
+bootstrap("rendering")
+
+PROBE_INTERVAL = 0.01
+
+
+class LagProbe:
+    """Задача, которая просыпается каждые PROBE_INTERVAL и запоминает, насколько опоздала"""
+
+    def __init__(self):
+        self.lags: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            self.lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+
+
+async def build_report(session) -> int:
+    from services.report_service import ReportService
+
+    await ReportService.save_snapshot(session, {})
+    parts, _ = await ReportService.build_daily_report(session=session)
+    return sum(len(part) for part in parts)
+
+
+async def build_export(session) -> int:
+    from services.export_service import ExportService
+
+    file, _ = await ExportService.export_active_subscribers(session=session, fmt="txt")
+    size = len(file.read())
+    file.close()
+    return size
+
+
+async def main_async(args):
+    import logging
+    from benchmarks.harness import percentile
+    from config import settings
+    from database.base import get_engine, get_session
+    from services import rendering
+
+    logging.basicConfig(level=logging.ERROR)
+    await reset_db()
+    await populate_active_subscribers(args.subscribers)
+
+    print(f"{args.subscribers} subscribers, lag probe every {PROBE_INTERVAL * 1000:.0f} ms")
+    print(f"{'task':<8} {'mode':<10} {'time, s':>8} {'chars':>10} {'lag p50':>8} {'lag p99':>8} {'lag max':>8}")
+    for workers in (0, args.workers):
+        rendering.shutdown_pool()
+        settings.RENDER_WORKERS = workers
+        mode = "in loop" if workers == 0 else f"pool x{workers}"
+        if workers:
+            # Запуск процессов пула — один раз при первом большом отчёте, в замер не входит
+            await rendering.render(len, [0], rows=range(rendering.INLINE_MAX_ROWS + 1))
+        for name, task in (("report", build_report), ("export", build_export)):
+            async for session in get_session():
+                async with LagProbe() as probe:
+                    start = time.perf_counter()
+                    size = await task(session)
+                    elapsed = time.perf_counter() - start
+                break
+            lags = [lag * 1000 for lag in probe.lags] or [0.0]
+            print(
+                f"{name:<8} {mode:<10} {elapsed:>8.2f} {size:>10} {percentile(lags, 50):>8.1f} "
+                f"{percentile(lags, 99):>8.1f} {max(lags):>8.1f}"
+            )
+    rendering.shutdown_pool()
+    await get_engine().dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=1, help="процессов в пуле рендеринга")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Микробенчмарки публичных методов UserService, SubscriptionService, ReferralService,
+PaymentService и TariffService на базах разного размера (benchmarks/dataset.py).
+
+Для каждого метода: медиана и p95 времени вызова и число SQL-запросов за вызов.
+Каждый вызов — в новой сессии, чтобы identity map не скрывала запросы.
+Изменяющие методы работают с копией сгенерированной базы; сама база переиспользуется между запусками.
+check_payment_status меряется на платежах без ID YooKassa — только часть, работающая с БД.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_services                        # 10k и 100k пользователей
+    python -m benchmarks.bench_services --sizes 10000 100000 1000000 --only SubscriptionService
+    python -m benchmarks.bench_services --regenerate           # пересоздать базы
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import BENCH_DIR, bootstrap
+
+ROOT = Path(__file__).resolve().parent.parent
+TELEGRAM_ID_BASE = 10_000_000
+NEW_TELEGRAM_ID_BASE = 90_000_000
+
+
+def _dataset_name(size: int) -> str:
+    return f"services_{size}"
+
+
+# --- Сценарии вызовов: (сервис, метод, вариант, повторов, функция) ---
+
+async def _prepare_context(size: int) -> dict:
+    """Выбрать из базы идентификаторы, на которых будут вызываться методы"""
+    from sqlalchemy import exists, select, func
+    from database.base import get_session
+    from database.models import (
+        Subscription, SubscriptionStatus, Payment,
+        Referral, ReferralBonus, ReferralBonusStatus, Tariff, User,
+    )
+
+    async for session in get_session():
+        async def ids(stmt, limit=200):
+            return list((await session.execute(stmt.limit(limit))).scalars())
+
+        ctx = {
+            "size": size,
+            "tariffs": list((await session.execute(select(Tariff))).scalars()),
+            "pending_subscriptions": await ids(
+                select(Subscription.id).where(Subscription.status == SubscriptionStatus.PENDING)
+            ),
+            "active_subscriptions": await ids(
+                select(Subscription.id).where(Subscription.status == SubscriptionStatus.ACTIVE)
+            ),
+            "payments": await ids(select(Payment.id).where(Payment.yookassa_payment_id.is_not(None))),
+            "offline_payments": await ids(select(Payment.id).where(Payment.yookassa_payment_id.is_(None))),
+            "unpaid_referred": await ids(select(Referral.referred_id).where(Referral.has_paid_subscription == False)),
+            # Пользователи без реферера: приглашённый может быть только у одного реферера
+            "unreferred_users": await ids(
+                select(User.id).where(~exists().where(Referral.referred_id == User.id)).order_by(User.id.desc())
+            ),
+            "pending_bonuses": await ids(
+                select(ReferralBonus.id).where(ReferralBonus.status == ReferralBonusStatus.PENDING)
+            ),
+            "top_referrer": (await session.execute(
+                select(Referral.referrer_id).group_by(Referral.referrer_id)
+                .order_by(func.count().desc()).limit(1)
+            )).scalar(),
+            "new_users": [],
+            "new_subscriptions": [],
+        }
+        break
+    return ctx
+
+
+def _random_user(ctx: dict, rnd: random.Random) -> int:
+    return rnd.randint(1, ctx["size"])
+
+
+class _Exhausted(Exception):
+    """Для изменяющего метода закончились подходящие записи"""
+
+
+def _take(ctx: dict, key: str):
+    if not ctx[key]:
+        raise _Exhausted(key)
+    return ctx[key].pop()
+
+
+def _cases() -> list:
+    from services.user_service import UserService
+    from services.subscription_service import SubscriptionService
+    from services.referral_service import ReferralService
+    from services.payment_service import PaymentService
+    from services.tariff_service import TariffService
+    from database.models import PaymentStatus
+
+    async def get_or_create_existing(session, ctx, rnd):
+        await UserService.get_or_create_user(session, TELEGRAM_ID_BASE + _random_user(ctx, rnd), username="bench")
+
+    async def get_or_create_new(session, ctx, rnd):
+        telegram_id = NEW_TELEGRAM_ID_BASE + len(ctx["new_users"])
+        user, _ = await UserService.get_or_create_user(
+            session, telegram_id, username="bench", referrer_code=f"R{_random_user(ctx, rnd):07d}",
+        )
+        ctx["new_users"].append(user.id)
+
+    async def get_user_by_telegram_id(session, ctx, rnd):
+        await UserService.get_user_by_telegram_id(session, TELEGRAM_ID_BASE + _random_user(ctx, rnd))
+
+    async def update_user_profile(session, ctx, rnd):
+        await UserService.update_user_profile(
+            session, _random_user(ctx, rnd), surname="Петров", name="Пётр", patronymic="Петрович", phone="+79990000000",
+        )
+
+    async def create_subscription(session, ctx, rnd):
+        subscription = await SubscriptionService.create_subscription(
+            session, _random_user(ctx, rnd), rnd.choice(ctx["tariffs"]).id,
+        )
+        ctx["new_subscriptions"].append(subscription.id)
+
+    async def activate_subscription(session, ctx, rnd):
+        await SubscriptionService.activate_subscription(session, _take(ctx, "pending_subscriptions"))
+
+    async def get_active_subscription(session, ctx, rnd):
+        await SubscriptionService.get_active_subscription(session, _random_user(ctx, rnd))
+
+    async def get_user_subscriptions(session, ctx, rnd):
+        await SubscriptionService.get_user_subscriptions(session, _random_user(ctx, rnd))
+
+    async def get_history_page(session, ctx, rnd):
+        SubscriptionService._history_pages.clear()  # замеряем запрос, а не кэш
+        await SubscriptionService.get_history_page(session, TELEGRAM_ID_BASE + _random_user(ctx, rnd), limit=5)
+
+    async def expire_subscriptions(session, ctx, rnd):
+        await SubscriptionService.expire_subscriptions(session)
+
+    async def get_subscriptions_for_reminder(session, ctx, rnd):
+        await SubscriptionService.get_subscriptions_for_reminder(session)
+
+    async def mark_reminder_sent(session, ctx, rnd):
+        await SubscriptionService.mark_reminder_sent(session, rnd.choice(ctx["active_subscriptions"]))
+
+    async def get_all_active_subscriptions(session, ctx, rnd):
+        await SubscriptionService.get_all_active_subscriptions(session)
+
+    async def get_active_subscribers_state(session, ctx, rnd):
+        await SubscriptionService.get_active_subscribers_state(session)
+
+    async def count_active_subscribers(session, ctx, rnd):
+        await SubscriptionService.count_active_subscribers(session)
+
+    async def get_active_subscribers_page(session, ctx, rnd):
+        await SubscriptionService.get_active_subscribers_page(session, limit=10)
+
+    async def create_referral(session, ctx, rnd):
+        referred_id = _take(ctx, "unreferred_users")
+        await ReferralService.create_referral(session, _random_user(ctx, rnd), referred_id)
+
+    async def mark_referral_as_paid(session, ctx, rnd):
+        await ReferralService.mark_referral_as_paid(session, _take(ctx, "unpaid_referred"))
+
+    async def count_active_paid_referrals_random(session, ctx, rnd):
+        await ReferralService.count_active_paid_referrals(session, _random_user(ctx, rnd))
+
+    async def count_active_paid_referrals_top(session, ctx, rnd):
+        await ReferralService.count_active_paid_referrals(session, ctx["top_referrer"])
+
+    async def get_referral_stats_random(session, ctx, rnd):
+        await ReferralService.get_referral_stats(session, _random_user(ctx, rnd))
+
+    async def get_referral_stats_top(session, ctx, rnd):
+        await ReferralService.get_referral_stats(session, ctx["top_referrer"])
+
+    async def get_pending_bonuses(session, ctx, rnd):
+        await ReferralService.get_pending_bonuses(session)
+
+    async def mark_bonus_notified(session, ctx, rnd):
+        await ReferralService.mark_bonus_notified(session, _take(ctx, "pending_bonuses"))
+
+    async def create_payment(session, ctx, rnd):
+        await PaymentService.create_payment(session, _random_user(ctx, rnd), _take(ctx, "new_subscriptions"), 249.0)
+
+    async def get_payment_by_yookassa_id(session, ctx, rnd):
+        await PaymentService.get_payment_by_yookassa_id(session, f"ds-{rnd.choice(ctx['payments'])}")
+
+    async def update_payment_status(session, ctx, rnd):
+        await PaymentService.update_payment_status(session, rnd.choice(ctx["payments"]), PaymentStatus.SUCCEEDED)
+
+    async def check_payment_status(session, ctx, rnd):
+        await PaymentService.check_payment_status(session, rnd.choice(ctx["offline_payments"]))
+
+    async def get_all_active_tariffs(session, ctx, rnd):
+        await TariffService.get_all_active_tariffs(session)
+
+    async def get_tariff_by_code(session, ctx, rnd):
+        await TariffService.get_tariff_by_code(session, rnd.choice(ctx["tariffs"]).code)
+
+    async def get_tariff_by_id(session, ctx, rnd):
+        await TariffService.get_tariff_by_id(session, rnd.choice(ctx["tariffs"]).id)
+
+    async def get_tariff_by_name(session, ctx, rnd):
+        await TariffService.get_tariff_by_name(session, rnd.choice(ctx["tariffs"]).name)
+
+    async def init_default_tariffs(session, ctx, rnd):
+        await TariffService.init_default_tariffs(session)
+
+    # Порядок важен: изменяющие методы используют данные, созданные предыдущими
+    return [
+        ("UserService", "get_or_create_user", "existing", 30, get_or_create_existing),
+        ("UserService", "get_or_create_user", "new+referrer", 30, get_or_create_new),
+        ("UserService", "get_user_by_telegram_id", "", 30, get_user_by_telegram_id),
+        ("UserService", "update_user_profile", "", 30, update_user_profile),
+        ("SubscriptionService", "create_subscription", "", 30, create_subscription),
+        ("SubscriptionService", "activate_subscription", "", 30, activate_subscription),
+        ("SubscriptionService", "get_active_subscription", "", 30, get_active_subscription),
+        ("SubscriptionService", "get_user_subscriptions", "", 30, get_user_subscriptions),
+        ("SubscriptionService", "get_history_page", "first page", 30, get_history_page),
+        ("SubscriptionService", "get_subscriptions_for_reminder", "", 5, get_subscriptions_for_reminder),
+        ("SubscriptionService", "mark_reminder_sent", "", 30, mark_reminder_sent),
+        ("SubscriptionService", "get_all_active_subscriptions", "", 3, get_all_active_subscriptions),
+        ("SubscriptionService", "get_active_subscribers_state", "", 3, get_active_subscribers_state),
+        ("SubscriptionService", "count_active_subscribers", "", 5, count_active_subscribers),
+        ("SubscriptionService", "get_active_subscribers_page", "first page", 30, get_active_subscribers_page),
+        ("SubscriptionService", "expire_subscriptions", "", 3, expire_subscriptions),
+        ("ReferralService", "create_referral", "", 30, create_referral),
+        ("ReferralService", "mark_referral_as_paid", "", 30, mark_referral_as_paid),
+        ("ReferralService", "count_active_paid_referrals", "random user", 30, count_active_paid_referrals_random),
+        ("ReferralService", "count_active_paid_referrals", "top referrer", 5, count_active_paid_referrals_top),
+        ("ReferralService", "get_referral_stats", "random user", 30, get_referral_stats_random),
+        ("ReferralService", "get_referral_stats", "top referrer", 5, get_referral_stats_top),
+        ("ReferralService", "get_pending_bonuses", "", 5, get_pending_bonuses),
+        ("ReferralService", "mark_bonus_notified", "", 5, mark_bonus_notified),
+        ("PaymentService", "create_payment", "YooKassa stubbed", 30, create_payment),
+        ("PaymentService", "get_payment_by_yookassa_id", "", 30, get_payment_by_yookassa_id),
+        ("PaymentService", "update_payment_status", "", 30, update_payment_status),
+        ("PaymentService", "check_payment_status", "DB part", 30, check_payment_status),
+        ("TariffService", "get_all_active_tariffs", "", 30, get_all_active_tariffs),
+        ("TariffService", "get_tariff_by_code", "", 30, get_tariff_by_code),
+        ("TariffService", "get_tariff_by_id", "", 30, get_tariff_by_id),
+        ("TariffService", "get_tariff_by_name", "", 30, get_tariff_by_name),
+        ("TariffService", "init_default_tariffs", "", 10, init_default_tariffs),
+    ]
+
+
+async def _run(size: int, only: list[str], seed: int) -> list[dict]:
+    from database.base import get_engine, get_session
+    from monitoring import sql as sql_monitoring
+    from benchmarks.harness import patch_external_services, percentile
+
+    engine = get_engine()
+    sql_monitoring.install(engine, slow_query_ms=float("inf"), n_plus_one_threshold=10**9)
+    patch_external_services()
+    rnd = random.Random(seed)
+    ctx = await _prepare_context(size)
+
+    results = []
+    for service, method, variant, repeats, func in _cases():
+        if only and service not in only and method not in only:
+            continue
+        timings, statements = [], []
+        try:
+            for _ in range(repeats):
+                async for session in get_session():
+                    with sql_monitoring.track_queries(f"bench:{method}") as stats:
+                        start = time.perf_counter()
+                        await func(session, ctx, rnd)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    statements.append(stats.count)
+                    break
+        except _Exhausted:
+            pass
+        if not timings:
+            continue
+        results.append({
+            "case": f"{service}.{method}" + (f" [{variant}]" if variant else ""),
+            "p50": percentile(timings, 50),
+            "p95": percentile(timings, 95),
+            "sql": max(statements),
+        })
+    await engine.dispose()
+    return results
+
+
+def _child(args: list[str]) -> str:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_services", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    return out.stdout.strip().splitlines()[-1] if out.stdout.strip() else ""
+
+
+def _ensure_dataset(size: int, regenerate: bool):
+    db_path = BENCH_DIR / f"{_dataset_name(size)}.db"
+    if regenerate or not db_path.exists():
+        print(f"generating {size} users...", file=sys.stderr)
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.dataset", "--users", str(size), "--name", _dataset_name(size)],
+            check=True,
+            cwd=ROOT,
+        )
+    shutil.copyfile(db_path, BENCH_DIR / f"{_dataset_name(size)}_run.db")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--only", nargs="+", default=[], help="сервисы или методы")
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        bootstrap(f"{_dataset_name(args.run)}_run")
+        print(json.dumps(asyncio.run(_run(args.run, args.only, args.seed))))
+        return
+
+    by_size = {}
+    for size in args.sizes:
+        _ensure_dataset(size, args.regenerate)
+        run_args = ["--run", str(size), "--seed", str(args.seed)]
+        if args.only:
+            run_args += ["--only", *args.only]
+        by_size[size] = {r["case"]: r for r in json.loads(_child(run_args))}
+
+    cases = list(dict.fromkeys(case for results in by_size.values() for case in results))
+    width = max(len(case) for case in cases)
+    header = "".join(f" {f'{size} p50/p95 ms':>20} {'SQL':>4}" for size in args.sizes)
+    print(f"{'method':<{width}}{header}")
+    for case in cases:
+        cells = ""
+        for size in args.sizes:
+            r = by_size[size].get(case)
+            cells += f" {r['p50']:>9.2f}/{r['p95']:>10.2f} {r['sql']:>4}" if r else f" {'-':>20} {'-':>4}"
+        print(f"{case:<{width}}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Микробенчмарк реестра запросов (database/statements.py): накладные расходы Python на один вызов
+самых частых выборок — новый select() на каждый вызов (как было), готовый запрос из реестра
+и lambda_stmt для сравнения.
+
+Для каждого варианта: построение запроса + ключ кэша компиляции (без БД) и полный
+session.execute() на небольшой SQLite-базе, мкс на вызов; в конце — попадания в кэш компиляции
+по метрике bot_db_statement_cache_total.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_statements
+    python -m benchmarks.bench_statements --calls 20000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import bootstrap, reset_db, populate_active_subscribers
+
+bootstrap("statements")
+
+SUBSCRIBERS = 1000
+
+
+def _cases():
+    """(запрос, вариант, функция -> (statement, params))"""
+    from datetime import datetime
+    from sqlalchemy import lambda_stmt, select
+    from database import statements
+    from database.models import Payment, PaymentStatus, Subscription, SubscriptionStatus, Tariff, User
+
+    def user_fresh(i):
+        return select(User).where(User.telegram_id == 10_000_000 + i), None
+
+    def user_registry(i):
+        return statements.USER_BY_TELEGRAM_ID, {"telegram_id": 10_000_000 + i}
+
+    def user_lambda(i):
+        telegram_id = 10_000_000 + i
+        return lambda_stmt(lambda: select(User).where(User.telegram_id == telegram_id)), None
+
+    def sub_fresh(i):
+        stmt = select(Subscription).where(
+            Subscription.user_id == i,
+            Subscription.status == SubscriptionStatus.ACTIVE,
+            Subscription.end_date > datetime.utcnow(),
+        ).order_by(Subscription.end_date.desc()).limit(1)
+        return stmt, None
+
+    def sub_registry(i):
+        return statements.ACTIVE_SUBSCRIPTION_BY_USER, {"user_id": i, "now": datetime.utcnow()}
+
+    def sub_lambda(i):
+        now = datetime.utcnow()
+        active = SubscriptionStatus.ACTIVE  # лямбда не может ссылаться на enum-класс
+        stmt = lambda_stmt(lambda: select(Subscription).where(
+            Subscription.user_id == i,
+            Subscription.status == active,
+            Subscription.end_date > now,
+        ).order_by(Subscription.end_date.desc()).limit(1))
+        return stmt, None
+
+    def tariff_fresh(i):
+        return select(Tariff).where(Tariff.id == 1 + i % 3), None
+
+    def tariff_registry(i):
+        return statements.TARIFF_BY_ID, {"tariff_id": 1 + i % 3}
+
+    def payment_fresh(i):
+        stmt = select(Payment).where(Payment.subscription_id == i, Payment.status == PaymentStatus.PENDING)
+        return stmt, None
+
+    def payment_registry(i):
+        return statements.PENDING_PAYMENT_BY_SUBSCRIPTION, {"subscription_id": i}
+
+    return [
+        ("user_by_telegram_id", "fresh select", user_fresh),
+        ("user_by_telegram_id", "registry", user_registry),
+        ("user_by_telegram_id", "lambda_stmt", user_lambda),
+        ("active_subscription", "fresh select", sub_fresh),
+        ("active_subscription", "registry", sub_registry),
+        ("active_subscription", "lambda_stmt", sub_lambda),
+        ("tariff_by_id", "fresh select", tariff_fresh),
+        ("tariff_by_id", "registry", tariff_registry),
+        ("pending_payment", "fresh select", payment_fresh),
+        ("pending_payment", "registry", payment_registry),
+    ]
+
+
+def build_us(build, calls: int) -> float:
+    """Построение запроса и ключа кэша компиляции (то, что SQLAlchemy делает перед каждым выполнением)"""
+    start = time.perf_counter()
+    for i in range(calls):
+        stmt, _ = build(1 + i % SUBSCRIBERS)
+        stmt._generate_cache_key()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def execute_us(session, build, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        stmt, params = build(1 + i % SUBSCRIBERS)
+        result = await session.execute(stmt, params)
+        result.scalars().first()
+        session.expunge_all()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def main_async(args):
+    import logging
+    from database.base import get_engine, get_session
+    from monitoring import sql as sql_monitoring
+    from monitoring.metrics import DB_STATEMENT_CACHE
+
+    logging.basicConfig(level=logging.ERROR)
+    await reset_db()
+    await populate_active_subscribers(SUBSCRIBERS)
+    sql_monitoring.install(get_engine())
+
+    cases = _cases()
+    print(f"{args.calls} calls per case, {SUBSCRIBERS} subscribers (SQLite)")
+    print(f"{'query':<22} {'variant':<13} {'build+key, us':>14} {'execute, us':>12}")
+    async for session in get_session():
+        for _, _, build in cases:
+            await execute_us(session, build, 50)  # прогрев кэша компиляции
+        for name, variant, build in cases:
+            build_time = build_us(build, args.calls)
+            execute_time = await execute_us(session, build, args.calls)
+            print(f"{name:<22} {variant:<13} {build_time:>14.1f} {execute_time:>12.1f}")
+        break
+
+    print("\nCompilation cache (bot_db_statement_cache_total):")
+    for statement in ("user_by_telegram_id", "active_subscription_by_user", "tariff_by_id",
+                      "pending_payment_by_subscription", "other"):
+        hits = DB_STATEMENT_CACHE.value(statement=statement, result="hit")
+        misses = DB_STATEMENT_CACHE.value(statement=statement, result="miss")
+        total = hits + misses
+        print(f"  {statement:<32} hits {hits:>8.0f}  misses {misses:>4.0f}  hit rate {hits / max(total, 1):.1%}")
+    await get_engine().dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
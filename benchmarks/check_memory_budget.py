@@ -0,0 +1,192 @@
+"""
+Проверка бюджетов памяти и времени массовых задач на сгенерированных базах (по умолчанию 10k и 100k
+подписчиков): ежедневный отчёт (daily_active_subscribers_report_task), выгрузка TXT по кнопке админа
+(admin_export_subscribers_txt через Dispatcher) и проверка pending-платежей (check_pending_payments_task).
+
+Каждая задача выполняется под tracemalloc. Бюджет памяти — постоянная часть плюс байты на строку
+(подписчика; для платежей — pending-платежа): потоковая выгрузка укладывается в постоянную часть,
+а задача, которая вдруг начала держать все строки в памяти, выходит за бюджет на большой базе.
+Бюджет времени — мс на 1000 строк. Если хоть одна задача вышла за бюджет — код возврата 1;
+проверка запускается в CI (.github/workflows/checks.yml) на каждый push и pull request.
+
+Отчёт строится после пустого снимка (все подписчики — «новые», худший случай), рендеринг — в этом же
+процессе (RENDER_WORKERS=0), иначе память процесса рендеринга не попала бы в замер. YooKassa подменена
+(harness.patch_external_services) и отвечает, что платёж всё ещё ожидает оплаты.
+Время меряется вместе с накладными расходами tracemalloc — бюджеты времени заданы с их учётом.
+
+Запуск из корня проекта:
+    python -m benchmarks.check_memory_budget
+    python -m benchmarks.check_memory_budget --sizes 10000 --jobs daily_report export_txt
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import bootstrap, reset_db, populate_active_subscribers
+
+ADMIN_ID = 777_000_001
+
+bootstrap("memory_budget")
+os.environ["ADMIN_TELEGRAM_IDS"] = str(ADMIN_ID)
+os.environ["RENDER_WORKERS"] = "0"
+
+# Доля pending-платежей от числа подписчиков (брошенные оплаты копятся и проверяются каждые 5 минут)
+PENDING_SHARE = 0.1
+
+# Задача: (пик памяти — МБ постоянно + байт на строку; время — мс на 1000 строк под tracemalloc).
+# Замер на 10k / 100k: отчёт ~1500 Б/строку, 120-140 мс; выгрузка ~5 МБ всего, 65 мс;
+# платежи ~250 Б/строку, 1.7 с на 1000 платежей
+BUDGETS = {
+    "daily_report": (16, 2000, 250),
+    "export_txt": (16, 50, 120),
+    "pending_payments": (8, 500, 3500),
+}
+
+
+async def populate_pending_payments(n: int, batch: int = 5000):
+    """Добавить n pending-платежей (с ID YooKassa) за неоплаченные подписки первых n пользователей"""
+    from sqlalchemy import insert, select
+    from database.base import get_session
+    from database.models import Payment, PaymentStatus, Subscription, SubscriptionStatus, Tariff
+
+    async for session in get_session():
+        tariff = (await session.execute(select(Tariff).limit(1))).scalar_one()
+        for offset in range(0, n, batch):
+            ids = range(offset + 1, min(n, offset + batch) + 1)
+            result = await session.execute(
+                insert(Subscription).returning(Subscription.id, Subscription.user_id),
+                [{"user_id": i, "tariff_id": tariff.id, "status": SubscriptionStatus.PENDING} for i in ids],
+            )
+            await session.execute(insert(Payment), [
+                {
+                    "user_id": user_id,
+                    "subscription_id": subscription_id,
+                    "yookassa_payment_id": f"bench-{subscription_id}",
+                    "amount": tariff.price,
+                    "status": PaymentStatus.PENDING,
+                }
+                for subscription_id, user_id in result.all()
+            ])
+        await session.commit()
+        break
+
+
+async def _prepare_daily_report():
+    from database.base import get_session
+    from services.report_service import ReportService
+
+    async for session in get_session():
+        await ReportService.save_snapshot(session, {})
+        break
+
+
+async def run_daily_report(harness):
+    from scheduler.tasks import daily_active_subscribers_report_task
+
+    await daily_active_subscribers_report_task(harness.bot)
+
+
+async def run_export_txt(harness):
+    await harness.click(ADMIN_ID, "admin_export_subscribers_txt")
+
+
+async def run_pending_payments(harness):
+    from scheduler.tasks import check_pending_payments_task
+
+    await check_pending_payments_task(harness.bot)
+
+
+JOBS = {
+    # задача: (подготовка, запуск, метод Bot API, который должен быть вызван)
+    "daily_report": (_prepare_daily_report, run_daily_report, "SendMessage"),
+    "export_txt": (None, run_export_txt, "SendDocument"),
+    "pending_payments": (None, run_pending_payments, None),
+}
+
+
+async def measure(harness, job: str) -> tuple[float, int]:
+    """Returns: (секунды, пик выделенной памяти сверх исходной, байт)"""
+    prepare, run, _ = JOBS[job]
+    if prepare is not None:
+        await prepare()
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    await run(harness)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+async def main_async(args) -> int:
+    import logging
+    from benchmarks.harness import Harness, patch_external_services
+
+    logging.basicConfig(level=logging.ERROR)
+    patch_external_services(payment_status="pending")
+    harness = Harness()
+
+    print(
+        f"{'job':<18} {'size':>7} {'rows':>7} {'time, s':>8} {'ms/1k':>7} "
+        f"{'peak, MB':>9} {'budget':>7} {'B/row':>7}  result"
+    )
+    failures = []
+    for size in args.sizes:
+        await reset_db()
+        await populate_active_subscribers(size)
+        pending = int(size * PENDING_SHARE)
+        await populate_pending_payments(pending)
+
+        for job in args.jobs:
+            harness.reset()
+            rows = pending if job == "pending_payments" else size
+            elapsed, peak = await measure(harness, job)
+            fixed_mb, bytes_per_row, ms_budget = BUDGETS[job]
+            memory_budget = fixed_mb * 2**20 + bytes_per_row * rows
+            per_row = peak / max(rows, 1)
+            ms_per_1k = elapsed * 1000 / max(rows, 1) * 1000
+
+            problems = []
+            if peak > memory_budget:
+                problems.append(f"memory {peak / 2**20:.1f} > {memory_budget / 2**20:.1f} MB")
+            if ms_per_1k > ms_budget:
+                problems.append(f"time {ms_per_1k:.0f} > {ms_budget} ms/1k")
+            expected_call = JOBS[job][2]
+            if expected_call and not harness.session.requests[expected_call]:
+                problems.append(f"no {expected_call} sent")
+            if problems:
+                failures.append((job, size, problems))
+
+            print(
+                f"{job:<18} {size:>7} {rows:>7} {elapsed:>8.2f} {ms_per_1k:>7.1f} {peak / 2**20:>9.1f} "
+                f"{memory_budget / 2**20:>7.1f} {per_row:>7.0f}  {'FAIL: ' + '; '.join(problems) if problems else 'ok'}"
+            )
+
+    from database.base import dispose_engines
+    await dispose_engines()
+
+    if failures:
+        print(f"\n{len(failures)} budget violation(s)")
+        return 1
+    print("\nAll jobs within budget")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--jobs", nargs="+", choices=list(JOBS), default=list(JOBS))
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Проверка пределов SQL-запросов на апдейт для всех обработчиков из handlers/.
+
+Каждый обработчик объявляет предел декоратором @query_budget(n) (monitoring/sql.py).
+Скрипт собирает настоящий Dispatcher с фиктивной сессией Bot API (benchmarks/harness.py),
+проводит через него апдейты, которые доходят до каждого обработчика (подписчик, новый пользователь
+по реферальной ссылке с анкетой и оплатой, администратор), и считает SQL-запросы на апдейт —
+вместе с middleware. Код возврата 1, если:
+    - обработчик выполнил больше запросов, чем объявил;
+    - у обработчика нет @query_budget;
+    - до обработчика не дошёл ни один апдейт (новый обработчик — добавьте шаг в steps()).
+
+Так новый цикл с запросом на каждую строку в обработчике или сервисе ловится до деплоя, а не задержками
+в проде: проверка запускается в CI (.github/workflows/checks.yml) на каждый push и pull request.
+
+Запуск из корня проекта:
+    python -m benchmarks.check_query_budget
+    python -m benchmarks.check_query_budget --subscribers 10000 --verbose
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import bootstrap, reset_db, populate_active_subscribers
+
+ADMIN_ID = 777_000_002
+# Подписчик из populate_active_subscribers: users.id = 1, реферальный код R0000001
+SUBSCRIBER_ID = 10_000_001
+NEW_USER_ID = 60_000_001
+PAYER_ID = 60_000_002
+CANCEL_ID = 60_000_003
+
+bootstrap("query_budget")
+os.environ["ADMIN_TELEGRAM_IDS"] = str(ADMIN_ID)
+
+from benchmarks.harness import Harness, patch_external_services  # noqa: E402
+
+
+async def _populate_referrals():
+    """У подписчика 1 пять рефералов, трое из них оплатили подписку"""
+    from sqlalchemy import insert
+    from database.base import get_session
+    from database.models import Referral
+
+    async for session in get_session():
+        await session.execute(insert(Referral), [
+            {"referrer_id": 1, "referred_id": i, "has_paid_subscription": i <= 4}
+            for i in range(2, 7)
+        ])
+        await session.commit()
+        break
+
+
+async def _questionnaire(harness: Harness, user_id: int, tariff_id: int):
+    await harness.click(user_id, f"select_tariff_{tariff_id}")
+    await harness.send_message(user_id, "Иванов")
+    await harness.send_message(user_id, "Иван")
+    await harness.send_message(user_id, "Иванович")
+    await harness.send_message(user_id, f"+79{user_id % 10**9:09d}")
+
+
+def _successful_payment(harness: Harness, user_id: int):
+    return harness.update(message=harness.message_payload(user_id, successful_payment={
+        "currency": "RUB",
+        "total_amount": 99000,
+        "invoice_payload": "subscription",
+        "telegram_payment_charge_id": "tg-charge",
+        "provider_payment_charge_id": "provider-charge",
+    }))
+
+
+def _pre_checkout(harness: Harness, user_id: int):
+    return harness.update(pre_checkout_query={
+        "id": "pre-checkout",
+        "from": harness._user(user_id),
+        "currency": "RUB",
+        "total_amount": 99000,
+        "invoice_payload": "subscription",
+    })
+
+
+def _web_app_data(harness: Harness, user_id: int):
+    return harness.update(message=harness.message_payload(
+        user_id, web_app_data={"data": "{}", "button_text": "Оплатить"},
+    ))
+
+
+def steps(tariff_id: int) -> list:
+    """
+    (обработчик, действие) — по порядку; действие получает harness.
+    Шаги без указанного обработчика готовят состояние и не проверяются.
+    """
+    def click(user_id, data):
+        return lambda h: h.click(user_id, data)
+
+    def send(user_id, text):
+        return lambda h: h.send_message(user_id, text)
+
+    def click_last(user_id, prefix):
+        return lambda h: h.click(user_id, h.last_callback_data(user_id, prefix) or prefix)
+
+    def feed(build, user_id):
+        return lambda h: h.feed(build(h, user_id), label=build.__name__)
+
+    return [
+        # Подписчик листает меню
+        ("cmd_start", send(SUBSCRIBER_ID, "/start")),
+        ("show_my_subscription", click(SUBSCRIBER_ID, "my_subscription")),
+        ("show_referral_program", click(SUBSCRIBER_ID, "referral_program")),
+        ("back_to_menu", click(SUBSCRIBER_ID, "back_to_menu")),
+        ("get_catalog", click(SUBSCRIBER_ID, "get_catalog")),
+        ("catalog_search", lambda h: h.inline_query(SUBSCRIBER_ID, "chanel")),
+        ("order_perfume", click(SUBSCRIBER_ID, "order_perfume")),
+        ("renew_subscription", click(SUBSCRIBER_ID, "renew_subscription")),
+        ("show_history", click(SUBSCRIBER_ID, "my_history")),
+        # Новый пользователь по реферальной ссылке: анкета и тестовая оплата
+        ("cmd_start", send(NEW_USER_ID, "/start R0000001")),
+        ("select_tariff", click(NEW_USER_ID, f"select_tariff_{tariff_id}")),
+        ("process_surname", send(NEW_USER_ID, "Иванов")),
+        ("process_name", send(NEW_USER_ID, "Иван")),
+        ("process_patronymic", send(NEW_USER_ID, "Иванович")),
+        ("process_phone", send(NEW_USER_ID, "+79001234567")),
+        ("process_test_payment", click_last(NEW_USER_ID, "test_payment_")),
+        # Оплата через Telegram Payments
+        (None, send(PAYER_ID, "/start")),
+        (None, lambda h: _questionnaire(h, PAYER_ID, tariff_id)),
+        ("process_pre_checkout", feed(_pre_checkout, PAYER_ID)),
+        ("process_successful_payment", feed(_successful_payment, PAYER_ID)),
+        ("handle_webhook", feed(_web_app_data, PAYER_ID)),
+        # Отмена анкеты
+        (None, send(CANCEL_ID, "/start")),
+        (None, click(CANCEL_ID, f"select_tariff_{tariff_id}")),
+        ("cancel_subscription", click(CANCEL_ID, "cancel")),
+        # Администратор
+        ("admin_menu", send(ADMIN_ID, "/admin")),
+        ("admin_stats", click(ADMIN_ID, "admin_stats")),
+        ("admin_users", click(ADMIN_ID, "admin_users")),
+        ("admin_payments", click(ADMIN_ID, "admin_payments")),
+        ("admin_subscriptions", click(ADMIN_ID, "admin_subscriptions")),
+        ("admin_referrals", click(ADMIN_ID, "admin_referrals")),
+        ("admin_back", click(ADMIN_ID, "admin_back")),
+        ("admin_subscribers_list", click(ADMIN_ID, "admin_subscribers_list")),
+        ("admin_subscribers_list", click_last(ADMIN_ID, "admin_subs:n:")),
+        ("admin_export_subscribers", click(ADMIN_ID, "admin_export_subscribers_txt")),
+        ("admin_export_subscribers", click(ADMIN_ID, "admin_export_subscribers_txt")),
+        ("cmd_seed_subscribers", send(ADMIN_ID, "/seed_subscribers dry")),
+    ]
+
+
+def collect_handlers(dp) -> dict:
+    """Имя обработчика -> callback для всех обработчиков из пакета handlers"""
+    handlers = {}
+    routers = [dp]
+    while routers:
+        router = routers.pop()
+        routers.extend(router.sub_routers)
+        for observer in router.observers.values():
+            for handler in observer.handlers:
+                callback = handler.callback
+                if getattr(callback, "__module__", "").startswith("handlers."):
+                    handlers[callback.__name__] = callback
+    return handlers
+
+
+async def main_async(args) -> int:
+    import logging
+    from sqlalchemy import select
+    from database.base import get_engine, get_session
+    from database.models import Tariff
+    from monitoring import sql as sql_monitoring
+    from monitoring.metrics import DB_QUERIES_PER_UPDATE
+
+    logging.basicConfig(level=logging.ERROR)
+    await reset_db()
+    await populate_active_subscribers(args.subscribers)
+    await _populate_referrals()
+    async for session in get_session():
+        tariff_id = (await session.execute(select(Tariff.id).limit(1))).scalar_one()
+        break
+    sql_monitoring.install(get_engine())
+    patch_external_services()
+
+    harness = Harness()
+    handlers = collect_handlers(harness.dp)
+    failures = []
+    reached = set()
+    # Обработчик -> максимум запросов за апдейт среди его шагов
+    observed: dict[str, int] = {}
+
+    for name, action in steps(tariff_id):
+        if name is None:
+            await action(harness)
+            continue
+        callback = handlers[name]
+        scope = f"{callback.__module__}:{name}"
+        before = DB_QUERIES_PER_UPDATE.count(scope=scope)
+        result = await action(harness)
+        if DB_QUERIES_PER_UPDATE.count(scope=scope) == before:
+            failures.append(f"{name}: update {result.label!r} did not reach the handler")
+            continue
+        reached.add(name)
+        observed[name] = max(observed.get(name, 0), result.statements)
+        if args.verbose:
+            print(f"  {name:<28} {result.label:<32} {result.statements:>3} statements")
+
+    print(f"{'handler':<28} {'SQL max':>8} {'budget':>7}  result")
+    for name, callback in sorted(handlers.items()):
+        budget = sql_monitoring.get_query_budget(callback)
+        count = observed.get(name)
+        if budget is None:
+            status = "FAIL: no @query_budget"
+        elif name not in reached:
+            status = "FAIL: not exercised"
+        elif count > budget:
+            status = f"FAIL: {count} > {budget}"
+        else:
+            status = "ok"
+        if status != "ok":
+            failures.append(f"{name}: {status[6:]}")
+        print(f"{name:<28} {'-' if count is None else count:>8} {'-' if budget is None else budget:>7}  {status}")
+
+    await get_engine().dispose()
+    if failures:
+        print(f"\n{len(failures)} problem(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nAll handlers within their query budgets")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1000, help="подписчиков в БД перед прогоном")
+    parser.add_argument("--verbose", action="store_true", help="запросы на каждый шаг")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
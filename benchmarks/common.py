@@ -0,0 +1,103 @@
+"""
+Общие утилиты бенчмарков: окружение и наполнение тестовой БД.
+bootstrap() нужно вызывать до импорта config / database.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(os.environ.get("BENCH_DIR", "/tmp/free_bot_bench"))
+
+
+def bootstrap(name: str) -> Path:
+    """
+    Подготовить окружение бенчмарка: отдельный файл SQLite и фиктивные ключи.
+    Returns: путь к файлу БД
+    """
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    db_path = BENCH_DIR / f"{name}.db"
+    os.environ.setdefault("BOT_TOKEN", "123456:bench")
+    os.environ.setdefault("YOOKASSA_SHOP_ID", "bench")
+    os.environ.setdefault("YOOKASSA_SECRET_KEY", "test_bench")
+    os.environ.setdefault("BOT_USERNAME", "bench_bot")
+    # Сценарии шлют апдейты быстрее живого пользователя — антифлуд включается явно (THROTTLE_ENABLED=true)
+    os.environ.setdefault("THROTTLE_ENABLED", "false")
+    os.environ["DATA_DIR"] = ""
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    return db_path
+
+
+async def reset_db():
+    """Пересоздать схему и дефолтные тарифы"""
+    from database.base import Base, get_engine, init_db, get_session
+    from services.tariff_service import TariffService
+
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await init_db(force=True)
+    async for session in get_session():
+        await TariffService.init_default_tariffs(session=session)
+        break
+
+
+async def populate_active_subscribers(n: int, batch: int = 5000):
+    """Добавить n пользователей, у каждого — активная подписка"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert, select
+    from database.base import get_session
+    from database.models import User, Subscription, SubscriptionStatus, Tariff
+
+    now = datetime.utcnow()
+    async for session in get_session():
+        tariff_ids = list((await session.execute(select(Tariff.id))).scalars())
+        for offset in range(0, n, batch):
+            ids = range(offset + 1, min(n, offset + batch) + 1)
+            await session.execute(insert(User), [
+                {
+                    "id": i,
+                    "telegram_id": 10_000_000 + i,
+                    "username": f"user{i}",
+                    "first_name": f"Имя{i}",
+                    "surname": f"Фамилия{i}",
+                    "name": f"Имя{i}",
+                    "patronymic": f"Отчество{i}",
+                    "phone": f"+79{i:09d}",
+                    "referral_code": f"R{i:07d}",
+                }
+                for i in ids
+            ])
+            await session.execute(insert(Subscription), [
+                {
+                    "user_id": i,
+                    "tariff_id": tariff_ids[i % len(tariff_ids)],
+                    "status": SubscriptionStatus.ACTIVE,
+                    "start_date": now - timedelta(days=i % 300),
+                    "end_date": now + timedelta(days=1 + i % 365, seconds=i),
+                    "reminder_sent": False,
+                }
+                for i in ids
+            ])
+        await session.commit()
+        break
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS текущего процесса, МБ (Linux: ru_maxrss в КБ)"""
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class Timer:
+    """with Timer() as t: ...; t.elapsed — секунды"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
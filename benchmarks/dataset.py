@@ -0,0 +1,246 @@
+"""
+Генератор реалистичной синтетической базы для бенчмарков.
+
+- пользователи, зарегистрированные равномерно за последние --years лет;
+- истории подписок: продления подряд, отток после любого периода, возвраты после перерыва,
+  брошенные анкеты (PENDING-подписка без оплаты);
+- платежи во всех статусах: оплаченные, висящие PENDING, отменённые (в т.ч. без подписки);
+- реферальное дерево с сильным перекосом: ранние пользователи приводят основную долю рефералов;
+- бонусы для рефереров, набравших порог оплативших рефералов.
+
+Генерация детерминирована (--seed). Telegram ID пользователя i — 10_000_000 + i,
+реферальный код — R{i:07d}, как в benchmarks.common.
+
+Запуск из корня проекта:
+    python -m benchmarks.dataset --users 100000            # БД в BENCH_DIR/dataset_100000.db
+"""
+import argparse
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import bootstrap, reset_db, peak_rss_mb, Timer
+
+TELEGRAM_ID_BASE = 10_000_000
+
+# Доли выбора тарифа при покупке
+TARIFF_WEIGHTS = {"monthly": 0.6, "half_year": 0.25, "yearly": 0.15}
+# Вероятность, что пользователь хоть раз оплатил подписку
+BUYER_SHARE = 0.45
+# Вероятность не продлить подписку после очередного периода
+CHURN = 0.35
+# Вероятность вернуться после оттока
+COMEBACK = 0.3
+# Доля пользователей, пришедших по реферальной ссылке
+REFERRED_SHARE = 0.35
+# Чем больше, тем сильнее рефералы сосредоточены у ранних пользователей
+REFERRAL_SKEW = 4
+
+
+class _Writer:
+    """Буферизованная вставка строк по таблицам через executemany"""
+
+    def __init__(self, session, batch: int):
+        self.session = session
+        self.batch = batch
+        self.buffers: dict = {}
+        self.counts: dict = {}
+
+    async def add(self, table, row: dict):
+        buffer = self.buffers.setdefault(table, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch:
+            await self.flush(table)
+
+    async def flush(self, table=None):
+        from sqlalchemy import insert
+
+        for name in [table] if table is not None else list(self.buffers):
+            rows = self.buffers.get(name)
+            if rows:
+                await self.session.execute(insert(name), rows)
+                self.counts[name.__tablename__] = self.counts.get(name.__tablename__, 0) + len(rows)
+                rows.clear()
+
+
+def _months(months: int) -> timedelta:
+    return timedelta(days=round(months * 30.4))
+
+
+async def generate(users: int, years: int = 3, seed: int = 1, batch: int = 5000) -> dict:
+    """
+    Наполнить текущую (пустую, с тарифами) БД.
+    Returns: количество строк по таблицам
+    """
+    from sqlalchemy import select
+    from database.base import get_session
+    from database.models import (
+        User, Subscription, SubscriptionStatus, Payment, PaymentStatus,
+        Referral, ReferralBonus, ReferralBonusStatus, Tariff,
+    )
+    from services.referral_service import ReferralService
+
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    span = timedelta(days=365 * years)
+
+    async for session in get_session():
+        tariffs = {t.code: t for t in (await session.execute(select(Tariff))).scalars()}
+        codes = [code for code in TARIFF_WEIGHTS if code in tariffs]
+        weights = [TARIFF_WEIGHTS[code] for code in codes]
+
+        writer = _Writer(session, batch)
+        subscription_id = 0
+        payment_id = 0
+        paid_referrals: dict[int, int] = {}
+
+        for i in range(1, users + 1):
+            created = now - span * (1 - i / users) - timedelta(minutes=rnd.randint(0, 600))
+            referrer_id = None
+            if i > 1 and rnd.random() < REFERRED_SHARE:
+                referrer_id = 1 + int((i - 1) * rnd.random() ** REFERRAL_SKEW)
+                referrer_id = min(referrer_id, i - 1)
+
+            await writer.add(User, {
+                "id": i,
+                "telegram_id": TELEGRAM_ID_BASE + i,
+                "username": f"user{i}" if rnd.random() < 0.7 else None,
+                "first_name": f"Имя{i}",
+                "surname": f"Фамилия{i}",
+                "name": f"Имя{i}",
+                "patronymic": f"Отчество{i}",
+                "phone": f"+79{i:09d}",
+                "referral_code": f"R{i:07d}",
+                "referrer_id": referrer_id,
+                "created_at": created,
+            })
+
+            paid = False
+            if rnd.random() < BUYER_SHARE:
+                tariff = tariffs[rnd.choices(codes, weights)[0]]
+                start = created + timedelta(days=rnd.randint(0, 30))
+                while start < now:
+                    end = start + _months(tariff.duration_months)
+                    subscription_id += 1
+                    payment_id += 1
+                    await writer.add(Subscription, {
+                        "id": subscription_id,
+                        "user_id": i,
+                        "tariff_id": tariff.id,
+                        "status": SubscriptionStatus.ACTIVE if end > now else SubscriptionStatus.EXPIRED,
+                        "start_date": start,
+                        "end_date": end,
+                        "reminder_sent": end <= now + timedelta(days=3),
+                        "created_at": start,
+                    })
+                    await writer.add(Payment, {
+                        "id": payment_id,
+                        "user_id": i,
+                        "subscription_id": subscription_id,
+                        "yookassa_payment_id": f"ds-{payment_id}",
+                        "amount": tariff.price,
+                        "currency": "RUB",
+                        "status": PaymentStatus.SUCCEEDED,
+                        "created_at": start,
+                    })
+                    paid = True
+                    if rnd.random() < 0.05:
+                        # Неудачная попытка оплаты продления: платёж отменён, подписка не создана
+                        payment_id += 1
+                        await writer.add(Payment, {
+                            "id": payment_id,
+                            "user_id": i,
+                            "subscription_id": None,
+                            "yookassa_payment_id": None,
+                            "amount": tariff.price,
+                            "currency": "RUB",
+                            "status": PaymentStatus.CANCELED,
+                            "created_at": end,
+                        })
+                    if rnd.random() < CHURN:
+                        if rnd.random() >= COMEBACK:
+                            break
+                        start = end + timedelta(days=rnd.randint(14, 240))
+                        if rnd.random() < 0.3:
+                            tariff = tariffs[rnd.choices(codes, weights)[0]]
+                    else:
+                        start = end
+
+            if rnd.random() < 0.1:
+                # Брошенная анкета: подписка ждёт оплаты, платёж висит или отменён
+                tariff = tariffs[rnd.choices(codes, weights)[0]]
+                abandoned_at = created + (now - created) * rnd.random()
+                subscription_id += 1
+                payment_id += 1
+                await writer.add(Subscription, {
+                    "id": subscription_id,
+                    "user_id": i,
+                    "tariff_id": tariff.id,
+                    "status": SubscriptionStatus.PENDING,
+                    "reminder_sent": False,
+                    "created_at": abandoned_at,
+                })
+                await writer.add(Payment, {
+                    "id": payment_id,
+                    "user_id": i,
+                    "subscription_id": subscription_id,
+                    "yookassa_payment_id": f"ds-{payment_id}",
+                    "amount": tariff.price,
+                    "currency": "RUB",
+                    "status": rnd.choice([PaymentStatus.PENDING, PaymentStatus.CANCELED]),
+                    "created_at": abandoned_at,
+                })
+
+            if referrer_id is not None:
+                await writer.add(Referral, {
+                    "referrer_id": referrer_id,
+                    "referred_id": i,
+                    "has_paid_subscription": paid,
+                    "created_at": created,
+                })
+                if paid:
+                    paid_referrals[referrer_id] = paid_referrals.get(referrer_id, 0) + 1
+
+        for user_id, count in paid_referrals.items():
+            if count >= ReferralService.BONUS_THRESHOLD:
+                await writer.add(ReferralBonus, {
+                    "user_id": user_id,
+                    "status": rnd.choices(
+                        [ReferralBonusStatus.NOTIFIED, ReferralBonusStatus.ISSUED, ReferralBonusStatus.PENDING],
+                        [0.8, 0.1, 0.1],
+                    )[0],
+                    "active_referrals_count": count,
+                })
+
+        await writer.flush()
+        await session.commit()
+        break
+    return writer.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--name", help="имя файла БД в BENCH_DIR (по умолчанию dataset_<users>)")
+    args = parser.parse_args()
+
+    db_path = bootstrap(args.name or f"dataset_{args.users}")
+
+    async def run():
+        await reset_db()
+        return await generate(args.users, years=args.years, seed=args.seed)
+
+    with Timer() as t:
+        counts = asyncio.run(run())
+    rows = ", ".join(f"{table}={count}" for table, count in counts.items())
+    print(f"{db_path}: {rows} in {t.elapsed:.1f}s, peak RSS {peak_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
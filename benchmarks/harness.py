@@ -0,0 +1,207 @@
+"""
+Прогон синтетических апдейтов через настоящий Dispatcher без обращений к Telegram и YooKassa.
+Используется бенчмарками нагрузки и проверками числа SQL-запросов на обработчик.
+bootstrap() из benchmarks.common должен быть вызван до импорта этого модуля.
+"""
+import asyncio
+import itertools
+import time
+import typing
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Document, Message, Update, User
+
+from monitoring import sql as sql_monitoring
+
+BOT_ID = 123456
+
+
+class MockedSession(BaseSession):
+    """
+    Сессия Bot API, которая ничего не отправляет: возвращает правдоподобные ответы
+    и запоминает запросы. api_latency — искусственная задержка ответа (секунды).
+    """
+
+    def __init__(self, api_latency: float = 0.0):
+        super().__init__()
+        self.api_latency = api_latency
+        self.requests: Counter = Counter()
+        # chat_id -> последняя отправленная клавиатура (чтобы сценарий мог нажать кнопку)
+        self.last_markup: dict[int, Any] = {}
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method, timeout: Optional[int] = None):
+        self.requests[type(method).__name__] += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+        chat_id = getattr(method, "chat_id", None)
+        markup = getattr(method, "reply_markup", None)
+        if chat_id is not None and markup is not None:
+            self.last_markup[int(chat_id)] = markup
+
+        returning = method.__returning__
+        options = typing.get_args(returning) or (returning,)
+        if Message in options:
+            return self._message(method, chat_id)
+        if User in options:
+            return User(id=BOT_ID, is_bot=True, first_name="Bench", username="bench_bot")
+        if bool in options:
+            return True
+        return None
+
+    def _message(self, method, chat_id) -> Message:
+        document = None
+        if type(method).__name__ == "SendDocument":
+            document = Document(file_id=f"file-{uuid.uuid4().hex}", file_unique_id=uuid.uuid4().hex)
+        return Message(
+            message_id=next(self._message_ids),
+            date=datetime.utcnow(),
+            chat=Chat(id=int(chat_id or 0), type="private"),
+            text=getattr(method, "text", None),
+            document=document,
+        )
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+@dataclass
+class FeedResult:
+    """Результат обработки одного апдейта"""
+    label: str
+    seconds: float
+    statements: int
+
+
+@dataclass
+class Harness:
+    """Бот с фиктивной сессией и диспетчер со всеми роутерами из handlers/"""
+    api_latency: float = 0.0
+    results: list[FeedResult] = field(default_factory=list)
+
+    def __post_init__(self):
+        from main import create_dispatcher
+
+        self.session = MockedSession(api_latency=self.api_latency)
+        self.bot = Bot(token=f"{BOT_ID}:bench", session=self.session)
+        self.dp = create_dispatcher()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def reset(self):
+        """Сбросить накопленные замеры (роутеры можно подключить к диспетчеру только один раз)"""
+        self.results.clear()
+        self.session.requests.clear()
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+    def update(self, **fields) -> Update:
+        """Апдейт любого типа: harness.update(pre_checkout_query={...})"""
+        return Update.model_validate({"update_id": next(self._update_ids), **fields}, context={"bot": self.bot})
+
+    def message_payload(self, user_id: int, **fields) -> dict:
+        """Сообщение от пользователя в личном чате; fields — text, successful_payment, web_app_data..."""
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            **fields,
+        }
+
+    def message_update(self, user_id: int, text: str) -> Update:
+        return self.update(message=self.message_payload(user_id, text=text))
+
+    def callback_update(self, user_id: int, data: str) -> Update:
+        return Update.model_validate({
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": {"id": BOT_ID, "is_bot": True, "first_name": "Bench"},
+                    "text": "menu",
+                },
+            },
+        }, context={"bot": self.bot})
+
+    def inline_update(self, user_id: int, query: str, offset: str = "") -> Update:
+        return Update.model_validate({
+            "update_id": next(self._update_ids),
+            "inline_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user_id),
+                "query": query,
+                "offset": offset,
+            },
+        }, context={"bot": self.bot})
+
+    async def feed(self, update: Update, label: str) -> FeedResult:
+        """Обработать апдейт, замерив время и число SQL-запросов"""
+        start = time.perf_counter()
+        with sql_monitoring.track_queries(f"bench:{label}") as stats:
+            await self.dp.feed_update(self.bot, update)
+        result = FeedResult(label=label, seconds=time.perf_counter() - start, statements=stats.count)
+        self.results.append(result)
+        return result
+
+    async def send_message(self, user_id: int, text: str, label: Optional[str] = None) -> FeedResult:
+        return await self.feed(self.message_update(user_id, text), label or text.split()[0])
+
+    async def click(self, user_id: int, data: str, label: Optional[str] = None) -> FeedResult:
+        return await self.feed(self.callback_update(user_id, data), label or data)
+
+    async def inline_query(self, user_id: int, query: str, label: Optional[str] = None) -> FeedResult:
+        return await self.feed(self.inline_update(user_id, query), label or "inline_query")
+
+    def last_callback_data(self, user_id: int, prefix: str) -> Optional[str]:
+        """callback_data кнопки с указанным префиксом из последней клавиатуры, отправленной пользователю"""
+        markup = self.session.last_markup.get(user_id)
+        for row in getattr(markup, "inline_keyboard", None) or []:
+            for button in row:
+                if button.callback_data and button.callback_data.startswith(prefix):
+                    return button.callback_data
+        return None
+
+
+def patch_external_services(payment_status: str = "pending"):
+    """
+    Подменить вызовы YooKassa: бенчмарк не должен ходить в сеть.
+    payment_status — что «отвечает» YooKassa на проверку статуса платежа
+    """
+    from services.payment_service import PaymentService
+
+    async def fake_create(payment_data: dict) -> tuple[str, str]:
+        payment_id = uuid.uuid4().hex
+        return payment_id, f"https://yoomoney.example/checkout/{payment_id}"
+
+    async def fake_status(yookassa_payment_id: str) -> str:
+        return payment_status
+
+    PaymentService._create_yookassa_payment = staticmethod(fake_create)
+    PaymentService._fetch_yookassa_status = staticmethod(fake_status)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
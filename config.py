@@ -1,15 +1,23 @@
 """
-Конфигурация приложения
+Конфигурация приложения.
+
+Несколько ботов (брендов) в одном процессе: у каждого свой профиль настроек (токен, БД, YooKassa,
+администраторы...). settings — прокси к профилю бота, чей апдейт или задача сейчас выполняется
+(см. use_bot); вне их — к основному профилю из окружения.
 """
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import Optional
+from typing import Iterator, Optional
+import json
 
 
 class Settings(BaseSettings):
     """Настройки приложения"""
     
     # Telegram Bot
+    BOT_NAME: str = "default"  # имя профиля: в логах, id задач планировщика, ключах кэшей
     BOT_TOKEN: str
     BOT_USERNAME: Optional[str] = None
     
@@ -43,11 +51,67 @@ class Settings(BaseSettings):
     # Admin (можно указать несколько через запятую)
     ADMIN_TELEGRAM_IDS: Optional[str] = None  # Например: "95714127,6172571059"
     
+    # Ключ перемешивания реферальных кодов (services/referral_codes.py): без него код нельзя
+    # превратить обратно в telegram_id. Если не задан — выводится из BOT_TOKEN.
+    # Смена ключа меняет коды только новых пользователей: выданные хранятся в БД
+    REFERRAL_CODE_SECRET: Optional[str] = None
+    
+    # Несколько ботов в одном процессе: JSON-файл со списком профилей. Каждый профиль — отличия
+    # от настроек окружения (BOT_NAME, BOT_TOKEN, DATABASE_URL или DATA_DIR, YOOKASSA_*, ADMIN_TELEGRAM_IDS...).
+    # У каждого бота своя БД. Если не задан — один бот с настройками окружения
+    BOTS_FILE: Optional[str] = None
+
+    # Режим работы процессов: при RUN_SCHEDULER=false main.py только обрабатывает обновления,
+    # а фоновые задачи и рассылки выполняет отдельный процесс worker.py
+    RUN_SCHEDULER: bool = True
+
+    # Порты HTTP health-check (/health); если не заданы — сервер не поднимается
+    HEALTH_PORT: Optional[int] = None  # main.py
+    WORKER_HEALTH_PORT: Optional[int] = None  # worker.py
+
+    # Диагностика SQL: порог медленного запроса (мс) и сколько раз один запрос
+    # с разными параметрами за апдейт считать подозрением на N+1
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Логирование: запись в очередь, вывод — отдельным потоком. LOG_FORMAT: json (строка JSON на запись) или text.
+    # LOG_RATE_LIMITS — не больше N записей в секунду ниже WARNING от логгера и его потомков, лишние отбрасываются
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_RATE_LIMITS: dict[str, float] = {"aiogram.event": 20, "handlers": 20}
+    LOG_QUEUE_SIZE: int = 10_000
+
+    # Watchdog event loop: блокировка дольше LOOP_LAG_STACK_THRESHOLD_MS пишет в лог стек заблокировавшего кода,
+    # задержка от LOOP_LAG_READY_THRESHOLD_MS переводит /ready в 503
+    LOOP_LAG_STACK_THRESHOLD_MS: float = 500.0
+    LOOP_LAG_READY_THRESHOLD_MS: float = 1000.0
+
+    # Обработка апдейтов: одного чата — по очереди, разных чатов — параллельно, не больше UPDATE_CONCURRENCY
+    # одновременно; апдейт, обрабатываемый дольше UPDATE_TIMEOUT секунд, отменяется
+    UPDATE_CONCURRENCY: int = 64
+    UPDATE_TIMEOUT: float = 120.0
+
+    # Процессы для рендеринга больших отчётов и выгрузок (0 — рендерить в основном процессе)
+    RENDER_WORKERS: int = 1
+
+    # Антифлуд: токен-бакеты на пользователя — скорость (событий в секунду) и запас на всплеск.
+    # FSM — ответы в анкете оформления подписки; администраторы не ограничиваются
+    THROTTLE_ENABLED: bool = True
+    THROTTLE_MESSAGE_RATE: float = 1.0
+    THROTTLE_MESSAGE_BURST: int = 5
+    THROTTLE_CALLBACK_RATE: float = 2.0
+    THROTTLE_CALLBACK_BURST: int = 6
+    THROTTLE_FSM_RATE: float = 1.0
+    THROTTLE_FSM_BURST: int = 3
+
     # Ссылки на каталоги (Яндекс.Диск) — показываются подписчикам
     CATALOG_LINK_1: str = "https://disk.yandex.ru/i/32sab_Y5hmPQHA"  # масляные духи
     CATALOG_LINK_2: str = "https://disk.yandex.ru/i/uWosSxMs_S2TMw"  # дубайские оригиналы
     CATALOG_NAME_1: str = "Масляные духи"
     CATALOG_NAME_2: str = "Дубайские оригиналы"
+    # Поиск по каталогу в inline-режиме: результатов на страницу и сколько Telegram кэширует ответ (с)
+    CATALOG_INLINE_PAGE_SIZE: int = 20
+    CATALOG_INLINE_CACHE_TIME: int = 300
     
     # Базовые значения статистики (до удаления БД; после /seed_subscribers подписчиков 903)
     STATS_BASELINE_TOTAL_USERS: int = 903
@@ -59,6 +123,9 @@ class Settings(BaseSettings):
     STATS_BASELINE_REFERRALS: int = 7
     STATS_BASELINE_PAID_REFERRALS: int = 0
     
+    # Разобранный ADMIN_TELEGRAM_IDS (заполняется при первом обращении к admin_ids)
+    _admin_ids: Optional[frozenset] = None
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -72,6 +139,19 @@ class Settings(BaseSettings):
             return f"sqlite+aiosqlite://{path}" if path.startswith("/") else f"sqlite+aiosqlite:///{path}"
         return self.DATABASE_URL
 
+    @property
+    def admin_ids(self) -> frozenset:
+        """ID администраторов; строка разбирается один раз. Некорректный список — нет администраторов"""
+        if self._admin_ids is None:
+            try:
+                ids = frozenset(
+                    int(id_str.strip()) for id_str in (self.ADMIN_TELEGRAM_IDS or "").split(",") if id_str.strip()
+                )
+            except ValueError:
+                ids = frozenset()
+            self._admin_ids = ids
+        return self._admin_ids
+
     @property
     def is_test_mode(self) -> bool:
         """Автоматически определяем тестовый режим по префиксу ключа"""
@@ -81,4 +161,53 @@ class Settings(BaseSettings):
         return self.YOOKASSA_SECRET_KEY.startswith('test_')
 
 
-settings = Settings()
+_default_settings = Settings()
+_current_settings: ContextVar[Settings] = ContextVar("current_settings", default=_default_settings)
+
+
+class _SettingsProxy:
+    """Настройки текущего бота: чтение и запись атрибутов перенаправляются в его профиль"""
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        return getattr(_current_settings.get(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(_current_settings.get(), name, value)
+
+
+settings = _SettingsProxy()
+
+
+def load_bot_profiles() -> list[Settings]:
+    """
+    Профили ботов процесса: из BOTS_FILE или единственный профиль окружения.
+    Имена, токены и БД профилей должны различаться
+    """
+    if not _default_settings.BOTS_FILE:
+        return [_default_settings]
+    with open(_default_settings.BOTS_FILE, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{_default_settings.BOTS_FILE}: expected a non-empty list of bot profiles")
+    profiles = [Settings(**{"BOT_NAME": f"bot{i}", **entry}) for i, entry in enumerate(entries, 1)]
+    for field in ("BOT_NAME", "BOT_TOKEN", "database_url"):
+        values = [getattr(profile, field) for profile in profiles]
+        if len(set(values)) != len(values):
+            raise ValueError(f"{_default_settings.BOTS_FILE}: {field} must be unique per bot")
+    return profiles
+
+
+@contextmanager
+def use_bot(profile: Settings) -> Iterator[Settings]:
+    """Выполнять код с настройками (и БД) данного бота"""
+    token = _current_settings.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_settings.reset(token)
+
+
+def current_bot_name() -> str:
+    """Имя профиля текущего бота — для ключей in-memory кэшей"""
+    return _current_settings.get().BOT_NAME
@@ -1,7 +1,7 @@
 """
 Database package
 """
-from .base import Base, get_session, init_db
+from .base import Base, dispose_engines, get_engine, get_session, init_db
 from .models import (
     User,
     Tariff,
@@ -9,10 +9,15 @@ from .models import (
     Payment,
     Referral,
     ReferralBonus,
+    ReportSnapshot,
+    CachedDocument,
+    CatalogItem,
 )
 
 __all__ = [
     "Base",
+    "get_engine",
+    "dispose_engines",
     "get_session",
     "init_db",
     "User",
@@ -21,4 +26,7 @@ __all__ = [
     "Payment",
     "Referral",
     "ReferralBonus",
+    "ReportSnapshot",
+    "CachedDocument",
+    "CatalogItem",
 ]
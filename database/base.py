@@ -1,40 +1,137 @@
 """
-Базовая конфигурация БД
+Базовая конфигурация БД.
+Движок создаётся лениво при первом обращении (get_engine), а не при импорте модуля.
+У каждого бота своя БД (settings.database_url его профиля) — движки кэшируются по URL.
 """
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from hashlib import sha1
+from typing import Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, event, func, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from config import settings
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,
-    future=True,
-)
+# URL БД -> движок и фабрика сессий
+_engines: dict[str, AsyncEngine] = {}
+_sessionmakers: dict[str, async_sessionmaker] = {}
 
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
+# Версия схемы хранится вне Base.metadata: отпечаток DDL всех моделей
+_schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("version", String(64), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
 )
 
 
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    """WAL и ожидание блокировки: БД одновременно используют бот и воркер"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def get_engine() -> AsyncEngine:
+    """Движок БД текущего бота (создаётся при первом вызове)"""
+    url = settings.database_url
+    engine = _engines.get(url)
+    if engine is None:
+        engine = create_async_engine(
+            url,
+            echo=False,
+            future=True,
+        )
+        if engine.dialect.name == "sqlite":
+            event.listen(engine.sync_engine, "connect", _set_sqlite_pragma)
+        _sessionmakers[url] = async_sessionmaker(
+            engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+        _engines[url] = engine
+    return engine
+
+
+async def dispose_engines():
+    """Закрыть соединения всех движков (при остановке процесса)"""
+    for engine in _engines.values():
+        await engine.dispose()
+
+
 class Base(DeclarativeBase):
     """Базовый класс для моделей"""
     pass
 
 
+def upsert(model):
+    """
+    INSERT с поддержкой ON CONFLICT (on_conflict_do_nothing / on_conflict_do_update)
+    для диалекта текущего движка
+    """
+    if get_engine().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
 async def get_session() -> AsyncSession:
-    """Получить сессию БД"""
-    async with AsyncSessionLocal() as session:
+    """Получить сессию БД текущего бота"""
+    get_engine()
+    async with _sessionmakers[settings.database_url]() as session:
         try:
             yield session
         finally:
             await session.close()
 
 
-async def init_db():
-    """Инициализация БД - создание таблиц"""
+def schema_fingerprint(dialect) -> str:
+    """Отпечаток схемы: DDL всех таблиц и индексов моделей для данного диалекта"""
+    from sqlalchemy.schema import CreateIndex, CreateTable
+
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(str(CreateTable(table).compile(dialect=dialect)))
+        parts.extend(sorted(str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes))
+    return sha1("\n".join(parts).encode()).hexdigest()[:16]
+
+
+async def init_db(force: bool = False) -> bool:
+    """
+    Инициализация БД - создание таблиц и индексов.
+    Если сохранённая версия схемы совпадает с текущими моделями, DDL не выполняется.
+    Returns: True, если схема обновлялась
+    """
+    import database.models  # noqa: F401 — регистрирует модели в Base.metadata
+
+    engine = get_engine()
+    version = schema_fingerprint(engine.dialect)
     async with engine.begin() as conn:
+        if not force and await conn.run_sync(_stored_schema_version) == version:
+            return False
         await conn.run_sync(Base.metadata.create_all)
+        # create_all не добавляет новые индексы в уже существующие таблицы
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_store_schema_version, version)
+    return True
+
+
+def _stored_schema_version(connection) -> Optional[str]:
+    if not inspect(connection).has_table(_schema_version.name):
+        return None
+    return connection.execute(select(_schema_version.c.version).where(_schema_version.c.id == 1)).scalar()
+
+
+def _store_schema_version(connection, version: str):
+    _schema_version.create(connection, checkfirst=True)
+    connection.execute(delete(_schema_version))
+    connection.execute(insert(_schema_version).values(id=1, version=version))
+
+
+def _create_missing_indexes(connection):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
@@ -11,6 +11,7 @@ from sqlalchemy import (
     Numeric,
     Enum as SQLEnum,
     Text,
+    LargeBinary,
     Index,
 )
 from sqlalchemy.orm import relationship
@@ -124,6 +125,11 @@ class Subscription(Base):
         Index("idx_subscription_user_id", "user_id"),
         Index("idx_subscription_status", "status"),
         Index("idx_subscription_end_date", "end_date"),
+        # Keyset-пагинация активных подписчиков и поиск более поздней подписки пользователя
+        Index("idx_subscription_status_end_date", "status", "end_date", "id"),
+        Index("idx_subscription_user_status_end_date", "user_id", "status", "end_date"),
+        # История пользователя: keyset-пагинация по (created_at, id)
+        Index("idx_subscription_user_created", "user_id", "created_at", "id"),
     )
 
 
@@ -203,3 +209,46 @@ class ReferralBonus(Base):
         Index("idx_bonus_user_id", "user_id"),
         Index("idx_bonus_status", "status"),
     )
+
+
+class ReportSnapshot(Base):
+    """Снимок данных для инкрементальных отчётов (одна запись на вид отчёта)"""
+    __tablename__ = "report_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), unique=True, nullable=False)  # active_subscribers
+    payload = Column(LargeBinary, nullable=False)  # JSON, сжатый zlib
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class CachedDocument(Base):
+    """Загруженный в Telegram документ: file_id для повторной отправки без генерации и загрузки"""
+    __tablename__ = "cached_documents"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # <вид документа>:<версия данных>, например subscribers_txt:3f2a...
+    cache_key = Column(String(255), unique=True, nullable=False)
+    file_id = Column(String(255), nullable=False)
+    caption = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CatalogItem(Base):
+    """Позиция каталога парфюмерии (загружается из CSV / JSON, ищется через inline-режим)"""
+    __tablename__ = "catalog_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sku = Column(String(64), unique=True, nullable=False)  # артикул из файла каталога
+    name = Column(String(255), nullable=False)
+    brand = Column(String(255), nullable=True)
+    category = Column(String(255), nullable=True)  # Масляные духи, Дубайские оригиналы...
+    volume = Column(String(50), nullable=True)  # 30 мл, 6 мл...
+    price = Column(Numeric(10, 2), nullable=True)
+    description = Column(Text, nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
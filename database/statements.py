@@ -0,0 +1,60 @@
+"""
+Реестр готовых запросов для самых частых выборок.
+Запрос строится один раз при импорте, значения передаются параметрами:
+await session.execute(statements.USER_BY_TELEGRAM_ID, {"telegram_id": telegram_id})
+
+select() не собирается заново на каждый вызов, а ключ кэша компиляции SQLAlchemy вычисляется
+один раз и запоминается на объекте запроса. Каждый запрос помечен именем (execution option
+statement_name) — по нему monitoring/sql.py считает попадания в кэш компиляции.
+"""
+from sqlalchemy import bindparam, select
+from sqlalchemy.sql import Executable
+
+from database.models import Payment, PaymentStatus, Subscription, SubscriptionStatus, Tariff, User
+
+# Имя запроса -> запрос
+REGISTRY: dict[str, Executable] = {}
+
+
+def register(name: str, stmt: Executable) -> Executable:
+    """Добавить запрос в реестр под именем name"""
+    if name in REGISTRY:
+        raise ValueError(f"Statement {name!r} is already registered")
+    stmt = stmt.execution_options(statement_name=name)
+    REGISTRY[name] = stmt
+    return stmt
+
+
+# Пользователь по telegram_id; параметры: telegram_id
+USER_BY_TELEGRAM_ID = register(
+    "user_by_telegram_id",
+    select(User).where(User.telegram_id == bindparam("telegram_id")),
+)
+
+# Активная подписка пользователя — последняя по дате окончания; параметры: user_id, now
+ACTIVE_SUBSCRIPTION_BY_USER = register(
+    "active_subscription_by_user",
+    select(Subscription)
+    .where(
+        Subscription.user_id == bindparam("user_id"),
+        Subscription.status == SubscriptionStatus.ACTIVE,
+        Subscription.end_date > bindparam("now"),
+    )
+    .order_by(Subscription.end_date.desc())
+    .limit(1),
+)
+
+# Тариф по id; параметры: tariff_id
+TARIFF_BY_ID = register(
+    "tariff_by_id",
+    select(Tariff).where(Tariff.id == bindparam("tariff_id")),
+)
+
+# Ожидающий оплаты платёж по подписке; параметры: subscription_id
+PENDING_PAYMENT_BY_SUBSCRIPTION = register(
+    "pending_payment_by_subscription",
+    select(Payment).where(
+        Payment.subscription_id == bindparam("subscription_id"),
+        Payment.status == PaymentStatus.PENDING,
+    ),
+)
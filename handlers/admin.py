@@ -13,7 +13,11 @@ from services.referral_service import ReferralService
 from database.models import SubscriptionStatus, PaymentStatus
 from sqlalchemy import select, func
 from database.models import User, Subscription, Payment, Referral
-from config import settings
+from config import settings, current_bot_name
+from monitoring.sql import query_budget
+from services.cache import TTLCache
+from services.pagination import encode_cursor, decode_cursor
+import html
 import logging
 from datetime import datetime
 
@@ -23,58 +27,96 @@ router = Router()
 
 def is_admin(user_id: int) -> bool:
     """Проверка, является ли пользователь администратором"""
-    if not settings.ADMIN_TELEGRAM_IDS:
-        return False
-    try:
-        admin_ids = [int(id_str.strip()) for id_str in settings.ADMIN_TELEGRAM_IDS.split(',')]
-        return user_id in admin_ids
-    except (ValueError, TypeError):
-        return False
+    return user_id in settings.admin_ids
+
+
+async def _aggregates(session: AsyncSession, **queries) -> dict:
+    """
+    Несколько агрегатов одним запросом: каждый select() становится скалярным подзапросом.
+    Returns: {имя: значение}
+    """
+    stmt = select(*(query.scalar_subquery().label(name) for name, query in queries.items()))
+    result = await session.execute(stmt)
+    return result.one()._asdict()
+
+
+def get_admin_menu_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура главного меню админ панели"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📊 Статистика", callback_data="admin_stats")],
+        [InlineKeyboardButton(text="👥 Пользователи", callback_data="admin_users")],
+        [InlineKeyboardButton(text="💳 Платежи", callback_data="admin_payments")],
+        [InlineKeyboardButton(text="📦 Подписки", callback_data="admin_subscriptions")],
+        [InlineKeyboardButton(text="🎁 Рефералы", callback_data="admin_referrals")],
+        [InlineKeyboardButton(text="📋 Список подписчиков", callback_data="admin_subscribers_list")],
+        [InlineKeyboardButton(text="📥 Выгрузить подписчиков (TXT)", callback_data="admin_export_subscribers_txt")],
+        [
+            InlineKeyboardButton(text="📥 CSV", callback_data="admin_export_subscribers_csv"),
+            InlineKeyboardButton(text="📥 JSONL", callback_data="admin_export_subscribers_jsonl"),
+        ],
+    ])
 
 
 @router.message(Command("seed_subscribers"))
+@query_budget(4)
 async def cmd_seed_subscribers(message: Message):
-    """Восстановить список подписчиков (только для админов)."""
+    """
+    Загрузить подписчиков (только для админов).
+    Без файла — встроенный список; с приложенным CSV / JSONL (подпись /seed_subscribers
+    или ответ командой на сообщение с файлом) — импорт из файла. «/seed_subscribers dry» — только проверка.
+    """
     if not is_admin(message.from_user.id):
         await message.answer("❌ Нет доступа")
         return
-    await message.answer("⏳ Загружаю список подписчиков...")
+    text = message.text or message.caption or ""
+    dry_run = any(arg in ("dry", "--dry-run") for arg in text.split()[1:])
+    document = message.document or (message.reply_to_message.document if message.reply_to_message else None)
+
+    await message.answer(
+        f"⏳ {'Проверяю' if dry_run else 'Загружаю'} "
+        f"{'файл ' + html.escape(document.file_name or '') if document else 'список подписчиков'}..."
+    )
     try:
         from services.seed_restore import run_seed
+        from services.bulk_import import BulkImportService, detect_format
+        import io
         async for session in get_session():
-            result = await run_seed(session)
+            if document:
+                buffer = await message.bot.download(document)
+                stream = io.TextIOWrapper(buffer, encoding="utf-8-sig", newline="")
+                result = (await BulkImportService.import_stream(
+                    session, stream, detect_format(document.file_name or ""), dry_run=dry_run,
+                )).as_dict()
+            else:
+                result = await run_seed(session, dry_run=dry_run)
             text = (
-                f"✅ Готово.\n\n"
+                f"✅ {'Проверка завершена (ничего не записано)' if dry_run else 'Готово'}.\n\n"
+                f"Строк: {result['processed']}\n"
                 f"Добавлено подписок: {result['added']}\n"
+                f"Новых пользователей: {result['users_created']}\n"
                 f"Пропущено (уже есть): {result['skipped']}"
             )
             if result["errors"]:
-                text += f"\n\nОшибки ({len(result['errors'])}):\n" + "\n".join(result["errors"][:10])
+                errors = [html.escape(error) for error in result["errors"][:10]]
+                text += f"\n\nОшибки ({len(result['errors'])}):\n" + "\n".join(errors)
                 if len(result["errors"]) > 10:
                     text += f"\n... и ещё {len(result['errors']) - 10}"
             await message.answer(text)
             break
     except Exception as e:
         logger.exception("seed_subscribers")
-        await message.answer(f"❌ Ошибка: {e}")
+        await message.answer(f"❌ Ошибка: {html.escape(str(e))}")
 
 
 @router.message(Command("admin"))
+@query_budget(0)
 async def admin_menu(message: Message):
     """Главное меню админ панели"""
     if not is_admin(message.from_user.id):
         await message.answer("❌ У вас нет доступа к админ панели")
         return
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📊 Статистика", callback_data="admin_stats")],
-        [InlineKeyboardButton(text="👥 Пользователи", callback_data="admin_users")],
-        [InlineKeyboardButton(text="💳 Платежи", callback_data="admin_payments")],
-        [InlineKeyboardButton(text="📦 Подписки", callback_data="admin_subscriptions")],
-        [InlineKeyboardButton(text="🎁 Рефералы", callback_data="admin_referrals")],
-        [InlineKeyboardButton(text="📋 Список подписчиков", callback_data="admin_subscribers_list")],
-        [InlineKeyboardButton(text="📥 Выгрузить подписчиков (TXT)", callback_data="admin_export_subscribers_txt")],
-    ])
+    keyboard = get_admin_menu_keyboard()
     
     await message.answer(
         "🔐 <b>Админ панель</b>\n\n"
@@ -85,6 +127,7 @@ async def admin_menu(message: Message):
 
 
 @router.callback_query(F.data == "admin_stats")
+@query_budget(1)
 async def admin_stats(callback: CallbackQuery):
     """Общая статистика"""
     if not is_admin(callback.from_user.id):
@@ -92,58 +135,38 @@ async def admin_stats(callback: CallbackQuery):
         return
     
     async for session in get_session():
-        # Общее количество пользователей
-        stmt = select(func.count(User.id))
-        result = await session.execute(stmt)
-        total_users = result.scalar() or 0
-        
-        # Активные подписки
         now = datetime.utcnow()
-        stmt = select(func.count(Subscription.id)).where(
-            Subscription.status == SubscriptionStatus.ACTIVE,
-            Subscription.end_date > now
+        stats = await _aggregates(
+            session,
+            total_users=select(func.count(User.id)),
+            active_subscriptions=select(func.count(Subscription.id)).where(
+                Subscription.status == SubscriptionStatus.ACTIVE,
+                Subscription.end_date > now
+            ),
+            total_subscriptions=select(func.count(Subscription.id)),
+            successful_payments=select(func.count(Payment.id)).where(
+                Payment.status == PaymentStatus.SUCCEEDED
+            ),
+            total_revenue=select(func.sum(Payment.amount)).where(
+                Payment.status == PaymentStatus.SUCCEEDED
+            ),
+            total_referrals=select(func.count(Referral.id)),
+            paid_referrals=select(func.count(Referral.id)).where(
+                Referral.has_paid_subscription == True
+            ),
+            # Уникальных пользователей, которые когда-либо покупали подписку
+            unique_subscribers=select(func.count(func.distinct(Subscription.user_id))).where(
+                Subscription.status.in_([SubscriptionStatus.ACTIVE, SubscriptionStatus.EXPIRED])
+            ),
         )
-        result = await session.execute(stmt)
-        active_subscriptions = result.scalar() or 0
-        
-        # Всего подписок
-        stmt = select(func.count(Subscription.id))
-        result = await session.execute(stmt)
-        total_subscriptions = result.scalar() or 0
-        
-        # Успешные платежи
-        stmt = select(func.count(Payment.id)).where(
-            Payment.status == PaymentStatus.SUCCEEDED
-        )
-        result = await session.execute(stmt)
-        successful_payments = result.scalar() or 0
-        
-        # Общая сумма платежей
-        stmt = select(func.sum(Payment.amount)).where(
-            Payment.status == PaymentStatus.SUCCEEDED
-        )
-        result = await session.execute(stmt)
-        total_revenue = result.scalar() or 0.0
-        total_revenue = float(total_revenue) if total_revenue else 0.0
-        
-        # Всего рефералов
-        stmt = select(func.count(Referral.id))
-        result = await session.execute(stmt)
-        total_referrals = result.scalar() or 0
-        
-        # Оплаченные рефералы
-        stmt = select(func.count(Referral.id)).where(
-            Referral.has_paid_subscription == True
-        )
-        result = await session.execute(stmt)
-        paid_referrals = result.scalar() or 0
-        
-        # Уникальных пользователей, которые когда-либо покупали подписку
-        stmt = select(func.count(func.distinct(Subscription.user_id))).where(
-            Subscription.status.in_([SubscriptionStatus.ACTIVE, SubscriptionStatus.EXPIRED])
-        )
-        result = await session.execute(stmt)
-        unique_subscribers = result.scalar() or 0
+        total_users = stats["total_users"] or 0
+        active_subscriptions = stats["active_subscriptions"] or 0
+        total_subscriptions = stats["total_subscriptions"] or 0
+        successful_payments = stats["successful_payments"] or 0
+        total_revenue = float(stats["total_revenue"] or 0.0)
+        total_referrals = stats["total_referrals"] or 0
+        paid_referrals = stats["paid_referrals"] or 0
+        unique_subscribers = stats["unique_subscribers"] or 0
         
         # Базовые значения (из конфига): новые данные из БД добавляются к ним
         total_users += settings.STATS_BASELINE_TOTAL_USERS
@@ -182,6 +205,7 @@ async def admin_stats(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "admin_users")
+@query_budget(1)
 async def admin_users(callback: CallbackQuery):
     """Статистика по пользователям"""
     if not is_admin(callback.from_user.id):
@@ -191,28 +215,26 @@ async def admin_users(callback: CallbackQuery):
     async for session in get_session():
         # Новые пользователи за последние 7 дней
         week_ago = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        stmt = select(func.count(User.id)).where(
-            User.created_at >= week_ago
-        )
-        result = await session.execute(stmt)
-        new_users_week = result.scalar() or 0
-        
         # Новые пользователи за последние 30 дней
         month_ago = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        stmt = select(func.count(User.id)).where(
-            User.created_at >= month_ago
+        stats = await _aggregates(
+            session,
+            new_users_week=select(func.count(User.id)).where(
+                User.created_at >= week_ago
+            ),
+            new_users_month=select(func.count(User.id)).where(
+                User.created_at >= month_ago
+            ),
+            # Пользователи с заполненным профилем
+            users_with_profile=select(func.count(User.id)).where(
+                User.surname.isnot(None),
+                User.name.isnot(None),
+                User.phone.isnot(None)
+            ),
         )
-        result = await session.execute(stmt)
-        new_users_month = result.scalar() or 0
-        
-        # Пользователи с заполненным профилем
-        stmt = select(func.count(User.id)).where(
-            User.surname.isnot(None),
-            User.name.isnot(None),
-            User.phone.isnot(None)
-        )
-        result = await session.execute(stmt)
-        users_with_profile = result.scalar() or 0
+        new_users_week = stats["new_users_week"] or 0
+        new_users_month = stats["new_users_month"] or 0
+        users_with_profile = stats["users_with_profile"] or 0
         
         text = (
             f"👥 <b>Статистика пользователей</b>\n\n"
@@ -233,6 +255,7 @@ async def admin_users(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "admin_payments")
+@query_budget(1)
 async def admin_payments(callback: CallbackQuery):
     """Статистика по платежам"""
     if not is_admin(callback.from_user.id):
@@ -240,58 +263,36 @@ async def admin_payments(callback: CallbackQuery):
         return
     
     async for session in get_session():
-        # Платежи по статусам
-        stmt = select(func.count(Payment.id)).where(
-            Payment.status == PaymentStatus.PENDING
-        )
-        result = await session.execute(stmt)
-        pending_payments = result.scalar() or 0
-        
-        stmt = select(func.count(Payment.id)).where(
-            Payment.status == PaymentStatus.SUCCEEDED
-        )
-        result = await session.execute(stmt)
-        succeeded_payments = result.scalar() or 0
-        
-        stmt = select(func.count(Payment.id)).where(
-            Payment.status == PaymentStatus.CANCELED
-        )
-        result = await session.execute(stmt)
-        canceled_payments = result.scalar() or 0
-        
-        # Платежи за сегодня
         today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        stmt = select(func.count(Payment.id)).where(
-            Payment.status == PaymentStatus.SUCCEEDED,
-            Payment.created_at >= today
-        )
-        result = await session.execute(stmt)
-        payments_today = result.scalar() or 0
-        
-        stmt = select(func.sum(Payment.amount)).where(
-            Payment.status == PaymentStatus.SUCCEEDED,
-            Payment.created_at >= today
-        )
-        result = await session.execute(stmt)
-        revenue_today = result.scalar() or 0.0
-        revenue_today = float(revenue_today) if revenue_today else 0.0
-        
-        # Платежи за месяц
         month_ago = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        stmt = select(func.count(Payment.id)).where(
-            Payment.status == PaymentStatus.SUCCEEDED,
-            Payment.created_at >= month_ago
-        )
-        result = await session.execute(stmt)
-        payments_month = result.scalar() or 0
-        
-        stmt = select(func.sum(Payment.amount)).where(
-            Payment.status == PaymentStatus.SUCCEEDED,
-            Payment.created_at >= month_ago
+        succeeded_today = (Payment.status == PaymentStatus.SUCCEEDED, Payment.created_at >= today)
+        succeeded_month = (Payment.status == PaymentStatus.SUCCEEDED, Payment.created_at >= month_ago)
+        stats = await _aggregates(
+            session,
+            # Платежи по статусам
+            pending_payments=select(func.count(Payment.id)).where(
+                Payment.status == PaymentStatus.PENDING
+            ),
+            succeeded_payments=select(func.count(Payment.id)).where(
+                Payment.status == PaymentStatus.SUCCEEDED
+            ),
+            canceled_payments=select(func.count(Payment.id)).where(
+                Payment.status == PaymentStatus.CANCELED
+            ),
+            # Платежи за сегодня
+            payments_today=select(func.count(Payment.id)).where(*succeeded_today),
+            revenue_today=select(func.sum(Payment.amount)).where(*succeeded_today),
+            # Платежи за месяц
+            payments_month=select(func.count(Payment.id)).where(*succeeded_month),
+            revenue_month=select(func.sum(Payment.amount)).where(*succeeded_month),
         )
-        result = await session.execute(stmt)
-        revenue_month = result.scalar() or 0.0
-        revenue_month = float(revenue_month) if revenue_month else 0.0
+        pending_payments = stats["pending_payments"] or 0
+        succeeded_payments = stats["succeeded_payments"] or 0
+        canceled_payments = stats["canceled_payments"] or 0
+        payments_today = stats["payments_today"] or 0
+        revenue_today = float(stats["revenue_today"] or 0.0)
+        payments_month = stats["payments_month"] or 0
+        revenue_month = float(stats["revenue_month"] or 0.0)
         
         text = (
             f"💳 <b>Статистика платежей</b>\n\n"
@@ -317,6 +318,7 @@ async def admin_payments(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "admin_subscriptions")
+@query_budget(1)
 async def admin_subscriptions(callback: CallbackQuery):
     """Статистика по подпискам"""
     if not is_admin(callback.from_user.id):
@@ -326,36 +328,32 @@ async def admin_subscriptions(callback: CallbackQuery):
     async for session in get_session():
         now = datetime.utcnow()
         
-        # Подписки по статусам
-        stmt = select(func.count(Subscription.id)).where(
-            Subscription.status == SubscriptionStatus.ACTIVE,
-            Subscription.end_date > now
-        )
-        result = await session.execute(stmt)
-        active = result.scalar() or 0
-        
-        stmt = select(func.count(Subscription.id)).where(
-            Subscription.status == SubscriptionStatus.EXPIRED
-        )
-        result = await session.execute(stmt)
-        expired = result.scalar() or 0
-        
-        stmt = select(func.count(Subscription.id)).where(
-            Subscription.status == SubscriptionStatus.PENDING
-        )
-        result = await session.execute(stmt)
-        pending = result.scalar() or 0
-        
         # Подписки, истекающие в ближайшие 7 дней
         week_later = now.replace(hour=23, minute=59, second=59, microsecond=999999) + \
                      __import__('datetime').timedelta(days=7)
-        stmt = select(func.count(Subscription.id)).where(
-            Subscription.status == SubscriptionStatus.ACTIVE,
-            Subscription.end_date >= now,
-            Subscription.end_date <= week_later
+        stats = await _aggregates(
+            session,
+            # Подписки по статусам
+            active=select(func.count(Subscription.id)).where(
+                Subscription.status == SubscriptionStatus.ACTIVE,
+                Subscription.end_date > now
+            ),
+            expired=select(func.count(Subscription.id)).where(
+                Subscription.status == SubscriptionStatus.EXPIRED
+            ),
+            pending=select(func.count(Subscription.id)).where(
+                Subscription.status == SubscriptionStatus.PENDING
+            ),
+            expiring_soon=select(func.count(Subscription.id)).where(
+                Subscription.status == SubscriptionStatus.ACTIVE,
+                Subscription.end_date >= now,
+                Subscription.end_date <= week_later
+            ),
         )
-        result = await session.execute(stmt)
-        expiring_soon = result.scalar() or 0
+        active = stats["active"] or 0
+        expired = stats["expired"] or 0
+        pending = stats["pending"] or 0
+        expiring_soon = stats["expiring_soon"] or 0
         
         text = (
             f"📦 <b>Статистика подписок</b>\n\n"
@@ -376,6 +374,7 @@ async def admin_subscriptions(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "admin_referrals")
+@query_budget(1)
 async def admin_referrals(callback: CallbackQuery):
     """Статистика по рефералам"""
     if not is_admin(callback.from_user.id):
@@ -383,17 +382,17 @@ async def admin_referrals(callback: CallbackQuery):
         return
     
     async for session in get_session():
-        # Всего реферальных связей
-        stmt = select(func.count(Referral.id))
-        result = await session.execute(stmt)
-        total = result.scalar() or 0
-        
-        # Оплатившие подписку
-        stmt = select(func.count(Referral.id)).where(
-            Referral.has_paid_subscription == True
+        stats = await _aggregates(
+            session,
+            # Всего реферальных связей
+            total=select(func.count(Referral.id)),
+            # Оплатившие подписку
+            paid=select(func.count(Referral.id)).where(
+                Referral.has_paid_subscription == True
+            ),
         )
-        result = await session.execute(stmt)
-        paid = result.scalar() or 0
+        total = stats["total"] or 0
+        paid = stats["paid"] or 0
         
         # Конверсия
         conversion = (paid / total * 100) if total > 0 else 0
@@ -416,21 +415,14 @@ async def admin_referrals(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "admin_back")
+@query_budget(0)
 async def admin_back(callback: CallbackQuery):
     """Вернуться в главное меню админ панели"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Нет доступа", show_alert=True)
         return
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📊 Статистика", callback_data="admin_stats")],
-        [InlineKeyboardButton(text="👥 Пользователи", callback_data="admin_users")],
-        [InlineKeyboardButton(text="💳 Платежи", callback_data="admin_payments")],
-        [InlineKeyboardButton(text="📦 Подписки", callback_data="admin_subscriptions")],
-        [InlineKeyboardButton(text="🎁 Рефералы", callback_data="admin_referrals")],
-        [InlineKeyboardButton(text="📋 Список подписчиков", callback_data="admin_subscribers_list")],
-        [InlineKeyboardButton(text="📥 Выгрузить подписчиков (TXT)", callback_data="admin_export_subscribers_txt")],
-    ])
+    keyboard = get_admin_menu_keyboard()
     
     await callback.message.edit_text(
         "🔐 <b>Админ панель</b>\n\n"
@@ -441,145 +433,158 @@ async def admin_back(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_export_subscribers_txt")
-async def admin_export_subscribers_txt(callback: CallbackQuery):
-    """Выгрузка списка активных подписчиков в TXT-файл в чат"""
+# callback_data кнопки выгрузки -> формат файла
+EXPORT_FORMATS = {
+    "admin_export_subscribers_txt": "txt",
+    "admin_export_subscribers_csv": "csv",
+    "admin_export_subscribers_jsonl": "jsonl",
+}
+
+
+@router.callback_query(F.data.in_(EXPORT_FORMATS))
+@query_budget(5)
+async def admin_export_subscribers(callback: CallbackQuery):
+    """
+    Выгрузка списка активных подписчиков в файл (TXT / CSV / JSONL) в чат.
+    Пока данные не менялись, повторно отправляется уже загруженный файл по file_id.
+    """
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Нет доступа", show_alert=True)
         return
     await callback.answer("⏳ Формирую файл...")
-    from io import BytesIO
-    from aiogram.types import BufferedInputFile
-    from services.tariff_service import TariffService
+    from aiogram.exceptions import TelegramBadRequest
+    from services.export_service import ExportService, SpooledInputFile
+    from services.document_cache import DocumentCacheService
 
+    fmt = EXPORT_FORMATS[callback.data]
     async for session in get_session():
-        subscriptions = await SubscriptionService.get_all_active_subscriptions(session=session)
-        lines = []
-        for sub in subscriptions:
-            stmt = select(User).where(User.id == sub.user_id)
-            result = await session.execute(stmt)
-            user = result.scalar_one_or_none()
-            tariff = await TariffService.get_tariff_by_id(session=session, tariff_id=sub.tariff_id)
-            tariff_name = tariff.name if tariff else "—"
-            end_str = sub.end_date.strftime("%d.%m.%Y") if sub.end_date else "—"
-            start_str = sub.start_date.strftime("%d.%m.%Y") if sub.start_date else "—"
-            fio = " ".join(filter(None, [user.surname, user.name, user.patronymic])).strip() if user else "—"
-            if not fio and user:
-                fio = f"{user.first_name or ''} {user.last_name or ''}".strip() or f"ID {user.telegram_id}"
-            phone = user.phone or "—" if user else "—"
-            tg_id = user.telegram_id if user else "—"
-            block = (
-                f"👤 {fio}\n"
-                f"📱 Телефон: {phone}\n"
-                f"🆔 Telegram ID: {tg_id}\n"
-                f"📦 Тариф: {tariff_name}\n"
-                f"📅 Активация: {start_str}\n"
-                f"📅 Окончание: {end_str}\n"
-                f"━━━━━━━━━━━━━━━━━━━━\n"
+        version = await DocumentCacheService.get_subscribers_data_version(session=session)
+        cache_key = DocumentCacheService.build_key(f"subscribers_{fmt}", version)
+        cached = await DocumentCacheService.get(session=session, cache_key=cache_key)
+        if cached:
+            try:
+                await callback.message.answer_document(document=cached.file_id, caption=cached.caption)
+                break
+            except TelegramBadRequest as e:
+                logger.warning("Cached export %s rejected by Telegram: %s", cache_key, e)
+                await DocumentCacheService.invalidate(session=session, cache_key=cache_key)
+
+        file, count = await ExportService.export_active_subscribers(session=session, fmt=fmt)
+        caption = f"📥 Активных подписчиков: {count}"
+        try:
+            doc = SpooledInputFile(file, filename=ExportService.build_filename(fmt))
+            sent = await callback.message.answer_document(document=doc, caption=caption)
+        finally:
+            file.close()
+        if sent.document:
+            await DocumentCacheService.save(
+                session=session,
+                cache_key=cache_key,
+                file_id=sent.document.file_id,
+                caption=caption,
             )
-            lines.append(block)
-        content = "\n".join(lines) if lines else "Нет активных подписок.\n"
-        filename = f"subscribers_{datetime.utcnow().strftime('%Y-%m-%d_%H-%M')}.txt"
-        file_bytes = content.encode("utf-8")
-        doc = BufferedInputFile(file_bytes, filename=filename)
-        await callback.message.answer_document(document=doc, caption=f"📥 Активных подписчиков: {len(lines)}")
         break
 
 
+# Карточек подписчиков на одной странице списка
+SUBSCRIBERS_PAGE_SIZE = 10
+# Кэш страниц списка: ключ — (бот, курсор), значение — (rows, has_more)
+_subscribers_pages = TTLCache(ttl=60, maxsize=512)
+
+
+def _render_subscriber_card(row) -> str:
+    fio = f"{row.surname or ''} {row.name or ''} {row.patronymic or ''}".strip()
+    if not fio:
+        fio = f"{row.first_name or ''} {row.last_name or ''}".strip() or f"ID: {row.telegram_id}"
+    start_date = row.start_date.strftime("%d.%m.%Y") if row.start_date else "—"
+    end_date = row.end_date.strftime("%d.%m.%Y") if row.end_date else "—"
+    return (
+        f"👤 <b>{html.escape(fio)}</b>\n"
+        f"📱 Телефон: {html.escape(row.phone or '—')}\n"
+        f"🆔 Telegram ID: {row.telegram_id}\n"
+        f"📦 Тариф: {html.escape(row.tariff_name or 'Неизвестный тариф')}\n"
+        f"📅 Активация: {start_date}\n"
+        f"📅 Окончание: {end_date}\n"
+        f"━━━━━━━━━━━━━━━━━━━━\n\n"
+    )
+
+
 @router.callback_query(F.data == "admin_subscribers_list")
+@router.callback_query(F.data.startswith("admin_subs:"))
+@query_budget(2)
 async def admin_subscribers_list(callback: CallbackQuery):
-    """Список всех подписчиков с их карточками"""
+    """
+    Список подписчиков с их карточками, постранично.
+    callback_data: admin_subscribers_list — первая страница,
+    admin_subs:n:<page>:<cursor> — следующая, admin_subs:p:<page>:<cursor> — предыдущая
+    """
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Нет доступа", show_alert=True)
         return
     
+    direction, page, cursor = "first", 1, None
+    if callback.data.startswith("admin_subs:"):
+        try:
+            _, direction, page_str, cursor_str = callback.data.split(":", 3)
+            page, cursor = int(page_str), decode_cursor(cursor_str)
+        except ValueError:
+            await callback.answer("Некорректная страница", show_alert=True)
+            return
+    
     async for session in get_session():
-        now = datetime.utcnow()
-        
-        # Получаем уникальных пользователей с активными подписками (берем самую свежую подписку для каждого)
-        stmt = select(
-            User,
-            Subscription
-        ).join(Subscription).where(
-            Subscription.status == SubscriptionStatus.ACTIVE,
-            Subscription.end_date > now
-        ).order_by(Subscription.end_date.desc())
-        result = await session.execute(stmt)
-        all_subscriptions = result.all()
-        
-        # Группируем по user_id, оставляя только самую свежую подписку для каждого пользователя
-        unique_users = {}
-        for user, subscription in all_subscriptions:
-            if user.id not in unique_users:
-                unique_users[user.id] = (user, subscription)
-        
-        if not unique_users:
-            text = "📋 <b>Список подписчиков</b>\n\n❌ Нет активных подписчиков"
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back")],
-            ])
-            await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
-            await callback.answer()
-            break
-        
-        # Формируем список подписчиков
-        from services.tariff_service import TariffService
-        
-        subscribers_text = f"📋 <b>Список подписчиков</b>\n\n"
-        subscribers_text += f"Всего активных подписчиков: <b>{len(unique_users)}</b>\n\n"
-        subscribers_text += "━━━━━━━━━━━━━━━━━━━━\n\n"
-        
-        # Сортируем по дате окончания подписки (самые свежие первыми)
-        sorted_users = sorted(unique_users.values(), key=lambda x: x[1].end_date, reverse=True)
-        
-        for user, subscription in sorted_users:
-            # Загружаем тариф
-            tariff = await TariffService.get_tariff_by_id(
+        total = _subscribers_pages.get((current_bot_name(), "total"))
+        if total is None:
+            total = await SubscriptionService.count_active_subscribers(session=session)
+            _subscribers_pages.set((current_bot_name(), "total"), total)
+        
+        cache_key = (current_bot_name(), direction, cursor)
+        cached = _subscribers_pages.get(cache_key)
+        if cached is None:
+            cached = await SubscriptionService.get_active_subscribers_page(
                 session=session,
-                tariff_id=subscription.tariff_id,
+                limit=SUBSCRIBERS_PAGE_SIZE,
+                after=cursor if direction == "n" else None,
+                before=cursor if direction == "p" else None,
             )
-            tariff_name = tariff.name if tariff else "Неизвестный тариф"
-            
-            # Формируем карточку
-            fio = f"{user.surname or ''} {user.name or ''} {user.patronymic or ''}".strip()
-            if not fio:
-                fio = f"{user.first_name or ''} {user.last_name or ''}".strip() or f"ID: {user.telegram_id}"
-            
-            start_date = subscription.start_date.strftime("%d.%m.%Y") if subscription.start_date else "—"
-            end_date = subscription.end_date.strftime("%d.%m.%Y") if subscription.end_date else "—"
-            
-            subscribers_text += (
-                f"👤 <b>{fio}</b>\n"
-                f"📱 Телефон: {user.phone or '—'}\n"
-                f"🆔 Telegram ID: {user.telegram_id}\n"
-                f"📦 Тариф: {tariff_name}\n"
-                f"📅 Активация: {start_date}\n"
-                f"📅 Окончание: {end_date}\n"
-                f"━━━━━━━━━━━━━━━━━━━━\n\n"
-            )
-        
-        # Разбиваем на части, если текст слишком длинный (лимит Telegram ~4096 символов)
-        if len(subscribers_text) > 4000:
-            # Отправляем первую часть
-            first_part = subscribers_text[:4000]
-            last_newline = first_part.rfind('\n')
-            if last_newline > 0:
-                first_part = first_part[:last_newline]
-            
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back")],
-            ])
-            await callback.message.edit_text(first_part, reply_markup=keyboard, parse_mode="HTML")
-            
-            # Отправляем остальное отдельным сообщением
-            remaining = subscribers_text[last_newline+1:]
-            await callback.message.answer(remaining, parse_mode="HTML")
-        else:
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back")],
-            ])
-            await callback.message.edit_text(subscribers_text, reply_markup=keyboard, parse_mode="HTML")
-        
-        await callback.answer()
+            _subscribers_pages.set(cache_key, cached)
+        rows, has_more = cached
         break
-
+    
+    back_row = [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back")]
+    if not rows:
+        text = "📋 <b>Список подписчиков</b>\n\n❌ Нет активных подписчиков"
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[back_row])
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        await callback.answer()
+        return
+    
+    # При листании назад has_more означает наличие предыдущих страниц, вперёд — следующих
+    has_prev = has_more if direction == "p" else direction == "n"
+    has_next = has_more if direction != "p" else True
+    
+    pages_total = max(1, -(-total // SUBSCRIBERS_PAGE_SIZE))
+    text = (
+        f"📋 <b>Список подписчиков</b>\n\n"
+        f"Всего активных подписчиков: <b>{total}</b>\n"
+        f"Страница {page} из {pages_total}\n\n"
+        "━━━━━━━━━━━━━━━━━━━━\n\n"
+    )
+    text += "".join(_render_subscriber_card(row) for row in rows)
+    
+    nav_row = []
+    if has_prev:
+        first = rows[0]
+        nav_row.append(InlineKeyboardButton(
+            text="◀️ Назад",
+            callback_data=f"admin_subs:p:{page - 1}:{encode_cursor(first.end_date, first.id)}",
+        ))
+    if has_next:
+        last = rows[-1]
+        nav_row.append(InlineKeyboardButton(
+            text="Вперёд ▶️",
+            callback_data=f"admin_subs:n:{page + 1}:{encode_cursor(last.end_date, last.id)}",
+        ))
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[nav_row, back_row] if nav_row else [back_row])
+    
+    await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    await callback.answer()
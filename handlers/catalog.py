@@ -0,0 +1,85 @@
+"""
+Поиск по каталогу парфюмерии в inline-режиме (@bot запрос) — только для подписчиков
+"""
+from aiogram import Router
+from aiogram.types import (
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultsButton,
+    InputTextMessageContent,
+)
+from database.base import get_session
+from services.catalog_service import CatalogEntry, CatalogService
+from config import settings
+from monitoring.sql import query_budget
+import html
+
+router = Router()
+
+# Без подписки Telegram кэширует пустой ответ недолго: после оплаты поиск должен заработать сразу
+NO_ACCESS_CACHE_TIME = 30
+# Лимит текста сообщения Telegram; заголовок и описание результата держим короткими —
+# длинное поле одной позиции каталога не должно ломать answerInlineQuery для всего ответа
+MESSAGE_LIMIT = 4096
+TITLE_LIMIT = 256
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _describe(entry: CatalogEntry) -> str:
+    parts = [entry.brand, entry.volume, f"{int(entry.price)} ₽" if entry.price is not None else None]
+    return " · ".join(part for part in parts if part)
+
+
+def _article(entry: CatalogEntry) -> InlineQueryResultArticle:
+    title = _truncate(entry.name, TITLE_LIMIT)
+    details = _truncate(_describe(entry), TITLE_LIMIT)
+    category = _truncate(entry.category, TITLE_LIMIT) if entry.category else None
+    lines = [f"<b>{html.escape(title)}</b>"]
+    if details:
+        lines.append(html.escape(details))
+    if category:
+        lines.append(f"📂 {html.escape(category)}")
+    footer = f"\nАртикул: <code>{html.escape(_truncate(entry.sku, TITLE_LIMIT))}</code>"
+    if entry.description:
+        # Остаток лимита — описанию (Telegram считает длину после разбора HTML-разметки)
+        room = MESSAGE_LIMIT - len("\n".join(lines)) - len(footer) - 3
+        lines.append(f"\n{html.escape(_truncate(entry.description, room))}")
+    lines.append(footer)
+    return InlineQueryResultArticle(
+        id=str(entry.id),
+        title=title,
+        description=details or category,
+        input_message_content=InputTextMessageContent(message_text="\n".join(lines), parse_mode="HTML"),
+    )
+
+
+@router.inline_query()
+@query_budget(3)
+async def catalog_search(inline_query: InlineQuery):
+    """Поиск по индексу каталога в памяти; доступ — при активной подписке"""
+    async for session in get_session():
+        if not await CatalogService.has_access(session=session, telegram_id=inline_query.from_user.id):
+            await inline_query.answer(
+                [],
+                cache_time=NO_ACCESS_CACHE_TIME,
+                is_personal=True,
+                button=InlineQueryResultsButton(text="🔒 Поиск доступен подписчикам", start_parameter="catalog"),
+            )
+            return
+        index = await CatalogService.get_index(session=session)
+        break
+
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    page_size = settings.CATALOG_INLINE_PAGE_SIZE
+    entries, total = index.search(inline_query.query, limit=page_size, offset=offset)
+    next_offset = str(offset + page_size) if offset + page_size < total else ""
+
+    await inline_query.answer(
+        [_article(entry) for entry in entries],
+        cache_time=settings.CATALOG_INLINE_CACHE_TIME,
+        is_personal=True,
+        next_offset=next_offset,
+    )
@@ -10,16 +10,21 @@ from services.user_service import UserService
 from services.subscription_service import SubscriptionService
 from services.referral_service import ReferralService
 from services.tariff_service import TariffService
+from services.pagination import encode_cursor, decode_cursor
+from database.models import PaymentStatus, SubscriptionStatus
 from keyboards.main_menu import get_main_menu_keyboard
 from keyboards.tariff_selection import get_tariff_selection_keyboard
 from states.subscription_states import SubscriptionStates
 from datetime import datetime
 from config import settings
+from monitoring.sql import query_budget
+import html
 
 router = Router()
 
 
 @router.callback_query(F.data == "my_subscription")
+@query_budget(3)
 async def show_my_subscription(callback: CallbackQuery):
     """Показать информацию о текущей подписке"""
     async for session in get_session():
@@ -72,6 +77,7 @@ async def show_my_subscription(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "renew_subscription")
+@query_budget(2)
 async def renew_subscription(callback: CallbackQuery):
     """Продлить подписку"""
     async for session in get_session():
@@ -101,6 +107,7 @@ async def renew_subscription(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "referral_program")
+@query_budget(2)
 async def show_referral_program(callback: CallbackQuery):
     """Показать информацию о реферальной программе"""
     async for session in get_session():
@@ -154,17 +161,20 @@ async def show_referral_program(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "get_catalog")
+@query_budget(0)
 async def get_catalog(callback: CallbackQuery):
-    """Показать два варианта каталога — кнопки открывают ссылки на Яндекс.Диск"""
+    """Показать два варианта каталога (ссылки на Яндекс.Диск) и кнопку поиска в inline-режиме"""
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     await callback.answer()
     text = (
         "📂 <b>Каталог</b>\n\n"
-        "Выберите каталог — откроется ссылка на Яндекс.Диск:"
+        "Выберите каталог — откроется ссылка на Яндекс.Диск,\n"
+        "или найдите парфюм по названию или бренду через поиск:"
     )
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text=settings.CATALOG_NAME_1, url=settings.CATALOG_LINK_1)],
         [InlineKeyboardButton(text=settings.CATALOG_NAME_2, url=settings.CATALOG_LINK_2)],
+        [InlineKeyboardButton(text="🔍 Поиск по каталогу", switch_inline_query_current_chat="")],
         [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")],
     ])
     try:
@@ -174,6 +184,7 @@ async def get_catalog(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "order_perfume")
+@query_budget(0)
 async def order_perfume(callback: CallbackQuery):
     """Показать WhatsApp-номер менеджера"""
     wa_link = f"https://wa.me/{settings.MANAGER_WHATSAPP.lstrip('+').replace('-', '')}"
@@ -194,6 +205,7 @@ async def order_perfume(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "back_to_menu")
+@query_budget(2)
 async def back_to_menu(callback: CallbackQuery):
     """Вернуться в главное меню"""
     async for session in get_session():
@@ -214,3 +226,88 @@ async def back_to_menu(callback: CallbackQuery):
         await callback.message.edit_text(text, reply_markup=get_main_menu_keyboard(has_active_subscription=has_active))
         await callback.answer()
         break
+
+
+# Записей истории на одной странице
+HISTORY_PAGE_SIZE = 5
+_PAYMENT_STATUS_TEXT = {
+    PaymentStatus.SUCCEEDED: "оплачено",
+    PaymentStatus.PENDING: "ожидает оплаты",
+    PaymentStatus.CANCELED: "платёж отменён",
+}
+
+
+def _render_history_row(row, now: datetime) -> str:
+    start_date = row.start_date.strftime("%d.%m.%Y") if row.start_date else "—"
+    end_date = row.end_date.strftime("%d.%m.%Y") if row.end_date else "—"
+    is_active = row.status == SubscriptionStatus.ACTIVE and row.end_date and row.end_date > now
+    text = (
+        f"📦 <b>{html.escape(row.tariff_name or 'Неизвестный тариф')}</b> — "
+        f"{'✅ активна' if is_active else '⌛ завершена'}\n"
+        f"📅 {start_date} — {end_date}\n"
+    )
+    if row.amount is not None:
+        text += f"💳 {int(row.amount)} ₽, {_PAYMENT_STATUS_TEXT.get(row.payment_status, '—')}\n"
+    return text + "\n"
+
+
+@router.callback_query(F.data == "my_history")
+@router.callback_query(F.data.startswith("history:"))
+@query_budget(1)
+async def show_history(callback: CallbackQuery):
+    """
+    История подписок и платежей, постранично.
+    callback_data: my_history — первая страница,
+    history:n:<page>:<cursor> — следующая, history:p:<page>:<cursor> — предыдущая
+    """
+    direction, page, cursor = "first", 1, None
+    if callback.data.startswith("history:"):
+        try:
+            _, direction, page_str, cursor_str = callback.data.split(":", 3)
+            page, cursor = int(page_str), decode_cursor(cursor_str)
+        except ValueError:
+            await callback.answer("Некорректная страница", show_alert=True)
+            return
+    
+    async for session in get_session():
+        rows, has_more = await SubscriptionService.get_history_page(
+            session=session,
+            telegram_id=callback.from_user.id,
+            limit=HISTORY_PAGE_SIZE,
+            after=cursor if direction == "n" else None,
+            before=cursor if direction == "p" else None,
+        )
+        break
+    
+    back_row = [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
+    if not rows:
+        text = "🧾 <b>Моя история</b>\n\nЗдесь появятся ваши подписки и платежи."
+        await callback.message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=[back_row]))
+        await callback.answer()
+        return
+    
+    # При листании назад has_more означает наличие предыдущих страниц, вперёд — следующих
+    has_prev = has_more if direction == "p" else direction == "n"
+    has_next = has_more if direction != "p" else True
+    
+    now = datetime.utcnow()
+    text = f"🧾 <b>Моя история</b> (страница {page})\n\n"
+    text += "".join(_render_history_row(row, now) for row in rows)
+    
+    nav_row = []
+    if has_prev:
+        first = rows[0]
+        nav_row.append(InlineKeyboardButton(
+            text="◀️ Новее",
+            callback_data=f"history:p:{page - 1}:{encode_cursor(first.created_at, first.id)}",
+        ))
+    if has_next:
+        last = rows[-1]
+        nav_row.append(InlineKeyboardButton(
+            text="Старше ▶️",
+            callback_data=f"history:n:{page + 1}:{encode_cursor(last.created_at, last.id)}",
+        ))
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[nav_row, back_row] if nav_row else [back_row])
+    
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
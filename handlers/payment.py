@@ -9,21 +9,25 @@ from services.payment_service import PaymentService
 from services.subscription_service import SubscriptionService
 from services.referral_service import ReferralService
 from services.user_service import UserService
+from services.catalog_service import CatalogService
 from database.models import PaymentStatus
 from keyboards.main_menu import get_main_menu_keyboard
 from config import settings
+from monitoring.sql import query_budget
 import json
 
 router = Router()
 
 
 @router.pre_checkout_query()
+@query_budget(0)
 async def process_pre_checkout(pre_checkout_query: PreCheckoutQuery):
     """Обработка pre-checkout запроса"""
     await pre_checkout_query.answer(ok=True)
 
 
 @router.callback_query(F.data.startswith("test_payment_"))
+@query_budget(17)
 async def process_test_payment(callback: CallbackQuery):
     """Обработка тестового платежа (симуляция успешной оплаты)"""
     from config import settings
@@ -64,6 +68,8 @@ async def process_test_payment(callback: CallbackQuery):
                 session=session,
                 subscription_id=payment.subscription_id,
             )
+            CatalogService.forget_access(callback.from_user.id)
+            SubscriptionService.forget_history(callback.from_user.id)
             
             # Загружаем тариф для карточки
             from services.tariff_service import TariffService
@@ -105,6 +111,7 @@ async def process_test_payment(callback: CallbackQuery):
 
 
 @router.message(F.successful_payment)
+@query_budget(12)
 async def process_successful_payment(message: Message):
     """Обработка успешной оплаты"""
     async for session in get_session():
@@ -151,6 +158,8 @@ async def process_successful_payment(message: Message):
                 session=session,
                 subscription_id=payment.subscription_id,
             )
+            CatalogService.forget_access(message.from_user.id)
+            SubscriptionService.forget_history(message.from_user.id)
             from services.tariff_service import TariffService
             tariff = await TariffService.get_tariff_by_id(
                 session=session,
@@ -201,6 +210,7 @@ def _generate_client_card(user, subscription) -> str:
 
 # Webhook handler для YooKassa (если используется webhook)
 @router.message(F.web_app_data)
+@query_budget(0)
 async def handle_webhook(message: Message):
     """Обработка webhook от YooKassa (если используется)"""
     # YooKassa webhook обычно обрабатывается через отдельный endpoint
@@ -8,8 +8,9 @@ from aiogram.fsm.context import FSMContext
 from database.base import get_session
 from services.user_service import UserService
 from services.subscription_service import SubscriptionService
-from services.tariff_service import TariffService
+from services.referral_codes import is_valid_referral_code, normalize_referral_code
 from keyboards.main_menu import get_main_menu_keyboard
+from monitoring.sql import query_budget
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,9 +19,10 @@ router = Router()
 
 # Обработчик команды /start
 @router.message(Command("start"))
+@query_budget(4)
 async def cmd_start(message: Message, state: FSMContext):
     """Обработка команды /start"""
-    logger.info(f"Received /start from user {message.from_user.id}")
+    logger.info("Received /start from user %s", message.from_user.id)
     
     await state.clear()
     
@@ -28,7 +30,13 @@ async def cmd_start(message: Message, state: FSMContext):
     referrer_code = None
     if message.text and len(message.text.split()) > 1:
         referrer_code = message.text.split()[1]
-        logger.info(f"Referral code: {referrer_code}")
+        logger.info("Referral code: %s", referrer_code)
+        # Мусорные параметры /start отсекаем без обращения к БД
+        if not is_valid_referral_code(referrer_code):
+            logger.info("Ignoring malformed referral code: %r", referrer_code)
+            referrer_code = None
+        else:
+            referrer_code = normalize_referral_code(referrer_code)
     
     try:
         # Получаем сессию БД
@@ -42,50 +50,16 @@ async def cmd_start(message: Message, state: FSMContext):
                 last_name=message.from_user.last_name,
                 referrer_code=referrer_code,
             )
-            logger.info(f"User {'created' if is_new else 'found'}: {user.id}")
+            logger.info("User %s: %s", "created" if is_new else "found", user.id)
             
-            # Обрабатываем реферальный код
-            if referrer_code:
-                from services.referral_service import ReferralService
-                from sqlalchemy import select
-                from database.models import User
-                
-                # Если пользователь новый и referrer_id уже определён — создаём запись
-                if is_new and user.referrer_id:
-                    await ReferralService.create_referral(
-                        session=session,
-                        referrer_id=user.referrer_id,
-                        referred_id=user.id,
-                    )
-                    await session.commit()
-                    logger.info(f"Referral created for new user {user.id}")
-                # Если пользователь уже существует, но ещё не привязан к рефереру — привязываем
-                elif not is_new and not user.referrer_id:
-                    stmt = select(User).where(User.referral_code == referrer_code)
-                    result = await session.execute(stmt)
-                    referrer = result.scalar_one_or_none()
-                    
-                    # Запрещаем самоприглашение и дубликаты
-                    if referrer and referrer.id != user.id:
-                        user.referrer_id = referrer.id
-                        await session.commit()
-                        await ReferralService.create_referral(
-                            session=session,
-                            referrer_id=referrer.id,
-                            referred_id=user.id,
-                        )
-                        await session.commit()
-                        logger.info(f"Referral attached for existing user {user.id} -> referrer {referrer.id}")
-            
-            # Получаем тарифы для отображения
-            tariffs = await TariffService.get_all_active_tariffs(session=session)
-            
-            # Проверяем наличие активной подписки
-            subscription = await SubscriptionService.get_active_subscription(
-                session=session,
-                user_id=user.id,
-            )
-            has_active_subscription = subscription is not None
+            # У нового пользователя активной подписки быть не может
+            has_active_subscription = False
+            if not is_new:
+                subscription = await SubscriptionService.get_active_subscription(
+                    session=session,
+                    user_id=user.id,
+                )
+                has_active_subscription = subscription is not None
             
             # Формируем текст приветствия
             welcome_text = (
@@ -113,11 +87,11 @@ async def cmd_start(message: Message, state: FSMContext):
                 reply_markup=keyboard,
                 parse_mode="HTML"
             )
-            logger.info(f"Welcome message sent to user {message.from_user.id}")
+            logger.info("Welcome message sent to user %s", message.from_user.id)
             break
     except Exception as e:
-        logger.error(f"Error in cmd_start: {e}", exc_info=True)
+        logger.error("Error in cmd_start: %s", e, exc_info=True)
         import traceback
         error_details = traceback.format_exc()
-        logger.error(f"Full traceback: {error_details}")
+        logger.error("Full traceback: %s", error_details)
         await message.answer("Произошла ошибка. Попробуйте позже.")
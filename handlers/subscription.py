@@ -14,12 +14,14 @@ from services.referral_service import ReferralService
 from keyboards.main_menu import get_main_menu_keyboard
 from states.subscription_states import SubscriptionStates
 from config import settings
+from monitoring.sql import query_budget
 import re
 
 router = Router()
 
 
 @router.callback_query(F.data.startswith("select_tariff_"))
+@query_budget(1)
 async def select_tariff(callback: CallbackQuery, state: FSMContext):
     """Выбор тарифа и начало анкетирования"""
     tariff_id = int(callback.data.split("_")[-1])
@@ -47,6 +49,7 @@ async def select_tariff(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(SubscriptionStates.waiting_for_surname)
+@query_budget(0)
 async def process_surname(message: Message, state: FSMContext):
     """Обработка фамилии"""
     surname = message.text.strip()
@@ -62,6 +65,7 @@ async def process_surname(message: Message, state: FSMContext):
 
 
 @router.message(SubscriptionStates.waiting_for_name)
+@query_budget(0)
 async def process_name(message: Message, state: FSMContext):
     """Обработка имени"""
     name = message.text.strip()
@@ -77,6 +81,7 @@ async def process_name(message: Message, state: FSMContext):
 
 
 @router.message(SubscriptionStates.waiting_for_patronymic)
+@query_budget(0)
 async def process_patronymic(message: Message, state: FSMContext):
     """Обработка отчества"""
     patronymic = message.text.strip()
@@ -94,6 +99,7 @@ async def process_patronymic(message: Message, state: FSMContext):
 
 
 @router.message(SubscriptionStates.waiting_for_phone)
+@query_budget(10)
 async def process_phone(message: Message, state: FSMContext):
     """Обработка телефона и создание подписки"""
     phone = message.text.strip()
@@ -200,6 +206,7 @@ async def process_phone(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data == "cancel")
+@query_budget(2)
 async def cancel_subscription(callback: CallbackQuery, state: FSMContext):
     """Отмена оформления подписки"""
     await state.clear()
@@ -9,6 +9,7 @@ def get_main_menu_keyboard(has_active_subscription: bool = False) -> InlineKeybo
     buttons = [
         [
             InlineKeyboardButton(text="📦 Мой тариф", callback_data="my_subscription"),
+            InlineKeyboardButton(text="🧾 Моя история", callback_data="my_history"),
         ],
     ]
     
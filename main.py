@@ -1,57 +1,59 @@
 """
 Точка входа приложения
 """
+import time
+
+STARTED_AT = time.perf_counter()
+
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
-from config import settings
+from config import Settings, settings, load_bot_profiles, use_bot
 from database.base import init_db
 from services.tariff_service import TariffService
-from database.base import get_session
+from database.base import dispose_engines, get_engine, get_session
 from scheduler.tasks import setup_scheduler
-import sys
+from services import rendering
+from monitoring.health import HealthState, start_health_server
+from monitoring.watchdog import LoopWatchdog
+from monitoring.metrics import FSM_STATES
+from monitoring.logs import setup_logging
+from monitoring.startup import StartupTimer
+from monitoring import sql as sql_monitoring
+from middlewares.bot_context import BotContextMiddleware
+from middlewares.chat_queue import ChatQueueMiddleware
+from middlewares.metrics import MetricsMiddleware
+from middlewares.throttling import RateLimit, ThrottlingMiddleware
+from typing import Optional
 
 # Импорты handlers
-from handlers import start, main_menu, subscription, payment, admin
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-    ],
-)
+from handlers import start, main_menu, subscription, payment, admin, catalog
+
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Основная функция"""
-    # Инициализация БД
-    logger.info("Initializing database...")
-    await init_db()
-    
-    # Инициализация дефолтных тарифов
-    async for session in get_session():
-        await TariffService.init_default_tariffs(session=session)
-        break
-    
-    # Создание бота и диспетчера
-    bot = Bot(
-        token=settings.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
-    )
-    
-    # Получаем username бота, если не указан в конфиге
-    if not settings.BOT_USERNAME:
-        bot_info = await bot.get_me()
-        settings.BOT_USERNAME = bot_info.username
-        logger.info(f"Bot username: {settings.BOT_USERNAME}")
+def create_dispatcher(profiles: Optional[dict[int, Settings]] = None) -> Dispatcher:
+    """
+    Диспетчер со всеми роутерами.
+    profiles — id бота -> профиль настроек, если диспетчер обслуживает несколько ботов
+    """
+    # FSM-middleware регистрируется ниже, после очереди по чатам
+    dp = Dispatcher(storage=MemoryStorage(), disable_fsm=True)
     
-    dp = Dispatcher(storage=MemoryStorage())
+    # Профиль бота выбирается первым: все middleware и обработчики работают с его настройками и БД
+    if profiles:
+        dp.update.outer_middleware(BotContextMiddleware(profiles))
+    # Апдейты одного чата — по очереди (шаги анкеты не обгоняют друг друга), разных чатов — параллельно;
+    # FSM-состояние читается, когда подошла очередь апдейта
+    dp.update.outer_middleware(ChatQueueMiddleware(
+        concurrency=settings.UPDATE_CONCURRENCY,
+        timeout=settings.UPDATE_TIMEOUT,
+    ))
+    dp.update.outer_middleware(dp.fsm)
     
     # Регистрация роутеров
     dp.include_router(start.router)
@@ -59,25 +61,142 @@ async def main():
     dp.include_router(subscription.router)
     dp.include_router(payment.router)
     dp.include_router(admin.router)
+    dp.include_router(catalog.router)
+    
+    # Антифлуд до фильтров и обработчиков (outer-middleware; FSM-состояние к этому моменту уже известно)
+    if settings.THROTTLE_ENABLED:
+        throttling_middleware = ThrottlingMiddleware(
+            message=RateLimit(settings.THROTTLE_MESSAGE_RATE, settings.THROTTLE_MESSAGE_BURST),
+            callback=RateLimit(settings.THROTTLE_CALLBACK_RATE, settings.THROTTLE_CALLBACK_BURST),
+            fsm=RateLimit(settings.THROTTLE_FSM_RATE, settings.THROTTLE_FSM_BURST),
+        )
+        dp.message.outer_middleware(throttling_middleware)
+        dp.callback_query.outer_middleware(throttling_middleware)
+    
+    # Метрики обработчиков (inner-middleware наследуются вложенными роутерами)
+    metrics_middleware = MetricsMiddleware()
+    dp.message.middleware(metrics_middleware)
+    dp.callback_query.middleware(metrics_middleware)
+    dp.pre_checkout_query.middleware(metrics_middleware)
+    dp.inline_query.middleware(metrics_middleware)
+    FSM_STATES.set_function(
+        lambda: sum(1 for record in dp.storage.storage.values() if record.state)
+    )
+    return dp
+
+
+async def prepare_database(timer: StartupTimer, suffix: str = ""):
+    """Схема БД (DDL только при изменении моделей), затем тарифы в кэш"""
+    with timer.phase("schema" + suffix):
+        changed = await init_db()
+    logger.info("Database schema%s %s", suffix, "updated" if changed else "is up to date")
+    with timer.phase("tariffs" + suffix):
+        async for session in get_session():
+            await TariffService.warm_up(session=session)
+            break
+
+
+async def resolve_bot_username(bot: Bot):
+    """Username бота для реферальных ссылок, если не указан в конфиге"""
+    if not settings.BOT_USERNAME:
+        bot_info = await bot.get_me()
+        settings.BOT_USERNAME = bot_info.username
+        logger.info("Bot username: %s", settings.BOT_USERNAME)
+
+
+async def prepare_bot(profile: Settings, bot: Bot, timer: StartupTimer, suffix: str):
+    """Прогрев одного бота: его БД и тарифы параллельно с запросом к Bot API"""
+    with use_bot(profile):
+        sql_monitoring.install(
+            get_engine(),
+            slow_query_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+            n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD,
+        )
+        settings.admin_ids  # ADMIN_TELEGRAM_IDS разбирается один раз, до первых апдейтов
+        await asyncio.gather(
+            prepare_database(timer, suffix),
+            timer.wrap("get_me" + suffix, resolve_bot_username(bot)),
+        )
+
+
+async def main():
+    """Основная функция"""
+    timer = StartupTimer(STARTED_AT)
+    timer.mark("imports")
+    
+    # Профили ботов: один из окружения или несколько из BOTS_FILE
+    profiles = load_bot_profiles()
+    
+    # Создание ботов: HTTP-сессия к Bot API (пул соединений) общая
+    api_session = AiohttpSession()
+    bots = [
+        Bot(
+            token=profile.BOT_TOKEN,
+            session=api_session,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
+        for profile in profiles
+    ]
+    multibot = len(bots) > 1
     
-    # Настройка планировщика
-    scheduler = setup_scheduler(bot)
-    scheduler.start()
-    logger.info("Scheduler started")
+    # БД и тарифы всех ботов готовятся параллельно с запросами к Bot API
+    with timer.phase("warm-up"):
+        await asyncio.gather(*(
+            prepare_bot(profile, bot, timer, f"[{profile.BOT_NAME}]" if multibot else "")
+            for profile, bot in zip(profiles, bots)
+        ))
+    
+    with timer.phase("dispatcher"):
+        dp = create_dispatcher({bot.id: profile for profile, bot in zip(profiles, bots)} if multibot else None)
+    health = HealthState(
+        role="bot",
+        watchdog=LoopWatchdog(
+            stack_threshold=settings.LOOP_LAG_STACK_THRESHOLD_MS / 1000,
+            ready_threshold=settings.LOOP_LAG_READY_THRESHOLD_MS / 1000,
+        ),
+    )
+    
+    # Настройка планировщика (если фоновые задачи не вынесены в worker.py)
+    scheduler = None
+    if settings.RUN_SCHEDULER:
+        with timer.phase("scheduler"):
+            scheduler = setup_scheduler(list(zip(profiles, bots)))
+            health.attach_to_scheduler(scheduler)
+            scheduler.start()
+        logger.info("Scheduler started")
+    else:
+        logger.info("Handler-only mode: scheduler runs in worker.py")
+    
+    health_runner = await start_health_server(health, settings.HEALTH_PORT)
+    timer.log()
     
     try:
-        # Запуск бота
-        logger.info("Starting bot...")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        # Запуск ботов: один цикл long polling на каждый токен, диспетчер общий
+        logger.info("Starting %s bot(s): %s", len(bots), ", ".join(profile.BOT_NAME for profile in profiles))
+        await dp.start_polling(*bots, allowed_updates=dp.resolve_used_update_types())
     finally:
-        scheduler.shutdown()
-        await bot.session.close()
+        if scheduler:
+            scheduler.shutdown()
+        if health_runner:
+            await health_runner.cleanup()
+        await api_session.close()
+        await dispose_engines()
+        rendering.shutdown_pool()
 
 
 if __name__ == "__main__":
+    # Логи пишет отдельный поток из очереди: вывод в stdout не блокирует event loop
+    log_listener = setup_logging(
+        level=settings.LOG_LEVEL,
+        fmt=settings.LOG_FORMAT,
+        rate_limits=settings.LOG_RATE_LIMITS,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.error(f"Fatal error: {e}", exc_info=True)
+        logger.error("Fatal error: %s", e, exc_info=True)
+    finally:
+        log_listener.stop()
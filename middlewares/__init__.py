@@ -0,0 +1,9 @@
+"""
+Middlewares package
+"""
+from .bot_context import BotContextMiddleware
+from .chat_queue import ChatQueueMiddleware
+from .metrics import MetricsMiddleware
+from .throttling import RateLimit, ThrottlingMiddleware
+
+__all__ = ["BotContextMiddleware", "ChatQueueMiddleware", "MetricsMiddleware", "RateLimit", "ThrottlingMiddleware"]
@@ -0,0 +1,30 @@
+"""
+Middleware профиля бота: апдейт обрабатывается с настройками и БД того бота, который его получил
+"""
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from config import Settings, use_bot
+
+
+class BotContextMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на dp.update: по id бота выбирает его профиль (config.use_bot),
+    поэтому settings, get_session() и кэши сервисов внутри обработчиков относятся к этому боту.
+    """
+
+    def __init__(self, profiles: Dict[int, Settings]):
+        self.profiles = profiles
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        profile = self.profiles.get(data["bot"].id)
+        if profile is None:
+            return await handler(event, data)
+        with use_bot(profile):
+            return await handler(event, data)
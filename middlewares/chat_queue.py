@@ -0,0 +1,117 @@
+"""
+Очередь апдейтов по чатам: апдейты одного чата обрабатываются строго по очереди,
+разных чатов — параллельно, но не больше заданного числа одновременно
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.middlewares.user_context import EVENT_CONTEXT_KEY
+from aiogram.types import TelegramObject
+import asyncio
+import logging
+import time
+
+from monitoring.metrics import UPDATE_QUEUE_WAIT, UPDATE_TIMEOUTS, UPDATES_IN_PROGRESS, UPDATES_QUEUED
+
+logger = logging.getLogger(__name__)
+
+
+class _ChatQueue:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class ChatQueueMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на dp.update, до FSM-middleware. aiogram запускает задачу на каждый апдейт
+    в порядке получения; задача сразу встаёт в очередь своего чата (asyncio.Lock будит ожидающих
+    по порядку), поэтому шаги анкеты одного пользователя не обгоняют друг друга, а FSM-состояние
+    читается уже после того, как предыдущий апдейт чата обработан.
+
+    concurrency — сколько чатов обрабатывается одновременно, timeout — предел на один апдейт (секунды).
+    """
+
+    def __init__(self, concurrency: int, timeout: Optional[float] = None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        # (бот, чат) -> очередь; удаляется, когда в ней не осталось апдейтов
+        self._chats: Dict[tuple[int, int], _ChatQueue] = {}
+        self._waiting_chat = 0
+        self._waiting_slot = 0
+        self._running = 0
+
+    @staticmethod
+    def chat_key(data: Dict[str, Any]) -> Optional[tuple[int, int]]:
+        context = data.get(EVENT_CONTEXT_KEY)
+        if context is None:
+            return None
+        chat_id = context.chat_id if context.chat_id is not None else context.user_id
+        if chat_id is None:
+            return None
+        return data["bot"].id, chat_id
+
+    def _report(self):
+        UPDATES_QUEUED.set(self._waiting_chat, stage="chat")
+        UPDATES_QUEUED.set(self._waiting_slot, stage="slot")
+        UPDATES_IN_PROGRESS.set(self._running)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        key = self.chat_key(data)
+        queue = None
+        if key is not None:
+            queue = self._chats.get(key)
+            if queue is None:
+                queue = self._chats[key] = _ChatQueue()
+            queue.pending += 1
+
+        start = time.perf_counter()
+        try:
+            if queue is not None:
+                self._waiting_chat += 1
+                self._report()
+                try:
+                    await queue.lock.acquire()
+                finally:
+                    self._waiting_chat -= 1
+            try:
+                return await self._run(handler, event, data, start)
+            finally:
+                if queue is not None:
+                    queue.lock.release()
+        finally:
+            if queue is not None:
+                queue.pending -= 1
+                if not queue.pending:
+                    del self._chats[key]
+            self._report()
+
+    async def _run(self, handler, event, data, start: float) -> Any:
+        self._waiting_slot += 1
+        self._report()
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting_slot -= 1
+        UPDATE_QUEUE_WAIT.observe(time.perf_counter() - start)
+        self._running += 1
+        self._report()
+        try:
+            async with asyncio.timeout(self.timeout) as deadline:
+                return await handler(event, data)
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            UPDATE_TIMEOUTS.inc()
+            logger.warning("Update %s cancelled after %.0f s", getattr(event, "update_id", "?"), self.timeout)
+            return None
+        finally:
+            self._running -= 1
+            self._slots.release()
@@ -0,0 +1,64 @@
+"""
+Middleware метрик: время выполнения обработчиков и SQL-запросы на апдейт
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware
+from aiogram.filters import CommandObject
+from aiogram.types import TelegramObject, Message, CallbackQuery, InlineQuery
+import re
+import time
+
+from monitoring.metrics import HANDLER_LATENCY, HANDLER_ERRORS
+from monitoring.sql import get_query_budget, track_queries
+
+_DIGITS = re.compile(r"\d+")
+
+
+def event_label(event: TelegramObject, command: Optional[CommandObject] = None) -> str:
+    """
+    Короткая метка события без высокой кардинальности:
+    select_tariff_12 -> select_tariff_*, admin_subs:n:3:... -> admin_subs, /start REF -> /start.
+    Имя команды — только если её распознал фильтр Command обработчика (command из data);
+    прочий текст со «/» (например, ответ на шаг анкеты) — общая метка "command".
+    """
+    if isinstance(event, CallbackQuery):
+        data = (event.data or "").split(":", 1)[0]
+        return _DIGITS.sub("*", data) or "callback"
+    if isinstance(event, Message):
+        if command is not None:
+            return f"/{command.command}"
+        if event.text and event.text.startswith("/"):
+            return "command"
+        return "message"
+    if isinstance(event, InlineQuery):
+        return "inline_query"
+    return type(event).__name__
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Inner-middleware: регистрируется на наблюдателях диспетчера (message, callback_query, ...)
+    и срабатывает только для событий, у которых нашёлся обработчик.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        router = getattr(callback, "__module__", "unknown")
+        name = getattr(callback, "__name__", "unknown")
+        labels = {"router": router, "handler": name, "event": event_label(event, data.get("command"))}
+
+        start = time.perf_counter()
+        try:
+            with track_queries(f"{router}:{name}", budget=get_query_budget(callback)):
+                return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(**labels)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - start, **labels)
@@ -0,0 +1,117 @@
+"""
+Антифлуд: токен-бакеты на пользователя с отдельными лимитами для сообщений, нажатий кнопок
+и шагов анкеты оформления подписки (FSM)
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Message, CallbackQuery
+import logging
+import time
+
+from config import settings
+from monitoring.metrics import THROTTLED_EVENTS
+
+logger = logging.getLogger(__name__)
+
+THROTTLED_CALLBACK_TEXT = "⏳ Слишком часто, подождите секунду"
+THROTTLED_MESSAGE_TEXT = "⏳ Слишком много сообщений подряд. Подождите немного и повторите."
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """rate — событий в секунду в среднем, burst — сколько можно отправить подряд"""
+    rate: float
+    burst: int
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at", "warned")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+        self.warned = False
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer-middleware: регистрируется на dp.message и dp.callback_query и срабатывает до фильтров
+    и обработчиков, поэтому лишние события не доходят ни до роутеров, ни до БД.
+
+    Лишнее нажатие кнопки сразу получает ответ на callback (часики в клиенте гаснут),
+    на лишние сообщения бот отвечает один раз за серию, остальные молча отбрасываются.
+    Сообщения пользователя, находящегося в анкете (есть FSM-состояние), считаются по лимиту fsm.
+    Бакеты у каждого бота свои; администраторы текущего бота не ограничиваются (exempt_admins).
+    """
+
+    def __init__(
+        self,
+        message: RateLimit,
+        callback: RateLimit,
+        fsm: RateLimit,
+        exempt_admins: bool = True,
+        max_users: int = 100_000,
+    ):
+        self.limits = {"message": message, "callback": callback, "fsm": fsm}
+        self.exempt_admins = exempt_admins
+        self.max_users = max_users
+        # (бот, пользователь, вид события) -> бакет
+        self._buckets: OrderedDict[tuple[int, int, str], _Bucket] = OrderedDict()
+
+    @staticmethod
+    def event_kind(event: TelegramObject, data: Dict[str, Any]) -> Optional[str]:
+        if isinstance(event, CallbackQuery):
+            return "callback"
+        if isinstance(event, Message):
+            # raw_state выставляет FSMContextMiddleware на уровне апдейта — до этого middleware
+            return "fsm" if data.get("raw_state") else "message"
+        return None
+
+    def _take(self, bot_id: int, user_id: int, kind: str, now: float) -> Optional[_Bucket]:
+        """Списать токен; None — разрешено, иначе бакет, в котором токенов не хватило"""
+        limit = self.limits[kind]
+        key = (bot_id, user_id, kind)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(limit.burst, now)
+            if len(self._buckets) > self.max_users:
+                # Самые давно активные пользователи: их бакеты всё равно уже полные
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(limit.burst, bucket.tokens + (now - bucket.updated_at) * limit.rate)
+            bucket.updated_at = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.warned = False
+            return None
+        return bucket
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        kind = self.event_kind(event, data)
+        if user is None or kind is None or (self.exempt_admins and user.id in settings.admin_ids):
+            return await handler(event, data)
+
+        bucket = self._take(data["bot"].id, user.id, kind, time.monotonic())
+        if bucket is None:
+            return await handler(event, data)
+
+        THROTTLED_EVENTS.inc(kind=kind)
+        try:
+            if isinstance(event, CallbackQuery):
+                await event.answer(THROTTLED_CALLBACK_TEXT)
+            elif not bucket.warned:
+                bucket.warned = True
+                await event.answer(THROTTLED_MESSAGE_TEXT)
+        except Exception as e:
+            logger.debug("Throttled %s from %s: reply failed: %s", kind, user.id, e)
+        return None
@@ -0,0 +1,11 @@
+"""
+Monitoring package
+"""
+from .health import HealthState, start_health_server
+from .watchdog import LoopWatchdog
+
+__all__ = [
+    "HealthState",
+    "LoopWatchdog",
+    "start_health_server",
+]
@@ -0,0 +1,123 @@
+"""
+Health-check процесса: heartbeat event loop'а и HTTP-эндпоинты /health, /ready и /metrics
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+from aiohttp import web
+import logging
+
+from monitoring.metrics import render_metrics
+from monitoring.watchdog import LoopWatchdog
+
+logger = logging.getLogger(__name__)
+
+# Как часто обновляется heartbeat и через сколько секунд без него процесс считается зависшим
+HEARTBEAT_INTERVAL = 5
+HEARTBEAT_TIMEOUT = 30
+
+
+class HealthState:
+    """Состояние процесса для health-check (у бота и воркера — свои экземпляры)"""
+
+    def __init__(self, role: str, watchdog: Optional[LoopWatchdog] = None):
+        self.role = role
+        self.watchdog = watchdog
+        self.started_at = datetime.utcnow()
+        self.last_heartbeat = time.monotonic()
+        # Последние запуски задач планировщика: job_id -> {"last_run": ..., "ok": ..., "last_success": ...}
+        self.jobs: dict[str, dict] = {}
+
+    def beat(self):
+        """Отметить, что event loop жив"""
+        self.last_heartbeat = time.monotonic()
+
+    def record_job(self, job_id: str, ok: bool):
+        """Запомнить результат выполнения задачи планировщика; last_success — время последнего успешного запуска"""
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        previous = self.jobs.get(job_id, {})
+        self.jobs[job_id] = {
+            "last_run": now,
+            "ok": ok,
+            "last_success": now if ok else previous.get("last_success"),
+        }
+
+    @property
+    def is_healthy(self) -> bool:
+        return time.monotonic() - self.last_heartbeat < HEARTBEAT_TIMEOUT
+
+    @property
+    def is_ready(self) -> bool:
+        """Готов принимать нагрузку: жив и event loop не блокировался недавно"""
+        return self.is_healthy and (self.watchdog is None or self.watchdog.is_ready)
+
+    def as_dict(self) -> dict:
+        return {
+            "role": self.role,
+            "status": "ok" if self.is_healthy else "stale",
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "heartbeat_age": round(time.monotonic() - self.last_heartbeat, 3),
+            "loop_lag_ms": round(self.watchdog.current_lag() * 1000, 1) if self.watchdog else None,
+            "ready": self.is_ready,
+            "jobs": self.jobs,
+        }
+
+    def attach_to_scheduler(self, scheduler):
+        """Подписаться на события APScheduler, чтобы видеть последние запуски задач"""
+        from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+
+        def listener(event):
+            self.record_job(event.job_id, ok=event.exception is None)
+
+        scheduler.add_listener(listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+
+
+async def _heartbeat_loop(state: HealthState):
+    while True:
+        state.beat()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+
+async def start_health_server(state: HealthState, port: Optional[int]) -> Optional[web.AppRunner]:
+    """
+    Запустить heartbeat, watchdog event loop'а и HTTP-сервер с /health, /ready и /metrics (формат Prometheus).
+    /ready отвечает 503, пока event loop заблокирован или недавно был заблокирован —
+    оркестратор выводит такой экземпляр из балансировки, но не перезапускает его.
+    Если порт не задан, сервер не поднимается (heartbeat и watchdog всё равно работают).
+    Returns: runner (нужно вызвать runner.cleanup() при остановке) или None
+    """
+    heartbeat = asyncio.create_task(_heartbeat_loop(state))
+    if state.watchdog:
+        state.watchdog.start()
+
+    if not port:
+        return None
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response(state.as_dict(), status=200 if state.is_healthy else 503)
+
+    async def ready(request: web.Request) -> web.Response:
+        return web.json_response(state.as_dict(), status=200 if state.is_ready else 503)
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/health", health)
+    app.router.add_get("/ready", ready)
+    app.router.add_get("/metrics", metrics)
+    app.on_cleanup.append(lambda _: _cancel(heartbeat))
+    if state.watchdog:
+        app.on_cleanup.append(lambda _: state.watchdog.stop())
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host="0.0.0.0", port=port)
+    await site.start()
+    logger.info("Health server (%s) listening on :%s", state.role, port)
+    return runner
+
+
+async def _cancel(task: asyncio.Task):
+    task.cancel()
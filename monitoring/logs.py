@@ -0,0 +1,150 @@
+"""
+Логирование без блокировки event loop'а: записи уходят в очередь, форматирует и пишет их
+отдельный поток (QueueListener). Формат — JSON по записи на строку или прежний текстовый;
+частые записи ниже WARNING прореживаются по логгерам.
+"""
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+import json
+import logging
+import queue
+import sys
+import time
+
+from config import current_bot_name
+from monitoring.metrics import LOG_RECORDS_DROPPED
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Атрибуты LogRecord, которые не считаются дополнительными полями (extra=...)
+_STANDARD_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {
+    "message", "asctime", "bot", "sampled_out", "taskName",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись — одна строка JSON: время, уровень, логгер, сообщение, бот и поля из extra=..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        bot = getattr(record, "bot", None)
+        if bot:
+            data["bot"] = bot
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                data[key] = value
+        if getattr(record, "sampled_out", 0):
+            data["sampled_out"] = record.sampled_out
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack"] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Не больше limits[логгер] записей в секунду уровня ниже WARNING от логгера и его потомков
+    (ключ "handlers" ограничивает и handlers.start, и handlers.admin — общим лимитом).
+    Число отброшенных записей попадает в следующую пропущенную запись (sampled_out) и в метрики.
+    """
+
+    def __init__(self, limits: dict[str, float]):
+        super().__init__()
+        self.limits = limits
+        # имя логгера -> ключ лимита (или None)
+        self._keys: dict[str, Optional[str]] = {}
+        # ключ лимита -> [начало окна, пропущено, отброшено]
+        self._windows: dict[str, list] = {}
+
+    def _key(self, name: str) -> Optional[str]:
+        key = self._keys.get(name, "")
+        if key == "":
+            key, prefix = None, name
+            while prefix:
+                if prefix in self.limits:
+                    key = prefix
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._keys[name] = key
+        return key
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = self._key(record.name)
+        if key is None:
+            return True
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= 1.0:
+            if window and window[2]:
+                record.sampled_out = window[2]
+            window = self._windows[key] = [now, 0, 0]
+        if window[1] >= self.limits[key]:
+            window[2] += 1
+            LOG_RECORDS_DROPPED.inc(reason="sampled")
+            return False
+        window[1] += 1
+        return True
+
+
+class _BotNameFilter(logging.Filter):
+    """Имя бота, в контексте которого сделана запись (в потоке записи contextvars уже не те)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.bot = current_bot_name()
+        return True
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    В очередь уходит сама запись: сообщение с аргументами (%-стиль) собирается уже в потоке
+    QueueListener. При переполненной очереди запись отбрасывается — event loop не ждёт вывода.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+def setup_logging(
+    level: str = "INFO",
+    fmt: str = "json",
+    rate_limits: Optional[dict[str, float]] = None,
+    queue_size: int = 10_000,
+    stream: Optional[TextIO] = None,
+) -> QueueListener:
+    """
+    Заменить обработчики корневого логгера очередью; вывод — в stream (по умолчанию stdout).
+    Returns: запущенный QueueListener — при остановке процесса вызовите listener.stop(),
+    чтобы дописать оставшиеся в очереди записи
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    handler = _LazyQueueHandler(queue.Queue(queue_size))
+    if rate_limits:
+        handler.addFilter(SamplingFilter(rate_limits))
+    handler.addFilter(_BotNameFilter())
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(handler.queue, output)
+    listener.start()
+    return listener
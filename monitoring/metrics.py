@@ -0,0 +1,300 @@
+"""
+Метрики в формате Prometheus (text exposition 0.0.4) без внешних зависимостей
+"""
+from contextlib import contextmanager
+from typing import Callable, Optional, Sequence
+import math
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и убывать; можно вычислять при каждом чтении через set_function"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(self, function: Callable[[], float]):
+        """Значение без меток, вычисляемое при каждом чтении метрик"""
+        self._function = function
+
+    def _samples(self) -> list[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    """Гистограмма с накопительными корзинами (le), суммой и количеством наблюдений"""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [счётчики по корзинам..., сумма, количество]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        data = self._values.get(key)
+        if data is None:
+            data = self._values[key] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                data[i] += 1
+                break
+        data[-2] += value
+        data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with HISTOGRAM.time(label=...): ... — наблюдает длительность блока в секундах"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        data = self._values.get(self._key(labels))
+        return int(data[-1]) if data else 0
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, data in self._values.items():
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += data[i]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(data[-1])}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render_metrics() -> str:
+    """Все метрики процесса в текстовом формате Prometheus"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# --- Метрики бота ---
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds",
+    "Handler execution time",
+    ("router", "handler", "event"),
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total",
+    "Handlers finished with an exception",
+    ("router", "handler", "event"),
+)
+
+DB_QUERY_DURATION = Histogram(
+    "bot_db_query_duration_seconds",
+    "SQL statement execution time",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+DB_QUERIES_PER_UPDATE = Histogram(
+    "bot_db_queries_per_update",
+    "SQL statements executed while handling one update or scheduler job",
+    ("scope",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 500),
+)
+DB_TIME_PER_UPDATE = Histogram(
+    "bot_db_time_per_update_seconds",
+    "Total SQL time while handling one update or scheduler job",
+    ("scope",),
+)
+DB_SLOW_QUERIES = Counter(
+    "bot_db_slow_queries_total",
+    "SQL statements slower than SLOW_QUERY_THRESHOLD_MS",
+    ("operation",),
+)
+DB_N_PLUS_ONE = Counter(
+    "bot_db_suspected_n_plus_one_total",
+    "Statements repeated with different parameters within one update or job",
+    ("scope",),
+)
+DB_QUERY_BUDGET_EXCEEDED = Counter(
+    "bot_db_query_budget_exceeded_total",
+    "Updates whose handler executed more SQL statements than its @query_budget",
+    ("scope",),
+)
+DB_STATEMENT_CACHE = Counter(
+    "bot_db_statement_cache_total",
+    "SQL compilation cache lookups (statement: name from database/statements.py or 'other')",
+    ("statement", "result"),
+)
+
+YOOKASSA_LATENCY = Histogram(
+    "bot_yookassa_request_duration_seconds",
+    "YooKassa API call latency",
+    ("endpoint", "status"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+SCHEDULER_JOB_DURATION = Histogram(
+    "bot_scheduler_job_duration_seconds",
+    "Scheduler job run time",
+    ("job",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0),
+)
+SCHEDULER_JOB_LAST_SUCCESS = Gauge(
+    "bot_scheduler_job_last_success_timestamp_seconds",
+    "Unix time of the last successful scheduler job run",
+    ("job",),
+)
+
+FSM_STATES = Gauge(
+    "bot_fsm_states",
+    "Users currently inside an FSM scenario",
+)
+PENDING_ITEMS = Gauge(
+    "bot_pending_items",
+    "Items waiting for background processing (last seen by the scheduler)",
+    ("queue",),
+)
+
+THROTTLED_EVENTS = Counter(
+    "bot_throttled_events_total",
+    "Updates rejected by the per-user rate limit",
+    ("kind",),
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "bot_event_loop_lag_seconds",
+    "Delay of a periodic event loop tick beyond its scheduled time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+EVENT_LOOP_CURRENT_LAG = Gauge(
+    "bot_event_loop_current_lag_seconds",
+    "Current event loop lag, including a block that is still in progress",
+)
+EVENT_LOOP_STALLS = Counter(
+    "bot_event_loop_stalls_total",
+    "Event loop blocks longer than LOOP_LAG_STACK_THRESHOLD_MS (stack written to the log)",
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "bot_log_records_dropped_total",
+    "Log records not written: sampled out by LOG_RATE_LIMITS or the log queue was full",
+    ("reason",),
+)
+
+UPDATES_QUEUED = Gauge(
+    "bot_updates_queued",
+    "Updates waiting for their turn: behind an earlier update of the same chat (chat) or for a free slot (slot)",
+    ("stage",),
+)
+UPDATES_IN_PROGRESS = Gauge(
+    "bot_updates_in_progress",
+    "Updates being handled right now (at most UPDATE_CONCURRENCY)",
+)
+UPDATE_QUEUE_WAIT = Histogram(
+    "bot_update_queue_wait_seconds",
+    "Time an update waited in the per-chat queue and for a free slot",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+UPDATE_TIMEOUTS = Counter(
+    "bot_update_timeouts_total",
+    "Updates cancelled after UPDATE_TIMEOUT seconds",
+)
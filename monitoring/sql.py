@@ -0,0 +1,188 @@
+"""
+Учёт SQL-запросов: длительность каждого запроса и статистика в рамках одного апдейта / задачи,
+лог медленных запросов, обнаружение N+1 (один и тот же запрос много раз с разными параметрами)
+и попадания в кэш компиляции SQLAlchemy
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional, TypeVar
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.ext.asyncio import AsyncEngine
+import logging
+import time
+
+from monitoring.metrics import (
+    DB_QUERY_DURATION,
+    DB_QUERIES_PER_UPDATE,
+    DB_TIME_PER_UPDATE,
+    DB_SLOW_QUERIES,
+    DB_N_PLUS_ONE,
+    DB_QUERY_BUDGET_EXCEEDED,
+    DB_STATEMENT_CACHE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Настройки по умолчанию; переопределяются в install()
+_config = {
+    "slow_query_ms": 200.0,
+    "n_plus_one_threshold": 5,
+}
+
+
+class QueryStats:
+    """Статистика запросов в одной области (апдейт или задача планировщика)"""
+    __slots__ = ("scope", "parent", "count", "duration", "statements")
+
+    def __init__(self, scope: str, parent: Optional["QueryStats"] = None):
+        self.scope = scope
+        # Внешняя область: её счётчики тоже растут (например, замер бенчмарка вокруг обработчика)
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        # текст запроса -> различные наборы параметров (хранится не больше порога N+1)
+        self.statements: dict[str, set] = {}
+
+    def record(self, statement: str, parameters, executemany: bool):
+        if executemany:
+            return
+        params = self.statements.setdefault(statement, set())
+        if len(params) < _config["n_plus_one_threshold"]:
+            params.add(repr(parameters))
+
+    def suspected_n_plus_one(self) -> list[tuple[str, int]]:
+        """Запросы, выполненные с порогом и более различных наборов параметров"""
+        threshold = _config["n_plus_one_threshold"]
+        return [
+            (statement, len(params))
+            for statement, params in self.statements.items()
+            if len(params) >= threshold
+        ]
+
+
+F = TypeVar("F", bound=Callable)
+
+
+def query_budget(limit: int) -> Callable[[F], F]:
+    """
+    Объявить для обработчика предел SQL-запросов на один апдейт (ставится под декоратором роутера).
+    Превышение пишется в лог и в bot_db_query_budget_exceeded_total;
+    benchmarks/check_query_budget.py проверяет пределы всех обработчиков.
+    """
+    def decorator(func: F) -> F:
+        func.__query_budget__ = limit
+        return func
+    return decorator
+
+
+def get_query_budget(func: Callable) -> Optional[int]:
+    """Предел запросов, объявленный через @query_budget (None — не объявлен)"""
+    return getattr(func, "__query_budget__", None)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _short(statement: str, limit: int = 300) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "…"
+
+
+@contextmanager
+def track_queries(scope: str, budget: Optional[int] = None):
+    """
+    Считать SQL-запросы внутри блока; по выходу статистика уходит в метрики,
+    а подозрения на N+1 и превышение budget (предела запросов) — в лог.
+    with track_queries("handlers.main_menu:back_to_menu", budget=2) as stats: ...
+    """
+    stats = QueryStats(scope, parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        DB_QUERIES_PER_UPDATE.observe(stats.count, scope=scope)
+        DB_TIME_PER_UPDATE.observe(stats.duration, scope=scope)
+        logger.debug("%s: %s statements, %.1f ms in DB", scope, stats.count, stats.duration * 1000)
+        if budget is not None and stats.count > budget:
+            DB_QUERY_BUDGET_EXCEEDED.inc(scope=scope)
+            logger.warning("Query budget exceeded in %s: %s statements, budget %s", scope, stats.count, budget)
+        for statement, distinct in stats.suspected_n_plus_one():
+            DB_N_PLUS_ONE.inc(scope=scope)
+            logger.warning(
+                "Suspected N+1 in %s: statement repeated with %s+ different parameter sets "
+                "(%s statements in scope): %s",
+                scope, distinct, stats.count, _short(statement),
+            )
+
+
+def _cache_result(context) -> str:
+    """Попал ли запрос в кэш компиляции SQLAlchemy: hit / miss / none (кэш не используется)"""
+    if context.cache_hit is CACHE_HIT:
+        return "hit"
+    if context.cache_hit is CACHE_MISS:
+        return "miss"
+    return "none"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    operation = (statement.split(None, 1) or ["OTHER"])[0].upper()
+    DB_QUERY_DURATION.observe(duration, operation=operation)
+    if context is not None and context.compiled is not None:
+        DB_STATEMENT_CACHE.inc(
+            statement=context.execution_options.get("statement_name", "other"),
+            result=_cache_result(context),
+        )
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, parameters, executemany)
+        scope_stats = stats
+        while scope_stats is not None:
+            scope_stats.count += 1
+            scope_stats.duration += duration
+            scope_stats = scope_stats.parent
+
+    if duration * 1000 >= _config["slow_query_ms"]:
+        scope = stats.scope if stats is not None else "-"
+        DB_SLOW_QUERIES.inc(operation=operation)
+        logger.warning("Slow query %.1f ms in %s: %s", duration * 1000, scope, _short(statement))
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+def install(
+    engine: AsyncEngine,
+    slow_query_ms: Optional[float] = None,
+    n_plus_one_threshold: Optional[int] = None,
+):
+    """
+    Подключить учёт запросов к движку (идемпотентно).
+    slow_query_ms — порог медленного запроса; n_plus_one_threshold — со скольких различных наборов
+    параметров одного запроса за апдейт считать его подозрением на N+1
+    """
+    if slow_query_ms is not None:
+        _config["slow_query_ms"] = slow_query_ms
+    if n_plus_one_threshold is not None:
+        _config["n_plus_one_threshold"] = n_plus_one_threshold
+
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
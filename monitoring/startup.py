@@ -0,0 +1,46 @@
+"""
+Замер фаз запуска процесса: сколько заняли импорты, БД, прогрев и т.д.
+"""
+from contextlib import contextmanager
+from typing import Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """
+    timer = StartupTimer(started_at)
+    with timer.phase("database"): ...
+    timer.log()  # "Startup in 412 ms: imports 180 ms, database 12 ms, ..."
+    Фазы могут выполняться параллельно — тогда их сумма больше общего времени.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    def mark(self, name: str, since: Optional[float] = None):
+        """Записать фазу, длившуюся от since (по умолчанию — от старта) до текущего момента"""
+        self.phases[name] = time.perf_counter() - (self.started_at if since is None else since)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, since=start)
+
+    def wrap(self, name: str, awaitable):
+        """Корутина, замеряющая awaitable как фазу (для asyncio.gather)"""
+        async def timed():
+            with self.phase(name):
+                return await awaitable
+        return timed()
+
+    def log(self, label: str = "Startup"):
+        total = (time.perf_counter() - self.started_at) * 1000
+        parts = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases.items())
+        logger.info("%s in %.0f ms: %s", label, total, parts)
@@ -0,0 +1,105 @@
+"""
+Watchdog event loop'а: задержка цикла (lag) в метриках и стек кода, который блокирует цикл
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from monitoring.metrics import EVENT_LOOP_CURRENT_LAG, EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+# Период тика, по задержке которого измеряется lag
+TICK_INTERVAL = 0.1
+# Сколько секунд после сильной задержки /ready ещё отвечает 503 (цикл может заблокироваться снова)
+READY_COOLDOWN = 10.0
+MAX_STACK_FRAMES = 30
+
+
+class LoopWatchdog:
+    """
+    Задача в event loop раз в TICK_INTERVAL измеряет, насколько позже срока она проснулась.
+    Поток-наблюдатель замечает блокировку, пока она длится: если тика нет дольше
+    stack_threshold, в лог пишется стек потока event loop'а и имя выполнявшейся задачи —
+    то есть место, где синхронный код держит цикл.
+    """
+
+    def __init__(self, stack_threshold: float, ready_threshold: float, interval: float = TICK_INTERVAL):
+        self.stack_threshold = stack_threshold
+        self.ready_threshold = ready_threshold
+        self.interval = interval
+        self.lag = 0.0
+        self.last_tick = time.monotonic()
+        self.last_stall_at: Optional[float] = None
+        self._dumped = False  # стек текущей блокировки уже записан
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Запустить из работающего event loop'а"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._task = asyncio.create_task(self._tick_loop(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        EVENT_LOOP_CURRENT_LAG.set_function(self.current_lag)
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+        if self._thread:
+            await asyncio.to_thread(self._thread.join, 1)
+
+    async def _tick_loop(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lag = max(0.0, now - start - self.interval)
+            self.last_tick = now
+            self._dumped = False
+            EVENT_LOOP_LAG.observe(self.lag)
+            if self.lag >= self.ready_threshold:
+                self.last_stall_at = now
+
+    def current_lag(self) -> float:
+        """Последняя измеренная задержка или длительность блокировки, которая ещё продолжается"""
+        return max(self.lag, time.monotonic() - self.last_tick - self.interval)
+
+    @property
+    def is_ready(self) -> bool:
+        if self.current_lag() >= self.ready_threshold:
+            return False
+        return self.last_stall_at is None or time.monotonic() - self.last_stall_at >= READY_COOLDOWN
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            blocked = time.monotonic() - self.last_tick - self.interval
+            if blocked >= self.stack_threshold and not self._dumped:
+                self._dumped = True
+                self._dump_stack(blocked)
+
+    def _dump_stack(self, blocked: float):
+        """Записать в лог, чем сейчас занят поток event loop'а"""
+        EVENT_LOOP_STALLS.inc()
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        stack = "".join(traceback.format_stack(frame, limit=MAX_STACK_FRAMES))
+        logger.warning(
+            "Event loop blocked for %.0f ms, task %s: %s\n%s",
+            blocked * 1000, task.get_name() if task else "-", task.get_coro() if task else "", stack,
+        )
@@ -9,15 +9,47 @@ from services.subscription_service import SubscriptionService
 from services.referral_service import ReferralService
 from services.user_service import UserService
 from services.payment_service import PaymentService
+from services.catalog_service import CatalogService
 from database.models import ReferralBonusStatus, PaymentStatus, SubscriptionStatus
-from config import settings
+from config import Settings, settings, use_bot
 from aiogram import Bot
-from datetime import datetime
+from monitoring.metrics import SCHEDULER_JOB_DURATION, SCHEDULER_JOB_LAST_SUCCESS, PENDING_ITEMS
+from monitoring.sql import track_queries
+import functools
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
+def instrumented(job_id: str, func):
+    """
+    Обёртка задачи планировщика: длительность, время последнего успешного запуска, SQL-запросы.
+    Задача сообщает о неудаче исключением (логирует и пробрасывает дальше): тогда время успеха
+    не обновляется, а APScheduler отмечает запуск как ошибочный (EVENT_JOB_ERROR).
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with track_queries(f"job:{job_id}"):
+                result = await func(*args, **kwargs)
+        finally:
+            SCHEDULER_JOB_DURATION.observe(time.perf_counter() - start, job=job_id)
+        SCHEDULER_JOB_LAST_SUCCESS.set(time.time(), job=job_id)
+        return result
+    return wrapper
+
+
+def for_bot(profile: Settings, func):
+    """Обёртка задачи: выполнить её с настройками и БД данного бота"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with use_bot(profile):
+            return await func(*args, **kwargs)
+    return wrapper
+
+
 async def check_subscriptions_task(bot: Bot):
     """Проверка подписок и отправка напоминаний"""
     try:
@@ -25,24 +57,14 @@ async def check_subscriptions_task(bot: Bot):
             # Переводим истёкшие подписки в expired
             expired_count = await SubscriptionService.expire_subscriptions(session=session)
             if expired_count > 0:
-                logger.info(f"Expired {expired_count} subscriptions")
+                logger.info("Expired %s subscriptions", expired_count)
             
-            # Получаем подписки для напоминания
-            subscriptions = await SubscriptionService.get_subscriptions_for_reminder(session=session)
+            # Получаем подписки для напоминания (вместе с telegram_id пользователя)
+            reminders = await SubscriptionService.get_subscriptions_for_reminder(session=session)
             
-            for subscription in subscriptions:
+            for reminder in reminders:
                 try:
-                    # Получаем пользователя по id
-                    from sqlalchemy import select
-                    from database.models import User
-                    stmt = select(User).where(User.id == subscription.user_id)
-                    result = await session.execute(stmt)
-                    user = result.scalar_one_or_none()
-                    
-                    if not user:
-                        continue
-                    
-                    end_date = subscription.end_date.strftime("%d.%m.%Y")
+                    end_date = reminder.end_date.strftime("%d.%m.%Y")
                     text = (
                         f"⏰ Напоминание о подписке\n\n"
                         f"Ваша подписка истечёт через 3 дня.\n"
@@ -53,7 +75,7 @@ async def check_subscriptions_task(bot: Bot):
                     from keyboards.main_menu import get_main_menu_keyboard
                     # Подписка активна (иначе не было бы напоминания)
                     await bot.send_message(
-                        chat_id=user.telegram_id,
+                        chat_id=reminder.telegram_id,
                         text=text,
                         reply_markup=get_main_menu_keyboard(has_active_subscription=True),
                     )
@@ -61,17 +83,18 @@ async def check_subscriptions_task(bot: Bot):
                     # Отмечаем, что напоминание отправлено
                     await SubscriptionService.mark_reminder_sent(
                         session=session,
-                        subscription_id=subscription.id,
+                        subscription_id=reminder.subscription_id,
                     )
                     
-                    logger.info(f"Sent reminder to user {user.telegram_id} for subscription {subscription.id}")
+                    logger.info("Sent reminder to user %s for subscription %s", reminder.telegram_id, reminder.subscription_id)
                     
                 except Exception as e:
-                    logger.error(f"Error sending reminder for subscription {subscription.id}: {e}")
+                    logger.error("Error sending reminder for subscription %s: %s", reminder.subscription_id, e)
             
             break
     except Exception as e:
-        logger.error(f"Error in check_subscriptions_task: {e}")
+        logger.error("Error in check_subscriptions_task: %s", e)
+        raise
 
 
 async def check_pending_payments_task(bot: Bot):
@@ -79,14 +102,11 @@ async def check_pending_payments_task(bot: Bot):
     try:
         async for session in get_session():
             from sqlalchemy import select
-            from database.models import Payment, Subscription
+            from database.models import Subscription
             
             # Получаем все pending платежи
-            stmt = select(Payment).where(
-                Payment.status == PaymentStatus.PENDING
-            ).order_by(Payment.created_at.desc())
-            result = await session.execute(stmt)
-            pending_payments = list(result.scalars().all())
+            pending_payments = await PaymentService.get_pending_payments(session=session)
+            PENDING_ITEMS.set(len(pending_payments), queue="payments")
             
             for payment in pending_payments:
                 try:
@@ -125,6 +145,11 @@ async def check_pending_payments_task(bot: Bot):
                                 user = result.scalar_one_or_none()
                                 
                                 if user:
+                                    # Кэши доступа к каталогу и истории этого процесса; бот в отдельном процессе
+                                    # (RUN_SCHEDULER=false + worker.py) увидит подписку по истечении их TTL
+                                    CatalogService.forget_access(user.telegram_id)
+                                    SubscriptionService.forget_history(user.telegram_id)
+                                    
                                     from services.tariff_service import TariffService
                                     tariff = await TariffService.get_tariff_by_id(
                                         session=session,
@@ -153,86 +178,60 @@ async def check_pending_payments_task(bot: Bot):
                                         reply_markup=get_main_menu_keyboard(has_active_subscription=True),
                                     )
                                     
-                                    logger.info(f"Activated subscription {subscription.id} for payment {payment.id}")
+                                    logger.info("Activated subscription %s for payment %s", subscription.id, payment.id)
                                     
                 except Exception as e:
-                    logger.error(f"Error checking payment {payment.id}: {e}")
+                    logger.error("Error checking payment %s: %s", payment.id, e)
             
             break
     except Exception as e:
-        logger.error(f"Error in check_pending_payments_task: {e}")
+        logger.error("Error in check_pending_payments_task: %s", e)
+        raise
 
 
 async def daily_active_subscribers_report_task(bot: Bot):
-    """Ежедневная рассылка админам списка всех пользователей с активной подпиской"""
-    if not settings.ADMIN_TELEGRAM_IDS:
-        return
-    try:
-        admin_ids = [int(id_str.strip()) for id_str in settings.ADMIN_TELEGRAM_IDS.split(",")]
-    except (ValueError, TypeError):
-        logger.warning("Invalid ADMIN_TELEGRAM_IDS for daily report")
+    """
+    Ежедневная рассылка админам отчёта по активным подписчикам:
+    итог и изменения за сутки (новые, продлившие, истёкшие, истекающие скоро).
+    Полный список — по кнопке выгрузки.
+    Снимок для следующего отчёта сохраняется, только если отчёт получил хотя бы один админ.
+    """
+    admin_ids = settings.admin_ids
+    if not admin_ids:
+        if settings.ADMIN_TELEGRAM_IDS:
+            logger.warning("Invalid ADMIN_TELEGRAM_IDS for daily report")
         return
     try:
-        async for session in get_session():
-            from sqlalchemy import select
-            from database.models import User, Tariff
+        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+        from services.report_service import ReportService
 
-            subscriptions = await SubscriptionService.get_all_active_subscriptions(session=session)
-            lines = []
-            for i, sub in enumerate(subscriptions, 1):
-                stmt = select(User).where(User.id == sub.user_id)
-                result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
-                stmt = select(Tariff).where(Tariff.id == sub.tariff_id)
-                result = await session.execute(stmt)
-                tariff = result.scalar_one_or_none()
-                tariff_name = tariff.name if tariff else "—"
-                end_str = sub.end_date.strftime("%d.%m.%Y") if sub.end_date else "—"
-                fio = " ".join(filter(None, [user.surname, user.name, user.patronymic])).strip() if user else "—"
-                phone = user.phone or "—"
-                username = f"@{user.username}" if user and user.username else "—"
-                tg_id = user.telegram_id if user else "—"
-                lines.append(
-                    f"{i}. {fio} | {phone} | {username} | ID: {tg_id} | {tariff_name} | до {end_str}"
-                )
-            date_str = datetime.utcnow().strftime("%d.%m.%Y %H:%M")
-            header = (
-                f"📋 <b>Отчёт: подписчики с активной подпиской</b>\n"
-                f"Дата: {date_str}\n"
-                f"Всего: {len(subscriptions)}\n\n"
-            )
-            body = "\n".join(lines) if lines else "Нет активных подписок."
-            full_text = header + body
-            max_len = 4096
-            if len(full_text) > max_len:
-                parts = [header]
-                current = []
-                current_len = len(header)
-                for line in lines:
-                    line_ = line + "\n"
-                    if current_len + len(line_) > max_len and current:
-                        parts.append("\n".join(current))
-                        current = []
-                        current_len = 0
-                    current.append(line)
-                    current_len += len(line_)
-                if current:
-                    parts.append("\n".join(current))
-            else:
-                parts = [full_text]
-            for admin_id in admin_ids:
-                try:
-                    for part in parts:
-                        await bot.send_message(
-                            chat_id=admin_id,
-                            text=part,
-                            parse_mode="HTML",
-                        )
-                except Exception as e:
-                    logger.warning(f"Failed to send daily report to admin {admin_id}: {e}")
+        async for session in get_session():
+            parts, state = await ReportService.build_daily_report(session=session)
+            break
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="📥 Полный список (TXT)", callback_data="admin_export_subscribers_txt")],
+        ])
+        delivered = 0
+        for admin_id in admin_ids:
+            try:
+                for i, part in enumerate(parts):
+                    await bot.send_message(
+                        chat_id=admin_id,
+                        text=part,
+                        parse_mode="HTML",
+                        reply_markup=keyboard if i == len(parts) - 1 else None,
+                    )
+                delivered += 1
+            except Exception as e:
+                logger.warning("Failed to send daily report to admin %s: %s", admin_id, e)
+        if not delivered:
+            raise RuntimeError("daily report was not delivered to any admin; snapshot kept for the next run")
+        async for session in get_session():
+            await ReportService.save_snapshot(session, state)
             break
     except Exception as e:
-        logger.error(f"Error in daily_active_subscribers_report_task: {e}")
+        logger.error("Error in daily_active_subscribers_report_task: %s", e)
+        raise
 
 
 async def check_referral_bonuses_task(bot: Bot):
@@ -241,19 +240,10 @@ async def check_referral_bonuses_task(bot: Bot):
         async for session in get_session():
             # Получаем все ожидающие бонусы
             bonuses = await ReferralService.get_pending_bonuses(session=session)
+            PENDING_ITEMS.set(len(bonuses), queue="referral_bonuses")
             
             for bonus in bonuses:
                 try:
-                    # Получаем пользователя по id
-                    from sqlalchemy import select
-                    from database.models import User
-                    stmt = select(User).where(User.id == bonus.user_id)
-                    result = await session.execute(stmt)
-                    user = result.scalar_one_or_none()
-                    
-                    if not user:
-                        continue
-                    
                     # Уведомляем пользователя
                     wa_link = f"https://wa.me/{settings.MANAGER_WHATSAPP.lstrip('+').replace('-', '')}"
                     text = (
@@ -265,39 +255,30 @@ async def check_referral_bonuses_task(bot: Bot):
                     )
                     
                     from keyboards.main_menu import get_main_menu_keyboard
-                    # Проверяем наличие активной подписки
-                    active_sub = await SubscriptionService.get_active_subscription(
-                        session=session,
-                        user_id=user.id,
-                    )
-                    has_active = active_sub is not None
-                    
                     await bot.send_message(
-                        chat_id=user.telegram_id,
+                        chat_id=bonus.telegram_id,
                         text=text,
-                        reply_markup=get_main_menu_keyboard(has_active_subscription=has_active),
+                        reply_markup=get_main_menu_keyboard(has_active_subscription=bonus.has_active_subscription),
                     )
                     
                     # Уведомляем администраторов (если указаны)
-                    if settings.ADMIN_TELEGRAM_IDS:
-                        try:
-                            admin_ids = [int(id_str.strip()) for id_str in settings.ADMIN_TELEGRAM_IDS.split(',')]
-                            admin_text = (
-                                f"🎁 Новый реферальный бонус!\n\n"
-                                f"Пользователь: @{user.username or 'N/A'} (ID: {user.telegram_id})\n"
-                                f"Активных рефералов: {bonus.active_referrals_count}\n"
-                                f"Нужно выдать подарок — парфюм."
-                            )
-                            for admin_id in admin_ids:
-                                try:
-                                    await bot.send_message(
-                                        chat_id=admin_id,
-                                        text=admin_text,
-                                    )
-                                except Exception as e:
-                                    logger.warning(f"Failed to send message to admin {admin_id}: {e}")
-                        except (ValueError, TypeError) as e:
-                            logger.warning(f"Invalid ADMIN_TELEGRAM_IDS: {e}")
+                    if settings.admin_ids:
+                        admin_text = (
+                            f"🎁 Новый реферальный бонус!\n\n"
+                            f"Пользователь: @{bonus.username or 'N/A'} (ID: {bonus.telegram_id})\n"
+                            f"Активных рефералов: {bonus.active_referrals_count}\n"
+                            f"Нужно выдать подарок — парфюм."
+                        )
+                        for admin_id in settings.admin_ids:
+                            try:
+                                await bot.send_message(
+                                    chat_id=admin_id,
+                                    text=admin_text,
+                                )
+                            except Exception as e:
+                                logger.warning("Failed to send message to admin %s: %s", admin_id, e)
+                    elif settings.ADMIN_TELEGRAM_IDS:
+                        logger.warning("Invalid ADMIN_TELEGRAM_IDS")
                     
                     # Отмечаем бонус как уведомлённый
                     await ReferralService.mark_bonus_notified(
@@ -305,53 +286,44 @@ async def check_referral_bonuses_task(bot: Bot):
                         bonus_id=bonus.id,
                     )
                     
-                    logger.info(f"Notified user {user.telegram_id} about bonus {bonus.id}")
+                    logger.info("Notified user %s about bonus %s", bonus.telegram_id, bonus.id)
                     
                 except Exception as e:
-                    logger.error(f"Error processing bonus {bonus.id}: {e}")
+                    logger.error("Error processing bonus %s: %s", bonus.id, e)
             
             break
     except Exception as e:
-        logger.error(f"Error in check_referral_bonuses_task: {e}")
+        logger.error("Error in check_referral_bonuses_task: %s", e)
+        raise
 
 
-def setup_scheduler(bot: Bot) -> AsyncIOScheduler:
-    """Настройка планировщика задач"""
+def setup_scheduler(bots: list[tuple[Settings, Bot]]) -> AsyncIOScheduler:
+    """
+    Настройка планировщика задач: один планировщик на все боты процесса.
+    У каждого бота свой набор задач (id с префиксом имени бота, если ботов несколько);
+    задачи разных ботов сдвинуты на несколько минут, чтобы не стартовать одновременно.
+    """
     scheduler = AsyncIOScheduler()
-    
-    # Ежедневный отчёт админам: список подписчиков с активной подпиской (09:00)
-    scheduler.add_job(
-        daily_active_subscribers_report_task,
-        trigger=CronTrigger(hour=9, minute=0),
-        args=[bot],
-        id="daily_active_subscribers_report",
-        replace_existing=True,
-    )
-    # Проверка подписок каждый день в 10:00
-    scheduler.add_job(
-        check_subscriptions_task,
-        trigger=CronTrigger(hour=10, minute=0),
-        args=[bot],
-        id="check_subscriptions",
-        replace_existing=True,
-    )
-    
-    # Проверка бонусов каждый день в 11:00
-    scheduler.add_job(
-        check_referral_bonuses_task,
-        trigger=CronTrigger(hour=11, minute=0),
-        args=[bot],
-        id="check_referral_bonuses",
-        replace_existing=True,
-    )
-    
-    # Проверка pending платежей каждые 5 минут
-    scheduler.add_job(
-        check_pending_payments_task,
-        trigger=CronTrigger(minute="*/5"),  # Каждые 5 минут
-        args=[bot],
-        id="check_pending_payments",
-        replace_existing=True,
-    )
+    for i, (profile, bot) in enumerate(bots):
+        prefix = f"{profile.BOT_NAME}:" if len(bots) > 1 else ""
+        minute = i % 60
+
+        def add_job(job_id: str, func, trigger: CronTrigger):
+            scheduler.add_job(
+                for_bot(profile, instrumented(prefix + job_id, func)),
+                trigger=trigger,
+                args=[bot],
+                id=prefix + job_id,
+                replace_existing=True,
+            )
+
+        # Ежедневный отчёт админам: список подписчиков с активной подпиской (09:00)
+        add_job("daily_active_subscribers_report", daily_active_subscribers_report_task, CronTrigger(hour=9, minute=minute))
+        # Проверка подписок каждый день в 10:00
+        add_job("check_subscriptions", check_subscriptions_task, CronTrigger(hour=10, minute=minute))
+        # Проверка бонусов каждый день в 11:00
+        add_job("check_referral_bonuses", check_referral_bonuses_task, CronTrigger(hour=11, minute=minute))
+        # Проверка pending платежей каждые 5 минут
+        add_job("check_pending_payments", check_pending_payments_task, CronTrigger(minute=f"{i % 5}-59/5"))
     
     return scheduler
@@ -0,0 +1,37 @@
+"""
+Загрузка каталога парфюмерии в БД из CSV, JSON (массив объектов) или JSONL.
+Поля: sku (артикул), name, brand, category, volume, price, description.
+Позиции обновляются по артикулу; бот подхватывает изменения в поиске в течение минуты.
+Запуск из корня проекта:
+    python scripts/import_catalog.py catalog.csv
+    python scripts/import_catalog.py catalog.json --dry-run   # только проверить файл
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.base import get_session, init_db
+from services.catalog_service import CatalogService, CATALOG_FORMATS
+
+
+async def main(args):
+    await init_db()
+    async for session in get_session():
+        result = await CatalogService.import_file(session, args.path, fmt=args.format, dry_run=args.dry_run)
+        prefix = "[dry-run] " if args.dry_run else ""
+        print(f"{prefix}Загружено позиций: {result.added}, строк: {result.processed}, ошибок: {len(result.errors)}")
+        for err in result.errors:
+            print(f"  Ошибка: {err}")
+        break
+    print("Готово.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка каталога парфюмерии в БД")
+    parser.add_argument("path", help="файл CSV, JSON или JSONL")
+    parser.add_argument("--format", choices=CATALOG_FORMATS, help="формат файла (по умолчанию по расширению)")
+    parser.add_argument("--dry-run", action="store_true", help="проверить данные, ничего не записывая")
+    asyncio.run(main(parser.parse_args()))
@@ -1,7 +1,11 @@
 """
-Однократная загрузка подписчиков в БД (восстановление списка).
-Запуск из корня проекта: python scripts/seed_subscribers.py
+Загрузка подписчиков в БД: встроенный список (восстановление) или файл CSV / JSONL (перенос из старой системы).
+Запуск из корня проекта:
+    python scripts/seed_subscribers.py                          # встроенный список SEED_SUBSCRIBERS
+    python scripts/seed_subscribers.py subscribers.csv          # файл; формат по расширению
+    python scripts/seed_subscribers.py export.jsonl --dry-run   # только проверить файл
 """
+import argparse
 import asyncio
 import sys
 from pathlib import Path
@@ -9,14 +13,24 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from database.base import get_session, init_db
+from services.bulk_import import BulkImportService, FORMATS
 from services.seed_restore import run_seed
 
 
-async def main():
+async def main(args):
     await init_db()
     async for session in get_session():
-        result = await run_seed(session)
-        print(f"Добавлено подписок: {result['added']}, пропущено: {result['skipped']}")
+        if args.path:
+            result = (await BulkImportService.import_file(
+                session, args.path, fmt=args.format, dry_run=args.dry_run,
+            )).as_dict()
+        else:
+            result = await run_seed(session, dry_run=args.dry_run)
+        prefix = "[dry-run] " if args.dry_run else ""
+        print(
+            f"{prefix}Добавлено подписок: {result['added']}, пропущено: {result['skipped']}, "
+            f"новых пользователей: {result['users_created']}, строк: {result['processed']}"
+        )
         for err in result["errors"]:
             print(f"  Ошибка: {err}")
         break
@@ -24,4 +38,8 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Загрузка подписчиков в БД")
+    parser.add_argument("path", nargs="?", help="файл CSV или JSONL; без него — встроенный список")
+    parser.add_argument("--format", choices=FORMATS, help="формат файла (по умолчанию по расширению)")
+    parser.add_argument("--dry-run", action="store_true", help="проверить данные, ничего не записывая")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,295 @@
+"""
+Массовый импорт подписчиков из CSV / JSONL (перенос из старой системы, восстановление списка).
+
+Поля записи: telegram_id, fio (или surname / name / patronymic), phone, tariff (название или код),
+start_date, end_date (ДД.ММ.ГГГГ или ГГГГ-ММ-ДД).
+Файл читается потоково; пользователи и подписки пишутся пачками через executemany.
+Как и раньше в run_seed: пользователь создаётся или дополняется данными анкеты, активная подписка
+добавляется, только если у пользователя её ещё нет.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional
+
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.base import upsert
+from database.models import User, Subscription, SubscriptionStatus, Tariff
+from services.referral_codes import encode_referral_code
+
+FORMATS = ("csv", "jsonl")
+PROFILE_FIELDS = ("surname", "name", "patronymic", "phone")
+
+
+class ImportRowError(ValueError):
+    """Некорректная строка импорта"""
+
+
+@dataclass
+class ImportResult:
+    """Итог импорта; errors — сообщения вида «строка N: ...»"""
+    processed: int = 0
+    added: int = 0
+    skipped: int = 0
+    users_created: int = 0
+    errors: list[str] = field(default_factory=list)
+    dry_run: bool = False
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "added": self.added,
+            "skipped": self.skipped,
+            "users_created": self.users_created,
+            "errors": self.errors,
+            "dry_run": self.dry_run,
+        }
+
+
+@dataclass
+class _Row:
+    line: int
+    telegram_id: int
+    fio: Optional[str]
+    profile: dict
+    tariff_id: int
+    start_date: datetime
+    end_date: datetime
+
+
+def parse_fio(fio: str) -> tuple[str, str, str]:
+    """ФИО -> (фамилия, имя, отчество); двойные имена остаются в имени"""
+    parts = fio.strip().split()
+    if not parts:
+        return "", "", ""
+    if len(parts) == 1:
+        return parts[0], "", ""
+    surname, patronymic = parts[0], parts[-1]
+    name = " ".join(parts[1:-1]) if len(parts) > 2 else parts[1]
+    return surname, name, patronymic
+
+
+def parse_date(value: str) -> datetime:
+    value = str(value).strip()
+    try:
+        return datetime.strptime(value, "%d.%m.%Y")
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+def detect_format(filename: str) -> str:
+    """Формат по расширению файла (по умолчанию csv)"""
+    suffix = Path(filename).suffix.lower().lstrip(".")
+    return "jsonl" if suffix in ("jsonl", "ndjson", "json") else "csv"
+
+
+def iter_records(stream: IO[str], fmt: str) -> Iterator[tuple[int, dict]]:
+    """Потоково читать записи из текстового файла: (номер строки, поля)"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, {key.strip().lower(): value for key, value in record.items() if key}
+        return
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, {"__error__": f"некорректный JSON ({e.msg})"}
+            continue
+        yield line_no, record if isinstance(record, dict) else {"__error__": "ожидался JSON-объект"}
+
+
+class BulkImportService:
+    """Импорт подписчиков пачками"""
+
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    async def _load_tariffs(session: AsyncSession) -> dict[str, int]:
+        """Тарифы по названию и коду (в нижнем регистре) — один запрос на весь импорт"""
+        tariffs = {}
+        for tariff in (await session.execute(select(Tariff))).scalars():
+            tariffs[tariff.name.strip().lower()] = tariff.id
+            tariffs[tariff.code.strip().lower()] = tariff.id
+        return tariffs
+
+    @staticmethod
+    def _parse(line: int, record: dict, tariffs: dict[str, int]) -> _Row:
+        if "__error__" in record:
+            raise ImportRowError(record["__error__"])
+
+        raw_id = str(record.get("telegram_id") or "").strip()
+        if not raw_id:
+            raise ImportRowError("нет telegram_id")
+        try:
+            telegram_id = int(raw_id)
+        except ValueError:
+            raise ImportRowError(f"некорректный telegram_id «{raw_id}»")
+
+        fio = str(record.get("fio") or "").strip() or None
+        surname, name, patronymic = parse_fio(fio) if fio else ("", "", "")
+        profile = {
+            "surname": str(record.get("surname") or surname).strip() or None,
+            "name": str(record.get("name") or name).strip() or None,
+            "patronymic": str(record.get("patronymic") or patronymic).strip() or None,
+            "phone": str(record.get("phone") or "").strip() or None,
+        }
+
+        tariff_name = str(record.get("tariff") or "").strip()
+        tariff_id = tariffs.get(tariff_name.lower())
+        if tariff_id is None:
+            raise ImportRowError(f"тариф «{tariff_name}» не найден")
+
+        try:
+            start_date = parse_date(record.get("start_date") or "")
+            end_date = parse_date(record.get("end_date") or "")
+        except ValueError:
+            raise ImportRowError(
+                f"некорректная дата «{record.get('start_date')}» / «{record.get('end_date')}»"
+            )
+        if end_date <= start_date:
+            raise ImportRowError("дата окончания раньше даты активации")
+
+        return _Row(line, telegram_id, fio, profile, tariff_id, start_date, end_date)
+
+    @staticmethod
+    async def _write_batch(session: AsyncSession, rows: list[_Row], result: ImportResult, seen: set[int]):
+        """
+        Пачка: upsert пользователей, поиск их ID и активных подписок, вставка новых подписок.
+        seen — telegram_id из предыдущих пачек, нужен только при dry_run: без записи в БД
+        повтор в файле иначе посчитался бы новым пользователем с новой подпиской.
+        """
+        telegram_ids = [row.telegram_id for row in rows]
+
+        existing_stmt = select(User.telegram_id).where(User.telegram_id.in_(telegram_ids))
+        existing = set((await session.execute(existing_stmt)).scalars())
+        result.users_created += len(set(telegram_ids) - existing - seen)
+
+        if not result.dry_run:
+            users = User.__table__
+            stmt = upsert(users)
+            # Пустые поля файла не затирают уже заполненную анкету; строка обновляется
+            # (и получает updated_at — от него зависит версия кэша выгрузки), только если поле изменилось
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[User.telegram_id],
+                set_={
+                    **{name: func.coalesce(stmt.excluded[name], users.c[name]) for name in PROFILE_FIELDS},
+                    "updated_at": func.now(),
+                },
+                where=or_(*(
+                    and_(stmt.excluded[name].isnot(None), stmt.excluded[name].is_distinct_from(users.c[name]))
+                    for name in PROFILE_FIELDS
+                )),
+            )
+            await session.execute(stmt, [
+                {
+                    "telegram_id": row.telegram_id,
+                    "first_name": row.fio,
+                    "referral_code": encode_referral_code(row.telegram_id),
+                    **row.profile,
+                }
+                for row in rows
+            ])
+
+        ids_stmt = select(User.telegram_id, User.id).where(User.telegram_id.in_(telegram_ids))
+        user_ids = dict((await session.execute(ids_stmt)).all())
+
+        active_stmt = select(Subscription.user_id).where(
+            Subscription.user_id.in_(list(user_ids.values())),
+            Subscription.status == SubscriptionStatus.ACTIVE,
+        ).distinct()
+        with_active = set((await session.execute(active_stmt)).scalars())
+
+        subscriptions = []
+        for row in rows:
+            user_id = user_ids.get(row.telegram_id)
+            if (user_id is not None and user_id in with_active) or row.telegram_id in seen:
+                result.skipped += 1
+                continue
+            result.added += 1
+            if user_id is not None:
+                subscriptions.append({
+                    "user_id": user_id,
+                    "tariff_id": row.tariff_id,
+                    "status": SubscriptionStatus.ACTIVE,
+                    "start_date": row.start_date,
+                    "end_date": row.end_date,
+                    "reminder_sent": False,
+                })
+
+        if result.dry_run:
+            seen.update(telegram_ids)
+        else:
+            if subscriptions:
+                await session.execute(insert(Subscription), subscriptions)
+            await session.commit()
+
+    @staticmethod
+    async def import_records(
+        session: AsyncSession,
+        records: Iterable[tuple[int, dict]],
+        dry_run: bool = False,
+        batch_size: Optional[int] = None,
+    ) -> ImportResult:
+        """
+        Импортировать записи (номер строки, поля).
+        dry_run — только проверить и посчитать, что было бы добавлено, ничего не записывая.
+        Каждая пачка фиксируется отдельно; ошибочные строки пропускаются и попадают в errors.
+        """
+        batch_size = batch_size or BulkImportService.BATCH_SIZE
+        result = ImportResult(dry_run=dry_run)
+        tariffs = await BulkImportService._load_tariffs(session)
+
+        batch: list[_Row] = []
+        batch_ids: set[int] = set()
+        seen: set[int] = set()
+        for line, record in records:
+            result.processed += 1
+            try:
+                row = BulkImportService._parse(line, record, tariffs)
+            except ImportRowError as e:
+                result.errors.append(f"строка {line}: {e}")
+                continue
+            if row.telegram_id in batch_ids:
+                # Повтор в одной пачке: обрабатываем после записи предыдущих строк,
+                # чтобы он увидел уже созданную подписку
+                await BulkImportService._write_batch(session, batch, result, seen)
+                batch, batch_ids = [], set()
+            batch.append(row)
+            batch_ids.add(row.telegram_id)
+            if len(batch) >= batch_size:
+                await BulkImportService._write_batch(session, batch, result, seen)
+                batch, batch_ids = [], set()
+
+        if batch:
+            await BulkImportService._write_batch(session, batch, result, seen)
+        return result
+
+    @staticmethod
+    async def import_stream(
+        session: AsyncSession,
+        stream: IO[str],
+        fmt: str,
+        dry_run: bool = False,
+    ) -> ImportResult:
+        """Импорт из открытого текстового файла"""
+        return await BulkImportService.import_records(session, iter_records(stream, fmt), dry_run=dry_run)
+
+    @staticmethod
+    async def import_file(
+        session: AsyncSession,
+        path: str,
+        fmt: Optional[str] = None,
+        dry_run: bool = False,
+    ) -> ImportResult:
+        """Импорт из файла; формат по расширению, если не указан"""
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            return await BulkImportService.import_stream(session, stream, fmt or detect_format(path), dry_run)
@@ -0,0 +1,305 @@
+"""
+Каталог парфюмерии: загрузка из CSV / JSON в БД и поиск по индексу в памяти.
+
+Индекс строится по названию, бренду, категории и артикулу: для каждого слова хранятся его
+префиксы из 1-2 символов и все триграммы. Запрос из 1-2 символов ищется по префиксу слова,
+более длинный — пересечением списков триграмм с последующей проверкой подстроки,
+так что поиск не обращается к БД и не перебирает весь каталог.
+"""
+import asyncio
+import json
+import re
+import time
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import IO, Iterable, Iterator, NamedTuple, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.base import upsert
+from database.models import CatalogItem, Subscription, SubscriptionStatus, User
+from services.bulk_import import ImportResult, detect_format, iter_records
+from services.cache import TTLCache
+from config import current_bot_name
+
+CATALOG_FORMATS = ("csv", "json", "jsonl")
+CATALOG_FIELDS = ("name", "brand", "category", "volume", "price", "description")
+
+_WORD_RE = re.compile(r"[0-9a-zа-я]+")
+
+
+class CatalogEntry(NamedTuple):
+    """Позиция каталога в индексе (без ORM-объекта)"""
+    id: int
+    sku: str
+    name: str
+    brand: Optional[str]
+    category: Optional[str]
+    volume: Optional[str]
+    price: Optional[Decimal]
+    description: Optional[str]
+
+
+def normalize_text(value: str) -> str:
+    return value.lower().replace("ё", "е")
+
+
+def tokenize(value: str) -> list[str]:
+    """Слова строки в нижнем регистре (ё -> е), без пунктуации"""
+    return _WORD_RE.findall(normalize_text(value))
+
+
+def _grams(word: str) -> set[str]:
+    """Ключи индекса для слова: ^префиксы из 1-2 символов и триграммы"""
+    keys = {"^" + word[:1], "^" + word[:2]}
+    keys.update(word[i:i + 3] for i in range(len(word) - 2))
+    return keys
+
+
+class CatalogIndex:
+    """
+    Неизменяемый индекс по снимку каталога; пересобирается целиком при изменении данных.
+    Позиции упорядочены по названию, списки позиций по ключам хранятся отсортированными
+    массивами (4 байта на запись), поэтому результат по префиксу не нужно сортировать.
+    """
+
+    def __init__(self, entries: Iterable[CatalogEntry]):
+        self.entries: list[CatalogEntry] = sorted(entries, key=lambda entry: normalize_text(entry.name))
+        # Слова позиции через пробел с ведущим пробелом: " " + слово in text — совпадение с началом слова
+        self._text: list[str] = []
+        postings: dict[str, list[int]] = defaultdict(list)
+        for position, entry in enumerate(self.entries):
+            words = tokenize(" ".join(filter(None, (entry.name, entry.brand, entry.category, entry.sku))))
+            self._text.append(" " + " ".join(words))
+            keys = set()
+            for word in words:
+                keys.update(_grams(word))
+            for key in keys:
+                postings[key].append(position)
+        self._postings: dict[str, array] = {key: array("I", value) for key, value in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _candidates(self, word: str) -> Sequence[int]:
+        """Позиции (по возрастанию), в словах которых есть word (1-2 символа — начало слова)"""
+        if len(word) < 3:
+            return self._postings.get("^" + word, ())
+        grams = sorted((self._postings.get(word[i:i + 3], ()) for i in range(len(word) - 2)), key=len)
+        result = set(grams[0])
+        for posting in grams[1:]:
+            if not result:
+                break
+            result.intersection_update(posting)
+        # Триграммы могут совпасть в разных местах строки — проверяем подстроку
+        return sorted(position for position in result if word in self._text[position])
+
+    def search(self, query: str, limit: int = 50, offset: int = 0) -> tuple[list[CatalogEntry], int]:
+        """
+        Позиции, содержащие все слова запроса (как начало слова или подстроку).
+        Совпадения с началом слова выше, затем по названию; пустой запрос — весь каталог по порядку.
+        Returns: (страница результатов, всего найдено)
+        """
+        words = sorted(set(tokenize(query)), key=len)
+        if not words:
+            return self.entries[offset:offset + limit], len(self.entries)
+
+        matched: Sequence[int] = self._candidates(words[-1])
+        for word in reversed(words[:-1]):
+            if not matched:
+                break
+            matched = sorted(set(matched).intersection(self._candidates(word)))
+
+        if all(len(word) < 3 for word in words):
+            ordered = matched  # все совпадения — с началом слова, порядок по названию уже есть
+        else:
+            text = self._text
+            prefixes = [" " + word for word in words]
+            ordered = sorted(matched, key=lambda position: -sum(prefix in text[position] for prefix in prefixes))
+        return [self.entries[position] for position in ordered[offset:offset + limit]], len(matched)
+
+
+def iter_catalog_records(stream: IO[str], fmt: str) -> Iterator[tuple[int, dict]]:
+    """Записи каталога из CSV, JSON-массива или JSONL: (номер строки / элемента, поля)"""
+    if fmt not in CATALOG_FORMATS:
+        raise ValueError(f"Unsupported catalog format: {fmt}")
+    if fmt == "json":
+        text = stream.read()
+        if text.lstrip().startswith("["):
+            for number, record in enumerate(json.loads(text), 1):
+                yield number, record if isinstance(record, dict) else {"__error__": "ожидался JSON-объект"}
+            return
+        yield from iter_records(text.splitlines(), "jsonl")
+        return
+    yield from iter_records(stream, fmt)
+
+
+class CatalogService:
+    """Сервис каталога парфюмерии"""
+
+    BATCH_SIZE = 1000
+    # Как часто проверять, не изменился ли каталог в БД (импорт мог выполниться в другом процессе)
+    CHECK_INTERVAL = 60.0
+
+    # Бот -> (индекс, отпечаток каталога в БД, время последней проверки)
+    _indexes: dict[str, tuple[CatalogIndex, tuple, float]] = {}
+    # Доступ к поиску, ключ — (бот, telegram_id): подписчики кэшируются дольше,
+    # чем те, у кого подписки нет (могут оплатить). forget_access сбрасывает кэш только в своём
+    # процессе: если платёж подтвердил воркер (RUN_SCHEDULER=false + worker.py), бот узнает
+    # о подписке по истечении TTL _non_subscribers — поэтому он намеренно короткий
+    _subscribers = TTLCache(ttl=300, maxsize=50_000)
+    _non_subscribers = TTLCache(ttl=30, maxsize=50_000)
+
+    @staticmethod
+    def _parse(record: dict) -> dict:
+        if "__error__" in record:
+            raise ValueError(record["__error__"])
+        sku = str(record.get("sku") or record.get("article") or "").strip()
+        name = str(record.get("name") or "").strip()
+        if not sku:
+            raise ValueError("нет артикула (sku)")
+        if not name:
+            raise ValueError("нет названия")
+        row = {"sku": sku, "name": name, "is_active": True}
+        for field in CATALOG_FIELDS[1:]:
+            value = record.get(field)
+            row[field] = (str(value).strip() or None) if value is not None else None
+        if row["price"] is not None:
+            try:
+                row["price"] = Decimal(row["price"].replace(" ", "").replace(",", "."))
+            except InvalidOperation:
+                raise ValueError(f"некорректная цена «{row['price']}»")
+        return row
+
+    @staticmethod
+    async def import_records(
+        session: AsyncSession,
+        records: Iterable[tuple[int, dict]],
+        dry_run: bool = False,
+    ) -> ImportResult:
+        """
+        Загрузить позиции (upsert по артикулу) пачками.
+        added — новые или обновлённые позиции; ошибочные строки попадают в errors.
+        """
+        result = ImportResult(dry_run=dry_run)
+        batch: list[dict] = []
+
+        async def flush():
+            if batch and not dry_run:
+                stmt = upsert(CatalogItem.__table__)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[CatalogItem.sku],
+                    set_={
+                        **{name: stmt.excluded[name] for name in CATALOG_FIELDS},
+                        "is_active": True,
+                        "updated_at": func.now(),
+                    },
+                )
+                await session.execute(stmt, batch)
+                await session.commit()
+            batch.clear()
+
+        for line, record in records:
+            result.processed += 1
+            try:
+                batch.append(CatalogService._parse(record))
+            except ValueError as e:
+                result.errors.append(f"строка {line}: {e}")
+                continue
+            result.added += 1
+            if len(batch) >= CatalogService.BATCH_SIZE:
+                await flush()
+        await flush()
+
+        if not dry_run:
+            CatalogService.invalidate_index()
+        return result
+
+    @staticmethod
+    async def import_file(
+        session: AsyncSession,
+        path: str,
+        fmt: Optional[str] = None,
+        dry_run: bool = False,
+    ) -> ImportResult:
+        """Импорт из файла; формат по расширению (.json — массив или JSONL), если не указан"""
+        if fmt is None:
+            fmt = "json" if path.lower().endswith(".json") else detect_format(path)
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            return await CatalogService.import_records(session, iter_catalog_records(stream, fmt), dry_run)
+
+    @staticmethod
+    def invalidate_index():
+        CatalogService._indexes.pop(current_bot_name(), None)
+
+    @staticmethod
+    async def _catalog_signature(session: AsyncSession) -> tuple:
+        stmt = select(
+            func.count(CatalogItem.id),
+            func.max(func.coalesce(CatalogItem.updated_at, CatalogItem.created_at)),
+        ).where(CatalogItem.is_active == True)
+        count, changed_at = (await session.execute(stmt)).one()
+        return count, str(changed_at)
+
+    @staticmethod
+    async def build_index(session: AsyncSession) -> CatalogIndex:
+        """Прочитать активные позиции одним запросом (без ORM-объектов) и построить индекс в отдельном потоке"""
+        stmt = select(
+            CatalogItem.id,
+            CatalogItem.sku,
+            CatalogItem.name,
+            CatalogItem.brand,
+            CatalogItem.category,
+            CatalogItem.volume,
+            CatalogItem.price,
+            CatalogItem.description,
+        ).where(CatalogItem.is_active == True).order_by(CatalogItem.id)
+        rows = (await session.execute(stmt)).all()
+        # На десятках тысяч позиций сборка занимает сотни миллисекунд — не держим event loop
+        return await asyncio.to_thread(CatalogIndex, [CatalogEntry(*row) for row in rows])
+
+    @staticmethod
+    async def get_index(session: AsyncSession) -> CatalogIndex:
+        """
+        Индекс каталога. Строится при первом обращении; не чаще раза в CHECK_INTERVAL
+        сверяется с БД (число позиций и время последнего изменения) и пересобирается, если каталог обновили.
+        """
+        now = time.monotonic()
+        bot_name = current_bot_name()
+        index, known_signature, checked_at = CatalogService._indexes.get(bot_name, (None, None, 0.0))
+        if index is not None and now - checked_at < CatalogService.CHECK_INTERVAL:
+            return index
+
+        signature = await CatalogService._catalog_signature(session)
+        if index is None or signature != known_signature:
+            index = await CatalogService.build_index(session)
+        CatalogService._indexes[bot_name] = (index, signature, now)
+        return index
+
+    @staticmethod
+    async def has_access(session: AsyncSession, telegram_id: int) -> bool:
+        """Есть ли у пользователя активная подписка (с кэшем, чтобы не ходить в БД на каждую букву запроса)"""
+        key = (current_bot_name(), telegram_id)
+        if key in CatalogService._subscribers:
+            return True
+        if key in CatalogService._non_subscribers:
+            return False
+
+        stmt = select(Subscription.id).join(User, User.id == Subscription.user_id).where(
+            User.telegram_id == telegram_id,
+            Subscription.status == SubscriptionStatus.ACTIVE,
+            Subscription.end_date > datetime.utcnow(),
+        ).limit(1)
+        allowed = (await session.execute(stmt)).first() is not None
+        (CatalogService._subscribers if allowed else CatalogService._non_subscribers).set(key, True)
+        return allowed
+
+    @staticmethod
+    def forget_access(telegram_id: int):
+        """Сбросить закэшированный доступ (например, после оплаты подписки)"""
+        key = (current_bot_name(), telegram_id)
+        CatalogService._subscribers.pop(key)
+        CatalogService._non_subscribers.pop(key)
@@ -0,0 +1,72 @@
+"""
+Кэш загруженных в Telegram документов (выгрузки, отчёты) по версии данных
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, and_
+from database.models import CachedDocument, Subscription, SubscriptionStatus, User
+from datetime import datetime
+from typing import Optional
+import hashlib
+
+
+class DocumentCacheService:
+    """
+    Сервис кэша документов.
+    Документ, сгенерированный для текущей версии данных, загружается в Telegram один раз;
+    дальше его file_id переиспользуется для любых админов, пока данные не изменятся.
+    """
+
+    @staticmethod
+    async def get_subscribers_data_version(session: AsyncSession) -> str:
+        """
+        Версия данных о подписчиках одним запросом: число активных подписок
+        (меняется и при истечении по времени), максимальные id и updated_at подписок и пользователей
+        """
+        now = datetime.utcnow()
+        stmt = select(
+            select(func.count(Subscription.id)).where(
+                and_(
+                    Subscription.status == SubscriptionStatus.ACTIVE,
+                    Subscription.end_date > now,
+                )
+            ).scalar_subquery(),
+            select(func.max(Subscription.id)).scalar_subquery(),
+            select(func.max(Subscription.updated_at)).scalar_subquery(),
+            select(func.max(User.id)).scalar_subquery(),
+            select(func.max(User.updated_at)).scalar_subquery(),
+        )
+        result = await session.execute(stmt)
+        raw = "|".join(str(value) for value in result.one())
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def build_key(kind: str, version: str) -> str:
+        return f"{kind}:{version}"
+
+    @staticmethod
+    async def get(session: AsyncSession, cache_key: str) -> Optional[CachedDocument]:
+        """Получить закэшированный документ по ключу"""
+        stmt = select(CachedDocument).where(CachedDocument.cache_key == cache_key)
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def save(
+        session: AsyncSession,
+        cache_key: str,
+        file_id: str,
+        caption: Optional[str] = None,
+    ):
+        """Сохранить file_id; записи того же вида со старыми версиями удаляются"""
+        kind = cache_key.split(":", 1)[0]
+        await session.execute(
+            delete(CachedDocument).where(CachedDocument.cache_key.like(f"{kind}:%"))
+        )
+        session.add(CachedDocument(cache_key=cache_key, file_id=file_id, caption=caption))
+        await session.commit()
+
+    @staticmethod
+    async def invalidate(session: AsyncSession, cache_key: str):
+        """Удалить запись (например, если Telegram больше не принимает file_id)"""
+        await session.execute(delete(CachedDocument).where(CachedDocument.cache_key == cache_key))
+        await session.commit()
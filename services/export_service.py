@@ -0,0 +1,124 @@
+"""
+Сервис выгрузки подписчиков в файл (TXT / CSV / JSONL)
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from aiogram.types import InputFile
+from database.models import Subscription, SubscriptionStatus, User, Tariff
+from services import rendering
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO
+import asyncio
+import contextlib
+import csv
+import io
+
+
+class SpooledInputFile(InputFile):
+    """InputFile для aiogram, читающий уже сформированный файл кусками, без загрузки в память"""
+
+    def __init__(self, file: BinaryIO, filename: str, chunk_size: int = 64 * 1024):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot):
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+class ExportService:
+    """Сервис выгрузки подписчиков"""
+
+    FORMATS = ("txt", "csv", "jsonl")
+
+    # Размер пачки строк, читаемых из БД за раз
+    BATCH_SIZE = 1000
+    # Файл держится в памяти до этого размера, дальше — на диске
+    SPOOL_MAX_SIZE = 1024 * 1024
+
+    CSV_HEADER = ("fio", "phone", "telegram_id", "username", "tariff", "start_date", "end_date")
+
+    @staticmethod
+    def _active_subscribers_stmt():
+        """Один запрос: активные подписки вместе с пользователем и тарифом"""
+        now = datetime.utcnow()
+        return (
+            select(
+                User.surname,
+                User.name,
+                User.patronymic,
+                User.first_name,
+                User.last_name,
+                User.phone,
+                User.telegram_id,
+                User.username,
+                Tariff.name.label("tariff_name"),
+                Subscription.start_date,
+                Subscription.end_date,
+            )
+            .select_from(Subscription)
+            .outerjoin(User, User.id == Subscription.user_id)
+            .outerjoin(Tariff, Tariff.id == Subscription.tariff_id)
+            .where(
+                and_(
+                    Subscription.status == SubscriptionStatus.ACTIVE,
+                    Subscription.end_date > now,
+                )
+            )
+            .order_by(Subscription.end_date.asc())
+            .execution_options(yield_per=ExportService.BATCH_SIZE)
+        )
+
+    @staticmethod
+    async def export_active_subscribers(
+        session: AsyncSession,
+        fmt: str = "txt",
+    ) -> tuple[SpooledTemporaryFile, int]:
+        """
+        Выгрузить активных подписчиков во временный файл.
+        Строки читаются из БД пачками и сразу пишутся в файл — память не растёт с числом подписчиков.
+        Текст пачки собирается в процессе рендеринга, пока из БД читается следующая.
+        Returns: (file, count) — файл нужно закрыть после отправки
+        """
+        if fmt not in ExportService.FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        file = SpooledTemporaryFile(max_size=ExportService.SPOOL_MAX_SIZE, mode="w+b")
+        if fmt == "csv":
+            header = io.StringIO()
+            csv.writer(header).writerow(ExportService.CSV_HEADER)
+            file.write(header.getvalue().encode("utf-8"))
+
+        count = 0
+        pending = None
+        try:
+            result = await session.stream(ExportService._active_subscribers_stmt())
+            async for rows in result.partitions():
+                rows = [tuple(row) for row in rows]
+                chunk = asyncio.ensure_future(rendering.render(rendering.render_export, fmt, rows, rows=rows))
+                previous, pending = pending, chunk
+                if previous is not None:
+                    file.write(await previous)
+                count += len(rows)
+            if pending is not None:
+                chunk, pending = pending, None
+                file.write(await chunk)
+        except BaseException:
+            # Ошибка чтения или рендеринга: незавершённый рендеринг отменяем и дожидаемся, файл закрываем
+            if pending is not None:
+                pending.cancel()
+                with contextlib.suppress(Exception, asyncio.CancelledError):
+                    await pending
+            file.close()
+            raise
+
+        if count == 0 and fmt == "txt":
+            file.write("Нет активных подписок.\n".encode("utf-8"))
+        file.seek(0)
+        return file, count
+
+    @staticmethod
+    def build_filename(fmt: str) -> str:
+        return f"subscribers_{datetime.utcnow().strftime('%Y-%m-%d_%H-%M')}.{fmt}"
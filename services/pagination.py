@@ -0,0 +1,33 @@
+"""
+Keyset-пагинация по (дата, id): курсоры для callback_data и сравнение с датами в БД
+"""
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import String, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(value: datetime, row_id: int) -> str:
+    """Курсор (дата, id) для callback_data: микросекунды с эпохи и id строки"""
+    micros = (value.replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}:{row_id}"
+
+
+def decode_cursor(value: str) -> tuple[datetime, int]:
+    micros, row_id = value.split(":")
+    return _EPOCH + timedelta(microseconds=int(micros)), int(row_id)
+
+
+def keyset_datetime(session: AsyncSession, value: datetime) -> Any:
+    """
+    Значение курсора для сравнения с колонкой DateTime.
+    SQLite хранит даты строками: server_default (CURRENT_TIMESTAMP) — без микросекунд,
+    а параметры SQLAlchemy — всегда с ними, и строки одной и той же секунды не равны.
+    Поэтому для SQLite сравниваем со строкой в формате, совпадающем с хранимым.
+    """
+    if session.bind.dialect.name != "sqlite":
+        return value
+    return literal(value.replace(tzinfo=None).isoformat(sep=" "), String)
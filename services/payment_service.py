@@ -3,11 +3,27 @@
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from database import statements
 from database.models import Payment, PaymentStatus, Subscription
-from typing import Optional
+from typing import Optional, List
+from contextlib import contextmanager
 import aiohttp
 import json
+import time
 from config import settings
+from monitoring.metrics import YOOKASSA_LATENCY
+from services.read_models import PendingPaymentRow, fetch_rows
+
+
+@contextmanager
+def _track_yookassa_call(endpoint: str):
+    """Замер времени вызова YooKassa; статус ответа записывается в call["status"]"""
+    call = {"status": "error"}
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        YOOKASSA_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, status=call["status"])
 
 
 class PaymentService:
@@ -25,11 +41,10 @@ class PaymentService:
         Returns: (payment, payment_url)
         """
         # Проверяем, нет ли уже активного платежа для этой подписки
-        stmt = select(Payment).where(
-            Payment.subscription_id == subscription_id,
-            Payment.status == PaymentStatus.PENDING,
+        result = await session.execute(
+            statements.PENDING_PAYMENT_BY_SUBSCRIPTION,
+            {"subscription_id": subscription_id},
         )
-        result = await session.execute(stmt)
         existing_payment = result.scalar_one_or_none()
         
         if existing_payment:
@@ -95,16 +110,18 @@ class PaymentService:
             "Idempotence-Key": idempotence_key
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payment_data, auth=auth, headers=headers) as response:
-                if response.status not in (200, 201):
-                    error_text = await response.text()
-                    raise Exception(f"YooKassa API error: {response.status} - {error_text}")
-                
-                data = await response.json()
-                payment_id = data["id"]
-                payment_url = data["confirmation"]["confirmation_url"]
-                return payment_id, payment_url
+        with _track_yookassa_call("create_payment") as call:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, json=payment_data, auth=auth, headers=headers) as response:
+                    call["status"] = str(response.status)
+                    if response.status not in (200, 201):
+                        error_text = await response.text()
+                        raise Exception(f"YooKassa API error: {response.status} - {error_text}")
+                    
+                    data = await response.json()
+                    payment_id = data["id"]
+                    payment_url = data["confirmation"]["confirmation_url"]
+                    return payment_id, payment_url
     
     @staticmethod
     async def _get_payment_url(payment_id: str) -> str:
@@ -112,12 +129,14 @@ class PaymentService:
         url = f"https://api.yookassa.ru/v3/payments/{payment_id}"
         auth = aiohttp.BasicAuth(settings.YOOKASSA_SHOP_ID, settings.YOOKASSA_SECRET_KEY)
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, auth=auth) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to get payment: {response.status}")
-                data = await response.json()
-                return data["confirmation"]["confirmation_url"]
+        with _track_yookassa_call("get_payment") as call:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url, auth=auth) as response:
+                    call["status"] = str(response.status)
+                    if response.status != 200:
+                        raise Exception(f"Failed to get payment: {response.status}")
+                    data = await response.json()
+                    return data["confirmation"]["confirmation_url"]
     
     @staticmethod
     async def get_payment_by_yookassa_id(
@@ -129,6 +148,19 @@ class PaymentService:
         result = await session.execute(stmt)
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_pending_payments(session: AsyncSession) -> List[PendingPaymentRow]:
+        """Платежи в статусе PENDING (для проверки в YooKassa), новые первыми"""
+        stmt = select(
+            Payment.id,
+            Payment.user_id,
+            Payment.subscription_id,
+            Payment.yookassa_payment_id,
+        ).where(
+            Payment.status == PaymentStatus.PENDING
+        ).order_by(Payment.created_at.desc())
+        return await fetch_rows(session, stmt, PendingPaymentRow)
+    
     @staticmethod
     async def update_payment_status(
         session: AsyncSession,
@@ -157,26 +189,34 @@ class PaymentService:
         if not payment.yookassa_payment_id:
             return payment.status
         
-        url = f"https://api.yookassa.ru/v3/payments/{payment.yookassa_payment_id}"
+        yookassa_status = await PaymentService._fetch_yookassa_status(payment.yookassa_payment_id)
+        if yookassa_status is None:
+            return payment.status
+        
+        if yookassa_status == "succeeded":
+            new_status = PaymentStatus.SUCCEEDED
+        elif yookassa_status == "canceled":
+            new_status = PaymentStatus.CANCELED
+        else:
+            new_status = PaymentStatus.PENDING
+        
+        if new_status != payment.status:
+            payment.status = new_status
+            await session.commit()
+        
+        return payment.status
+    
+    @staticmethod
+    async def _fetch_yookassa_status(yookassa_payment_id: str) -> Optional[str]:
+        """Статус платежа в YooKassa API (None — API ответил ошибкой)"""
+        url = f"https://api.yookassa.ru/v3/payments/{yookassa_payment_id}"
         auth = aiohttp.BasicAuth(settings.YOOKASSA_SHOP_ID, settings.YOOKASSA_SECRET_KEY)
         
-        async with aiohttp.ClientSession() as session_http:
-            async with session_http.get(url, auth=auth) as response:
-                if response.status != 200:
-                    return payment.status
-                
-                data = await response.json()
-                yookassa_status = data.get("status")
-                
-                if yookassa_status == "succeeded":
-                    new_status = PaymentStatus.SUCCEEDED
-                elif yookassa_status == "canceled":
-                    new_status = PaymentStatus.CANCELED
-                else:
-                    new_status = PaymentStatus.PENDING
-                
-                if new_status != payment.status:
-                    payment.status = new_status
-                    await session.commit()
-                
-                return payment.status
+        with _track_yookassa_call("check_payment_status") as call:
+            async with aiohttp.ClientSession() as session_http:
+                async with session_http.get(url, auth=auth) as response:
+                    call["status"] = str(response.status)
+                    if response.status != 200:
+                        return None
+                    data = await response.json()
+                    return data.get("status")
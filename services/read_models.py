@@ -0,0 +1,95 @@
+"""
+Read-модели для массовых выборок (отчёты, выгрузки, задачи планировщика):
+компактные строки NamedTuple из одного Core-запроса только с нужными колонками —
+без ORM-объектов, identity map и отслеживания изменений
+"""
+from datetime import datetime
+from typing import Any, NamedTuple, Optional, TypeVar
+
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+# Размер пачки при чтении строк: между пачками event loop обслуживает апдейты
+FETCH_BATCH = 1000
+
+RowT = TypeVar("RowT", bound=tuple)
+
+
+class SubscriberStateRow(NamedTuple):
+    """Активный подписчик для снимка отчёта: последняя активная подписка пользователя"""
+    user_id: int
+    end_ts: int  # end_date в секундах с эпохи (UTC)
+    tariff_id: int
+
+
+class ActiveSubscriptionRow(NamedTuple):
+    """Активная подписка"""
+    id: int
+    user_id: int
+    tariff_id: int
+    start_date: Optional[datetime]
+    end_date: datetime
+
+
+class SubscriberCardRow(NamedTuple):
+    """Карточка подписчика в админском списке"""
+    id: int
+    start_date: Optional[datetime]
+    end_date: datetime
+    telegram_id: int
+    surname: Optional[str]
+    name: Optional[str]
+    patronymic: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone: Optional[str]
+    tariff_name: Optional[str]
+
+
+class ReminderRow(NamedTuple):
+    """Подписка, которой нужно напоминание об окончании, вместе с чатом пользователя"""
+    subscription_id: int
+    telegram_id: int
+    end_date: datetime
+
+
+class PendingPaymentRow(NamedTuple):
+    """Платёж в статусе PENDING для проверки в YooKassa"""
+    id: int
+    user_id: int
+    subscription_id: Optional[int]
+    yookassa_payment_id: Optional[str]
+
+
+class PendingBonusRow(NamedTuple):
+    """Невыданный реферальный бонус вместе с данными пользователя"""
+    id: int
+    user_id: int
+    telegram_id: int
+    username: Optional[str]
+    active_referrals_count: int
+    has_active_subscription: bool
+
+
+def epoch_seconds(session: AsyncSession, column: Any) -> Any:
+    """
+    Колонка DateTime -> секунды с эпохи, посчитанные в БД: драйвер не создаёт datetime на каждую строку.
+    SQLite хранит даты строками UTC, strftime('%s') их разбирает; в остальных СУБД — extract(epoch).
+    """
+    if session.bind.dialect.name == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    return cast(func.extract("epoch", column), Integer)
+
+
+async def fetch_rows(session: AsyncSession, stmt: Select, row_type: type[RowT]) -> list[RowT]:
+    """
+    Выполнить Core-запрос и вернуть строки как row_type (порядок полей = порядок колонок запроса).
+    Строки читаются пачками по FETCH_BATCH, чтобы большая выборка не блокировала event loop целиком.
+    """
+    make = row_type._make
+    rows: list[RowT] = []
+    result = await session.stream(stmt.execution_options(yield_per=FETCH_BATCH))
+    async for partition in result.partitions():
+        rows.extend(map(make, partition))
+    return rows
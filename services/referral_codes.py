@@ -0,0 +1,108 @@
+"""
+Реферальные коды без проверки уникальности в БД.
+
+Код — перемешанный telegram_id: 64-битная перестановка (4 раунда сети Фейстеля с HMAC-SHA256
+на секретном ключе из настроек), 13 символов base32 Крокфорда и контрольный символ.
+Перестановка — биекция, поэтому разные telegram_id всегда дают разные коды, коллизий нет
+и запрашивать БД не нужно; без ключа код нельзя превратить обратно в telegram_id, а коды
+соседних пользователей не похожи. Формат и контрольный символ проверяются до обращения к БД.
+Старые коды (8 символов A-Z0-9) по-прежнему принимаются.
+"""
+import functools
+import hashlib
+import hmac
+import re
+from typing import Optional
+
+from config import settings
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # base32 Крокфорда: без I, L, O, U
+CODE_DIGITS = 13  # 64 бита
+CODE_LENGTH = CODE_DIGITS + 1  # + контрольный символ
+_CHECK_MODULUS = 31  # простое: ловит почти все замены одного символа и перестановки соседних
+
+_MASK = (1 << 64) - 1
+_HALF_MASK = (1 << 32) - 1
+_ROUNDS = 4  # четыре раунда с псевдослучайной функцией дают стойкую перестановку (Luby–Rackoff)
+
+_INDEX = {char: i for i, char in enumerate(ALPHABET)}
+_LEGACY_RE = re.compile(r"^[A-Z0-9]{8}$")
+
+
+@functools.lru_cache(maxsize=16)
+def _derive_key(secret: str) -> bytes:
+    return hmac.new(secret.encode("utf-8"), b"referral-code", hashlib.sha256).digest()
+
+
+def _key() -> bytes:
+    """Ключ текущего бота: REFERRAL_CODE_SECRET или, если он не задан, BOT_TOKEN"""
+    return _derive_key(settings.REFERRAL_CODE_SECRET or settings.BOT_TOKEN)
+
+
+def _round(key: bytes, index: int, half: int) -> int:
+    digest = hmac.new(key, bytes((index,)) + half.to_bytes(4, "big"), hashlib.sha256).digest()
+    return int.from_bytes(digest[:4], "big")
+
+
+def _mix(value: int, key: bytes) -> int:
+    left, right = value >> 32, value & _HALF_MASK
+    for index in range(_ROUNDS):
+        left, right = right, left ^ _round(key, index, right)
+    return (left << 32) | right
+
+
+def _unmix(value: int, key: bytes) -> int:
+    left, right = value >> 32, value & _HALF_MASK
+    for index in reversed(range(_ROUNDS)):
+        left, right = right ^ _round(key, index, left), left
+    return (left << 32) | right
+
+
+def _check_char(digits: str) -> str:
+    total = sum((i + 1) * _INDEX[char] for i, char in enumerate(digits))
+    return ALPHABET[total % _CHECK_MODULUS]
+
+
+def encode_referral_code(telegram_id: int) -> str:
+    """Реферальный код пользователя (14 символов)"""
+    if not 0 <= telegram_id <= _MASK:
+        raise ValueError(f"telegram_id out of range: {telegram_id}")
+    value = _mix(telegram_id, _key())
+    digits = []
+    for _ in range(CODE_DIGITS):
+        value, rest = divmod(value, 32)
+        digits.append(ALPHABET[rest])
+    body = "".join(reversed(digits))
+    return body + _check_char(body)
+
+
+def decode_referral_code(code: str) -> Optional[int]:
+    """
+    telegram_id владельца кода (по ключу текущего бота) или None, если это не код нового формата /
+    не сходится контрольный символ
+    """
+    code = code.strip().upper()
+    if len(code) != CODE_LENGTH or any(char not in _INDEX for char in code):
+        return None
+    body, check = code[:-1], code[-1]
+    if _check_char(body) != check:
+        return None
+    value = 0
+    for char in body:
+        value = value * 32 + _INDEX[char]
+    if value > _MASK:
+        return None
+    return _unmix(value, _key())
+
+
+def is_valid_referral_code(code: Optional[str]) -> bool:
+    """Похоже ли значение на реферальный код (новый формат или старый 8-символьный)"""
+    if not code:
+        return False
+    code = code.strip().upper()
+    return decode_referral_code(code) is not None or bool(_LEGACY_RE.match(code))
+
+
+def normalize_referral_code(code: str) -> str:
+    """Код в том виде, в котором он хранится в БД"""
+    return code.strip().upper()
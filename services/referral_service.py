@@ -2,11 +2,12 @@
 Сервис для работы с реферальной системой
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, exists
+from database.base import upsert
 from database.models import User, Referral, ReferralBonus, ReferralBonusStatus, Subscription, SubscriptionStatus
 from datetime import datetime
 from typing import Optional, List
-from services.subscription_service import SubscriptionService
+from services.read_models import PendingBonusRow, fetch_rows
 
 
 class ReferralService:
@@ -21,29 +22,20 @@ class ReferralService:
         referrer_id: int,
         referred_id: int,
     ) -> Referral:
-        """Создать запись о реферале"""
-        # Проверяем, не существует ли уже такая запись
-        stmt = select(Referral).where(
-            and_(
-                Referral.referrer_id == referrer_id,
-                Referral.referred_id == referred_id,
-            )
-        )
-        result = await session.execute(stmt)
-        existing = result.scalar_one_or_none()
-        
-        if existing:
-            return existing
-        
-        referral = Referral(
+        """
+        Создать запись о реферале. У приглашённого может быть только один реферер:
+        если запись для referred_id уже есть, возвращается она (как в UserService._add_referral)
+        """
+        stmt = upsert(Referral).values(
             referrer_id=referrer_id,
             referred_id=referred_id,
             has_paid_subscription=False,
-        )
-        session.add(referral)
+        ).on_conflict_do_nothing(index_elements=[Referral.referred_id])
+        await session.execute(stmt)
         await session.commit()
-        await session.refresh(referral)
-        return referral
+        
+        result = await session.execute(select(Referral).where(Referral.referred_id == referred_id))
+        return result.scalar_one()
     
     @staticmethod
     async def mark_referral_as_paid(
@@ -103,41 +95,34 @@ class ReferralService:
             await session.commit()
             await session.refresh(bonus)
     
+    @staticmethod
+    def _active_paid_referrals_stmt(referrer_id: int):
+        """Запрос: число оплаченных рефералов, у которых сейчас есть активная подписка"""
+        has_active = exists().where(
+            and_(
+                Subscription.user_id == Referral.referred_id,
+                Subscription.status == SubscriptionStatus.ACTIVE,
+                Subscription.end_date > datetime.utcnow(),
+            )
+        )
+        return select(func.count(Referral.id)).where(
+            and_(
+                Referral.referrer_id == referrer_id,
+                Referral.has_paid_subscription == True,
+                has_active,
+            )
+        )
+    
     @staticmethod
     async def count_active_paid_referrals(
         session: AsyncSession,
         referrer_id: int,
     ) -> int:
         """
-        Подсчитать количество активных оплаченных рефералов
+        Подсчитать количество активных оплаченных рефералов (одним запросом)
         """
-        # Получаем всех рефералов с оплаченными подписками
-        stmt = select(Referral).where(
-            and_(
-                Referral.referrer_id == referrer_id,
-                Referral.has_paid_subscription == True,
-            )
-        )
-        result = await session.execute(stmt)
-        referrals = list(result.scalars().all())
-        
-        if not referrals:
-            return 0
-        
-        # Проверяем, что у рефералов есть активная подписка
-        now = datetime.utcnow()
-        active_count = 0
-        
-        for referral in referrals:
-            # Проверяем наличие активной подписки
-            active_sub = await SubscriptionService.get_active_subscription(
-                session,
-                referral.referred_id,
-            )
-            if active_sub:
-                active_count += 1
-        
-        return active_count
+        result = await session.execute(ReferralService._active_paid_referrals_stmt(referrer_id))
+        return result.scalar_one() or 0
     
     @staticmethod
     async def get_referral_stats(
@@ -155,34 +140,30 @@ class ReferralService:
             "referral_code": str,
         }
         """
-        # Получаем пользователя
-        stmt = select(User).where(User.id == user_id)
-        result = await session.execute(stmt)
-        user = result.scalar_one()
-        
-        # Общее количество рефералов
-        stmt = select(func.count(Referral.id)).where(Referral.referrer_id == user_id)
-        result = await session.execute(stmt)
-        total_referrals = result.scalar_one() or 0
-        
-        # Количество оплаченных рефералов
-        stmt = select(func.count(Referral.id)).where(
+        # Всё одним запросом: код пользователя и счётчики — скалярными подзапросами
+        total_stmt = select(func.count(Referral.id)).where(Referral.referrer_id == user_id)
+        paid_stmt = select(func.count(Referral.id)).where(
             and_(
                 Referral.referrer_id == user_id,
                 Referral.has_paid_subscription == True,
             )
         )
+        bonus_issued_stmt = exists().where(
+            and_(
+                ReferralBonus.user_id == user_id,
+                ReferralBonus.status != ReferralBonusStatus.PENDING,
+            )
+        )
+        stmt = select(
+            User.referral_code,
+            total_stmt.scalar_subquery(),
+            paid_stmt.scalar_subquery(),
+            ReferralService._active_paid_referrals_stmt(user_id).scalar_subquery(),
+            bonus_issued_stmt,
+        ).where(User.id == user_id)
         result = await session.execute(stmt)
-        paid_referrals = result.scalar_one() or 0
-        
-        # Количество активных оплаченных рефералов
-        active_paid_referrals = await ReferralService.count_active_paid_referrals(session, user_id)
-        
-        # Проверяем бонус
-        stmt = select(ReferralBonus).where(User.id == user_id)
-        result = await session.execute(stmt)
-        bonuses = list(result.scalars().all())
-        bonus_issued = any(b.status != ReferralBonusStatus.PENDING for b in bonuses)
+        referral_code, total_referrals, paid_referrals, active_paid_referrals, bonus_issued = result.one()
+        bonus_issued = bool(bonus_issued)
         bonus_available = active_paid_referrals >= ReferralService.BONUS_THRESHOLD and not bonus_issued
         
         return {
@@ -191,18 +172,37 @@ class ReferralService:
             "active_paid_referrals": active_paid_referrals,
             "bonus_available": bonus_available,
             "bonus_issued": bonus_issued,
-            "referral_code": user.referral_code,
+            "referral_code": referral_code,
             "remaining_for_bonus": max(0, ReferralService.BONUS_THRESHOLD - active_paid_referrals),
         }
     
     @staticmethod
-    async def get_pending_bonuses(session: AsyncSession) -> List[ReferralBonus]:
-        """Получить все ожидающие бонусы (для уведомлений)"""
-        stmt = select(ReferralBonus).where(
-            ReferralBonus.status == ReferralBonusStatus.PENDING
+    async def get_pending_bonuses(session: AsyncSession) -> List[PendingBonusRow]:
+        """
+        Получить все ожидающие бонусы (для уведомлений) —
+        вместе с telegram_id, username пользователя и наличием у него активной подписки
+        """
+        now = datetime.utcnow()
+        has_active = exists().where(
+            and_(
+                Subscription.user_id == ReferralBonus.user_id,
+                Subscription.status == SubscriptionStatus.ACTIVE,
+                Subscription.end_date > now,
+            )
         )
-        result = await session.execute(stmt)
-        return list(result.scalars().all())
+        stmt = (
+            select(
+                ReferralBonus.id,
+                ReferralBonus.user_id,
+                User.telegram_id,
+                User.username,
+                ReferralBonus.active_referrals_count,
+                has_active,
+            )
+            .join(User, User.id == ReferralBonus.user_id)
+            .where(ReferralBonus.status == ReferralBonusStatus.PENDING)
+        )
+        return await fetch_rows(session, stmt, PendingBonusRow)
     
     @staticmethod
     async def mark_bonus_notified(
@@ -0,0 +1,195 @@
+"""
+Рендеринг больших текстов (ежедневный отчёт, выгрузки) в отдельном процессе.
+Функции рендеринга принимают обычные кортежи (их можно передать в другой процесс)
+и не обращаются к БД; event loop только ждёт результат и продолжает обслуживать апдейты.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Callable, NamedTuple, Optional, Sequence
+import asyncio
+import csv
+import html
+import io
+import json
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+# Меньше этого числа строк рендерим прямо в event loop: передача в процесс дороже самой работы
+INLINE_MAX_ROWS = 300
+
+_EPOCH = datetime(1970, 1, 1)
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class ReportRow(NamedTuple):
+    """Строка ежедневного отчёта"""
+    surname: Optional[str]
+    name: Optional[str]
+    patronymic: Optional[str]
+    phone: Optional[str]
+    username: Optional[str]
+    telegram_id: Optional[int]
+    end_ts: int
+    tariff_name: str
+
+
+class ExportRow(NamedTuple):
+    """Строка выгрузки подписчиков — порядок колонок ExportService._active_subscribers_stmt"""
+    surname: Optional[str]
+    name: Optional[str]
+    patronymic: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone: Optional[str]
+    telegram_id: Optional[int]
+    username: Optional[str]
+    tariff_name: Optional[str]
+    start_date: Optional[datetime]
+    end_date: Optional[datetime]
+
+
+def split_message(header: str, lines: list[str], max_len: int = 4096) -> list[str]:
+    """Разбить текст на сообщения не длиннее max_len (лимит Telegram), не разрывая строки"""
+    parts = []
+    current = header
+    for line in lines:
+        line_ = line + "\n"
+        if len(current) + len(line_) > max_len and current:
+            parts.append(current.rstrip("\n"))
+            current = ""
+        current += line_
+    if current.strip():
+        parts.append(current.rstrip("\n"))
+    return parts
+
+
+# --- Ежедневный отчёт ---
+
+def _report_line(i: int, row: ReportRow) -> str:
+    fio = " ".join(filter(None, [row.surname, row.name, row.patronymic])).strip() or "—"
+    username = f"@{row.username}" if row.username else "—"
+    tg_id = row.telegram_id if row.telegram_id is not None else "—"
+    end_str = (_EPOCH + timedelta(seconds=row.end_ts)).strftime("%d.%m.%Y")
+    return html.escape(f"{i}. {fio} | {row.phone or '—'} | {username} | ID: {tg_id} | {row.tariff_name} | до {end_str}")
+
+
+def render_daily_report(header: str, sections: list[tuple[str, list[tuple]]]) -> list[str]:
+    """Секции (заголовок, строки ReportRow) -> сообщения отчёта не длиннее лимита Telegram"""
+    lines = []
+    for title, rows in sections:
+        lines.append("")
+        lines.append(f"{title}: {len(rows)}")
+        lines.extend(_report_line(i, ReportRow._make(row)) for i, row in enumerate(rows, 1))
+    return split_message(header, lines)
+
+
+# --- Выгрузки ---
+
+def _fio(row: ExportRow) -> str:
+    fio = " ".join(filter(None, [row.surname, row.name, row.patronymic])).strip()
+    if not fio and row.telegram_id is not None:
+        fio = f"{row.first_name or ''} {row.last_name or ''}".strip() or f"ID {row.telegram_id}"
+    return fio or "—"
+
+
+def _format_date(value) -> str:
+    return value.strftime("%d.%m.%Y") if value else "—"
+
+
+def _export_txt(rows: list[ExportRow]) -> str:
+    blocks = []
+    for row in rows:
+        blocks.append(
+            f"👤 {_fio(row)}\n"
+            f"📱 Телефон: {row.phone or '—'}\n"
+            f"🆔 Telegram ID: {row.telegram_id if row.telegram_id is not None else '—'}\n"
+            f"📦 Тариф: {row.tariff_name or '—'}\n"
+            f"📅 Активация: {_format_date(row.start_date)}\n"
+            f"📅 Окончание: {_format_date(row.end_date)}\n"
+            f"━━━━━━━━━━━━━━━━━━━━\n"
+        )
+    return "\n".join(blocks) + "\n"
+
+
+def _export_csv(rows: list[ExportRow]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow((
+            _fio(row),
+            row.phone or "",
+            row.telegram_id if row.telegram_id is not None else "",
+            row.username or "",
+            row.tariff_name or "",
+            row.start_date.date().isoformat() if row.start_date else "",
+            row.end_date.date().isoformat() if row.end_date else "",
+        ))
+    return buffer.getvalue()
+
+
+def _export_jsonl(rows: list[ExportRow]) -> str:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({
+            "fio": _fio(row),
+            "phone": row.phone,
+            "telegram_id": row.telegram_id,
+            "username": row.username,
+            "tariff": row.tariff_name,
+            "start_date": row.start_date.date().isoformat() if row.start_date else None,
+            "end_date": row.end_date.date().isoformat() if row.end_date else None,
+        }, ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+_EXPORT_RENDERERS = {"txt": _export_txt, "csv": _export_csv, "jsonl": _export_jsonl}
+
+
+def render_export(fmt: str, rows: list[tuple]) -> bytes:
+    """Пачка строк ExportRow -> байты файла выгрузки в формате fmt"""
+    return _EXPORT_RENDERERS[fmt]([ExportRow._make(row) for row in rows]).encode("utf-8")
+
+
+# --- Пул процессов ---
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Пул рендеринга (создаётся при первом обращении); None — RENDER_WORKERS=0, рендерим в event loop"""
+    global _pool
+    from config import settings
+
+    if _pool is None and settings.RENDER_WORKERS > 0:
+        # spawn: дочерний процесс не наследует потоки (логи, watchdog) и соединения с БД
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    """Остановить процессы рендеринга (при остановке приложения)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def render(func: Callable[..., Any], *args: Any, rows: Sequence = ()) -> Any:
+    """
+    Выполнить функцию рендеринга в пуле процессов; rows — строки, по числу которых решается,
+    стоит ли передавать работу в другой процесс (мелкие задачи выполняются сразу)
+    """
+    pool = get_pool() if len(rows) > INLINE_MAX_ROWS else None
+    if pool is None:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # Процесс пула упал (OOM и т.п.) — пересоздаём пул, а эту задачу выполняем здесь
+        logger.warning("Render pool is broken, restarting it")
+        shutdown_pool()
+        return func(*args)
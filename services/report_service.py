@@ -0,0 +1,160 @@
+"""
+Сервис ежедневного отчёта по подписчикам: снимок активных подписок и разница со вчерашним днём
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from database.models import ReportSnapshot, User, Tariff
+from services.subscription_service import SubscriptionService
+from services import rendering
+from services.rendering import split_message
+from datetime import datetime, timedelta
+from typing import Optional
+import json
+import zlib
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class ReportService:
+    """Сервис ежедневного отчёта"""
+
+    SNAPSHOT_KIND = "active_subscribers"
+    # За сколько дней до окончания подписка попадает в «истекают скоро»
+    EXPIRING_DAYS = 3
+    # Размер пачки id в запросах IN (...)
+    ID_BATCH = 500
+
+    @staticmethod
+    def _to_ts(value: datetime) -> int:
+        return int((value.replace(tzinfo=None) - _EPOCH).total_seconds())
+
+    @staticmethod
+    async def build_state(session: AsyncSession) -> dict[int, tuple[int, int]]:
+        """Текущее состояние: user_id -> (end_date в секундах с эпохи, tariff_id)"""
+        rows = await SubscriptionService.get_active_subscribers_state(session=session)
+        return {row.user_id: (row.end_ts, row.tariff_id) for row in rows}
+
+    @staticmethod
+    async def load_snapshot(session: AsyncSession) -> Optional[dict[int, tuple[int, int]]]:
+        """Загрузить последний сохранённый снимок (None, если его ещё нет)"""
+        stmt = select(ReportSnapshot).where(ReportSnapshot.kind == ReportService.SNAPSHOT_KIND)
+        result = await session.execute(stmt)
+        snapshot = result.scalar_one_or_none()
+        if not snapshot:
+            return None
+        data = json.loads(zlib.decompress(snapshot.payload))
+        return {u: (e, t) for u, e, t in zip(data["u"], data["e"], data["t"])}
+
+    @staticmethod
+    async def save_snapshot(session: AsyncSession, state: dict[int, tuple[int, int]]):
+        """Сохранить снимок: три параллельных списка, JSON + zlib"""
+        user_ids = sorted(state)
+        payload = zlib.compress(json.dumps({
+            "u": user_ids,
+            "e": [state[u][0] for u in user_ids],
+            "t": [state[u][1] for u in user_ids],
+        }, separators=(",", ":")).encode("utf-8"))
+
+        stmt = select(ReportSnapshot).where(ReportSnapshot.kind == ReportService.SNAPSHOT_KIND)
+        result = await session.execute(stmt)
+        snapshot = result.scalar_one_or_none()
+        if snapshot:
+            snapshot.payload = payload
+        else:
+            session.add(ReportSnapshot(kind=ReportService.SNAPSHOT_KIND, payload=payload))
+        await session.commit()
+
+    @staticmethod
+    def diff(
+        previous: dict[int, tuple[int, int]],
+        current: dict[int, tuple[int, int]],
+        now: datetime,
+    ) -> dict[str, list[int]]:
+        """
+        Разница двух снимков.
+        Returns: {"new": [...], "renewed": [...], "expired": [...], "expiring": [...]} — списки user_id
+        """
+        expiring_ts = ReportService._to_ts(now + timedelta(days=ReportService.EXPIRING_DAYS))
+        new, renewed, expiring = [], [], []
+        for user_id, (end_ts, _) in current.items():
+            prev = previous.get(user_id)
+            if prev is None:
+                new.append(user_id)
+            elif end_ts > prev[0]:
+                renewed.append(user_id)
+            if end_ts <= expiring_ts:
+                expiring.append(user_id)
+        expired = [user_id for user_id in previous if user_id not in current]
+        return {"new": new, "renewed": renewed, "expired": expired, "expiring": expiring}
+
+    @staticmethod
+    async def _load_users(session: AsyncSession, user_ids: list[int]) -> dict[int, tuple]:
+        """Данные пользователей для строк отчёта — пачками по ID_BATCH"""
+        users = {}
+        for i in range(0, len(user_ids), ReportService.ID_BATCH):
+            batch = user_ids[i:i + ReportService.ID_BATCH]
+            stmt = select(
+                User.id, User.surname, User.name, User.patronymic,
+                User.phone, User.username, User.telegram_id,
+            ).where(User.id.in_(batch))
+            result = await session.execute(stmt)
+            for row in result.all():
+                users[row.id] = row
+        return users
+
+    @staticmethod
+    async def build_daily_report(session: AsyncSession) -> tuple[list[str], dict[int, tuple[int, int]]]:
+        """
+        Сформировать ежедневный отчёт: итог и изменения со времени прошлого отчёта
+        (новые, продлившие, истёкшие, истекающие скоро).
+        Объём работы и текста зависит от числа изменений, а не от размера базы.
+        Новый снимок не сохраняется: вызывающий сохраняет его через save_snapshot после
+        доставки отчёта, иначе изменения недоставленного отчёта потерялись бы.
+        Returns: (список сообщений — каждое не длиннее лимита Telegram, текущее состояние для снимка)
+        """
+        now = datetime.utcnow()
+        current = await ReportService.build_state(session)
+        previous = await ReportService.load_snapshot(session)
+
+        date_str = now.strftime("%d.%m.%Y %H:%M")
+        header = (
+            f"📋 <b>Отчёт: подписчики с активной подпиской</b>\n"
+            f"Дата: {date_str}\n"
+            f"Всего активных: {len(current)}"
+        )
+
+        if previous is None:
+            header += "\n\nПервый отчёт: снимок сохранён, со следующего дня придут только изменения.\n"
+            return split_message(header, []), current
+
+        delta = len(current) - len(previous)
+        header += f" ({'+' if delta >= 0 else ''}{delta})\n"
+
+        changes = ReportService.diff(previous, current, now)
+        involved = sorted({user_id for ids in changes.values() for user_id in ids})
+        users = await ReportService._load_users(session, involved)
+        result = await session.execute(select(Tariff.id, Tariff.name))
+        tariff_names = {row.id: row.name for row in result.all()}
+
+        sections = [
+            ("new", "🆕 <b>Новые</b>", current),
+            ("renewed", "🔄 <b>Продлили</b>", current),
+            ("expired", "❌ <b>Истекли</b>", previous),
+            ("expiring", f"⏰ <b>Истекают в ближайшие {ReportService.EXPIRING_DAYS} дн.</b>", current),
+        ]
+        # Строки отчёта — простые кортежи: текст собирается в процессе рендеринга
+        rendered_sections = []
+        missing = (None,) * 6
+        for key, title, source in sections:
+            user_ids = sorted(changes[key], key=lambda u: source[u][0])
+            rows = []
+            for user_id in user_ids:
+                end_ts, tariff_id = source[user_id]
+                user = users.get(user_id)
+                rows.append((*(user[1:] if user else missing), end_ts, tariff_names.get(tariff_id, "—")))
+            rendered_sections.append((title, rows))
+
+        parts = await rendering.render(
+            rendering.render_daily_report, header, rendered_sections, rows=involved,
+        )
+        return parts, current
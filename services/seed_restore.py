@@ -1,13 +1,9 @@
 """
 Восстановление списка подписчиков в БД (общая логика для скрипта и админ-команды).
 """
-from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from database.models import User, Subscription, SubscriptionStatus
-from services.user_service import UserService
-from services.tariff_service import TariffService
+from services.bulk_import import BulkImportService
 
 # Список подписчиков: ФИО, телефон, Telegram ID, тариф, дата активации, дата окончания
 SEED_SUBSCRIBERS = [
@@ -39,70 +35,25 @@ SEED_SUBSCRIBERS = [
 ]
 
 
-def _parse_fio(fio: str) -> tuple[str, str, str]:
-    parts = fio.strip().split()
-    if not parts:
-        return "", "", ""
-    if len(parts) == 1:
-        return parts[0], "", ""
-    surname, patronymic = parts[0], parts[-1]
-    name = " ".join(parts[1:-1]) if len(parts) > 2 else parts[1]
-    return surname, name, patronymic
-
-
-def _parse_date(s: str) -> datetime:
-    return datetime.strptime(s.strip(), "%d.%m.%Y")
-
-
-async def run_seed(session: AsyncSession) -> dict:
+async def run_seed(session: AsyncSession, dry_run: bool = False) -> dict:
     """
-    Загружает подписчиков в БД. Пропускает записи без telegram_id и уже с активной подпиской.
-    Returns: {"added": int, "skipped": int, "errors": list[str]}
+    Загружает подписчиков из SEED_SUBSCRIBERS в БД. Пропускает записи без telegram_id и уже с активной подпиской.
+    Returns: {"added": int, "skipped": int, "errors": list[str], ...}
     """
-    result = {"added": 0, "skipped": 0, "errors": []}
-    for fio, phone, telegram_id, tariff_name, act_str, end_str in SEED_SUBSCRIBERS:
+    records = []
+    skipped = 0
+    for i, (fio, phone, telegram_id, tariff_name, act_str, end_str) in enumerate(SEED_SUBSCRIBERS, 1):
         if telegram_id is None:
-            result["skipped"] += 1
+            skipped += 1
             continue
-        try:
-            user, _ = await UserService.get_or_create_user(
-                session=session,
-                telegram_id=telegram_id,
-                first_name=fio,
-            )
-            surname, name, patronymic = _parse_fio(fio)
-            user.surname = surname or user.surname
-            user.name = name or user.name
-            user.patronymic = patronymic or user.patronymic
-            user.phone = phone or user.phone
-
-            tariff = await TariffService.get_tariff_by_name(session=session, name=tariff_name)
-            if not tariff:
-                result["errors"].append(f"Тариф «{tariff_name}» не найден: {fio}")
-                continue
-
-            stmt = select(Subscription).where(
-                Subscription.user_id == user.id,
-                Subscription.status == SubscriptionStatus.ACTIVE,
-            )
-            r = await session.execute(stmt)
-            if r.scalars().first():
-                result["skipped"] += 1
-                continue
-
-            start_dt = _parse_date(act_str)
-            end_dt = _parse_date(end_str)
-            sub = Subscription(
-                user_id=user.id,
-                tariff_id=tariff.id,
-                status=SubscriptionStatus.ACTIVE,
-                start_date=start_dt,
-                end_date=end_dt,
-                reminder_sent=False,
-            )
-            session.add(sub)
-            result["added"] += 1
-        except Exception as e:
-            result["errors"].append(f"{fio}: {e}")
-    await session.commit()
-    return result
+        records.append((i, {
+            "telegram_id": telegram_id,
+            "fio": fio,
+            "phone": phone,
+            "tariff": tariff_name,
+            "start_date": act_str,
+            "end_date": end_str,
+        }))
+    result = await BulkImportService.import_records(session, records, dry_run=dry_run)
+    result.skipped += skipped
+    return result.as_dict()
@@ -2,8 +2,21 @@
 Сервис для работы с подписками
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from database.models import Subscription, SubscriptionStatus, User, Tariff
+from sqlalchemy import select, update, and_, or_, exists, func
+from sqlalchemy.orm import aliased
+from database import statements
+from database.models import Subscription, SubscriptionStatus, User, Tariff, Payment
+from services.cache import TTLCache
+from services.pagination import keyset_datetime
+from services.read_models import (
+    ActiveSubscriptionRow,
+    ReminderRow,
+    SubscriberCardRow,
+    SubscriberStateRow,
+    epoch_seconds,
+    fetch_rows,
+)
+from config import current_bot_name
 from datetime import datetime, timedelta
 from typing import Optional, List
 from dateutil.relativedelta import relativedelta
@@ -12,6 +25,10 @@ from dateutil.relativedelta import relativedelta
 class SubscriptionService:
     """Сервис для работы с подписками"""
     
+    # Страницы истории: (бот, telegram_id) -> {(limit, after, before): (rows, has_more)}
+    HISTORY_CACHE_TTL = 60
+    _history_pages = TTLCache(ttl=HISTORY_CACHE_TTL, maxsize=5000)
+    
     @staticmethod
     async def create_subscription(
         session: AsyncSession,
@@ -83,71 +100,159 @@ class SubscriptionService:
         user_id: int,
     ) -> Optional[Subscription]:
         """Получить активную подписку пользователя"""
-        now = datetime.utcnow()
-        stmt = select(Subscription).where(
-            and_(
-                Subscription.user_id == user_id,
-                Subscription.status == SubscriptionStatus.ACTIVE,
-                Subscription.end_date > now,
-            )
-        ).order_by(Subscription.end_date.desc())
-        result = await session.execute(stmt)
         # Берём последнюю (с максимальной датой окончания), даже если их несколько
+        result = await session.execute(
+            statements.ACTIVE_SUBSCRIPTION_BY_USER,
+            {"user_id": user_id, "now": datetime.utcnow()},
+        )
         return result.scalars().first()
     
     @staticmethod
     async def get_user_subscriptions(
         session: AsyncSession,
         user_id: int,
+        limit: Optional[int] = None,
     ) -> List[Subscription]:
-        """Получить все подписки пользователя"""
+        """Получить подписки пользователя (новые первыми); limit — не больше стольких"""
         stmt = select(Subscription).where(
             Subscription.user_id == user_id
-        ).order_by(Subscription.created_at.desc())
+        ).order_by(Subscription.created_at.desc(), Subscription.id.desc())
+        if limit is not None:
+            stmt = stmt.limit(limit)
         result = await session.execute(stmt)
         return list(result.scalars().all())
     
+    @staticmethod
+    async def get_history_page(
+        session: AsyncSession,
+        telegram_id: int,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None,
+        before: Optional[tuple[datetime, int]] = None,
+    ) -> tuple[list, bool]:
+        """
+        Страница истории подписок пользователя одним запросом: подписка, тариф и платёж по ней,
+        по убыванию (created_at, id). Неоплаченные заявки (PENDING) не показываются.
+        Keyset-пагинация: after=(created_at, id) — следующая страница, before=(created_at, id) — предыдущая.
+        Стоимость страницы не зависит от длины истории (индекс idx_subscription_user_created).
+        Страницы кэшируются на HISTORY_CACHE_TTL секунд; после оплаты и истечения подписки кэш
+        сбрасывается forget_history — в том процессе, где сменился статус (бот при отдельном воркере
+        увидит изменение по истечении TTL).
+        Returns: (rows, has_more) — has_more: есть ли ещё строки в направлении листания
+        """
+        user_key = (current_bot_name(), telegram_id)
+        pages = SubscriptionService._history_pages.get(user_key)
+        cache_key = (limit, after, before)
+        if pages is not None and cache_key in pages:
+            return pages[cache_key]
+        
+        stmt = (
+            select(
+                Subscription.id,
+                Subscription.created_at,
+                Subscription.status,
+                Subscription.start_date,
+                Subscription.end_date,
+                Tariff.name.label("tariff_name"),
+                Payment.amount,
+                Payment.status.label("payment_status"),
+            )
+            .join(User, User.id == Subscription.user_id)
+            .outerjoin(Tariff, Tariff.id == Subscription.tariff_id)
+            .outerjoin(Payment, Payment.subscription_id == Subscription.id)
+            .where(
+                User.telegram_id == telegram_id,
+                Subscription.status != SubscriptionStatus.PENDING,
+            )
+        )
+        if before:
+            created_at, sub_id = before
+            created_at = keyset_datetime(session, created_at)
+            stmt = stmt.where(
+                or_(
+                    Subscription.created_at > created_at,
+                    and_(Subscription.created_at == created_at, Subscription.id > sub_id),
+                )
+            ).order_by(Subscription.created_at.asc(), Subscription.id.asc())
+        else:
+            if after:
+                created_at, sub_id = after
+                created_at = keyset_datetime(session, created_at)
+                stmt = stmt.where(
+                    or_(
+                        Subscription.created_at < created_at,
+                        and_(Subscription.created_at == created_at, Subscription.id < sub_id),
+                    )
+                )
+            stmt = stmt.order_by(Subscription.created_at.desc(), Subscription.id.desc())
+        
+        result = await session.execute(stmt.limit(limit + 1))
+        rows = list(result.all())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before:
+            rows.reverse()
+        
+        if pages is None:
+            pages = {}
+            SubscriptionService._history_pages.set(user_key, pages)
+        pages[cache_key] = (rows, has_more)
+        return rows, has_more
+    
+    @staticmethod
+    def forget_history(telegram_id: int):
+        """Сбросить закэшированные страницы истории пользователя (после оплаты или активации)"""
+        SubscriptionService._history_pages.pop((current_bot_name(), telegram_id))
+    
     @staticmethod
     async def expire_subscriptions(session: AsyncSession) -> int:
         """
-        Перевести истёкшие подписки в статус EXPIRED
+        Перевести истёкшие подписки в статус EXPIRED и сбросить кэш истории их владельцев
         Returns: количество обновлённых подписок
         """
         now = datetime.utcnow()
-        stmt = select(Subscription).where(
-            and_(
-                Subscription.status == SubscriptionStatus.ACTIVE,
-                Subscription.end_date <= now,
-            )
+        expired = and_(
+            Subscription.status == SubscriptionStatus.ACTIVE,
+            Subscription.end_date <= now,
+        )
+        # telegram_id владельцев — только для сброса кэша истории
+        owners_stmt = select(User.telegram_id).join(Subscription, Subscription.user_id == User.id).where(expired)
+        owners = set((await session.execute(owners_stmt)).scalars())
+        # Один UPDATE без загрузки подписок в сессию
+        stmt = (
+            update(Subscription)
+            .where(expired)
+            .values(status=SubscriptionStatus.EXPIRED)
+            .execution_options(synchronize_session=False)
         )
         result = await session.execute(stmt)
-        subscriptions = list(result.scalars().all())
-        
-        for sub in subscriptions:
-            sub.status = SubscriptionStatus.EXPIRED
-        
         await session.commit()
-        return len(subscriptions)
+        for telegram_id in owners:
+            SubscriptionService.forget_history(telegram_id)
+        return result.rowcount
     
     @staticmethod
-    async def get_subscriptions_for_reminder(session: AsyncSession) -> List[Subscription]:
+    async def get_subscriptions_for_reminder(session: AsyncSession) -> List[ReminderRow]:
         """
         Получить подписки, которым нужно отправить напоминание
-        (за 3 дня до окончания, напоминание ещё не отправлено)
+        (за 3 дня до окончания, напоминание ещё не отправлено) — вместе с telegram_id пользователя
         """
         now = datetime.utcnow()
         reminder_date = now + timedelta(days=3)
         
-        stmt = select(Subscription).where(
-            and_(
-                Subscription.status == SubscriptionStatus.ACTIVE,
-                Subscription.reminder_sent == False,
-                Subscription.end_date <= reminder_date,
-                Subscription.end_date > now,
+        stmt = (
+            select(Subscription.id, User.telegram_id, Subscription.end_date)
+            .join(User, User.id == Subscription.user_id)
+            .where(
+                and_(
+                    Subscription.status == SubscriptionStatus.ACTIVE,
+                    Subscription.reminder_sent == False,
+                    Subscription.end_date <= reminder_date,
+                    Subscription.end_date > now,
+                )
             )
         )
-        result = await session.execute(stmt)
-        return list(result.scalars().all())
+        return await fetch_rows(session, stmt, ReminderRow)
     
     @staticmethod
     async def mark_reminder_sent(
@@ -155,21 +260,145 @@ class SubscriptionService:
         subscription_id: int,
     ):
         """Отметить, что напоминание отправлено"""
-        stmt = select(Subscription).where(Subscription.id == subscription_id)
-        result = await session.execute(stmt)
-        subscription = result.scalar_one()
-        subscription.reminder_sent = True
+        stmt = (
+            update(Subscription)
+            .where(Subscription.id == subscription_id)
+            .values(reminder_sent=True)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
         await session.commit()
 
     @staticmethod
-    async def get_all_active_subscriptions(session: AsyncSession) -> List[Subscription]:
+    async def get_all_active_subscriptions(session: AsyncSession) -> List[ActiveSubscriptionRow]:
         """Получить все активные подписки (end_date > now) для отчёта"""
         now = datetime.utcnow()
-        stmt = select(Subscription).where(
+        stmt = select(
+            Subscription.id,
+            Subscription.user_id,
+            Subscription.tariff_id,
+            Subscription.start_date,
+            Subscription.end_date,
+        ).where(
             and_(
                 Subscription.status == SubscriptionStatus.ACTIVE,
                 Subscription.end_date > now,
             )
         ).order_by(Subscription.end_date.asc())
+        return await fetch_rows(session, stmt, ActiveSubscriptionRow)
+
+    @staticmethod
+    def _has_newer_active_subscription():
+        """
+        Условие «у пользователя есть более поздняя активная подписка» — через ~условие
+        выбирается одна (последняя по (end_date, id)) активная подписка на пользователя
+        """
+        newer = aliased(Subscription)
+        return exists().where(
+            and_(
+                newer.user_id == Subscription.user_id,
+                newer.status == SubscriptionStatus.ACTIVE,
+                or_(
+                    newer.end_date > Subscription.end_date,
+                    and_(newer.end_date == Subscription.end_date, newer.id > Subscription.id),
+                ),
+            )
+        )
+
+    @staticmethod
+    async def get_active_subscribers_state(session: AsyncSession) -> List[SubscriberStateRow]:
+        """
+        Компактное состояние активных подписчиков для снимков отчёта:
+        строки (user_id, end_ts, tariff_id) — по последней активной подписке пользователя
+        """
+        now = datetime.utcnow()
+        stmt = select(
+            Subscription.user_id,
+            epoch_seconds(session, Subscription.end_date),
+            Subscription.tariff_id,
+        ).where(
+            and_(
+                Subscription.status == SubscriptionStatus.ACTIVE,
+                Subscription.end_date > now,
+                ~SubscriptionService._has_newer_active_subscription(),
+            )
+        )
+        return await fetch_rows(session, stmt, SubscriberStateRow)
+
+    @staticmethod
+    async def count_active_subscribers(session: AsyncSession) -> int:
+        """Количество пользователей с активной подпиской"""
+        now = datetime.utcnow()
+        stmt = select(func.count(func.distinct(Subscription.user_id))).where(
+            and_(
+                Subscription.status == SubscriptionStatus.ACTIVE,
+                Subscription.end_date > now,
+            )
+        )
         result = await session.execute(stmt)
-        return list(result.scalars().all())
+        return result.scalar_one() or 0
+
+    @staticmethod
+    async def get_active_subscribers_page(
+        session: AsyncSession,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None,
+        before: Optional[tuple[datetime, int]] = None,
+    ) -> tuple[List[SubscriberCardRow], bool]:
+        """
+        Страница активных подписчиков: по одной (самой поздней) подписке на пользователя,
+        вместе с данными пользователя и названием тарифа, по убыванию (end_date, id).
+        Keyset-пагинация: after=(end_date, id) — следующая страница, before=(end_date, id) — предыдущая.
+        Returns: (rows, has_more) — has_more: есть ли ещё строки в направлении листания
+        """
+        now = datetime.utcnow()
+        has_newer = SubscriptionService._has_newer_active_subscription()
+        stmt = (
+            select(
+                Subscription.id,
+                Subscription.start_date,
+                Subscription.end_date,
+                User.telegram_id,
+                User.surname,
+                User.name,
+                User.patronymic,
+                User.first_name,
+                User.last_name,
+                User.phone,
+                Tariff.name.label("tariff_name"),
+            )
+            .join(User, User.id == Subscription.user_id)
+            .outerjoin(Tariff, Tariff.id == Subscription.tariff_id)
+            .where(
+                and_(
+                    Subscription.status == SubscriptionStatus.ACTIVE,
+                    Subscription.end_date > now,
+                    ~has_newer,
+                )
+            )
+        )
+        if before:
+            end_date, sub_id = before
+            stmt = stmt.where(
+                or_(
+                    Subscription.end_date > end_date,
+                    and_(Subscription.end_date == end_date, Subscription.id > sub_id),
+                )
+            ).order_by(Subscription.end_date.asc(), Subscription.id.asc())
+        else:
+            if after:
+                end_date, sub_id = after
+                stmt = stmt.where(
+                    or_(
+                        Subscription.end_date < end_date,
+                        and_(Subscription.end_date == end_date, Subscription.id < sub_id),
+                    )
+                )
+            stmt = stmt.order_by(Subscription.end_date.desc(), Subscription.id.desc())
+
+        rows = await fetch_rows(session, stmt.limit(limit + 1), SubscriberCardRow)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before:
+            rows.reverse()
+        return rows, has_more
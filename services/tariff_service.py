@@ -3,19 +3,34 @@
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from database import statements
 from database.models import Tariff
+from services.cache import TTLCache
+from config import current_bot_name
 from typing import List, Optional
 
+# Активные тарифы меняются редко: кэшируем список для клавиатур выбора тарифа (ключ — бот)
+_active_tariffs = TTLCache(ttl=300, maxsize=64)
+
 
 class TariffService:
     """Сервис для работы с тарифами"""
     
     @staticmethod
     async def get_all_active_tariffs(session: AsyncSession) -> List[Tariff]:
-        """Получить все активные тарифы"""
-        stmt = select(Tariff).where(Tariff.is_active == True).order_by(Tariff.duration_months)
-        result = await session.execute(stmt)
-        return list(result.scalars().all())
+        """Получить все активные тарифы (кэш на 5 минут)"""
+        tariffs = _active_tariffs.get(current_bot_name())
+        if tariffs is None:
+            stmt = select(Tariff).where(Tariff.is_active == True).order_by(Tariff.duration_months)
+            result = await session.execute(stmt)
+            tariffs = list(result.scalars().all())
+            _active_tariffs.set(current_bot_name(), tariffs)
+        return list(tariffs)
+    
+    @staticmethod
+    def invalidate_cache():
+        """Сбросить кэш тарифов текущего бота (после изменения тарифов)"""
+        _active_tariffs.pop(current_bot_name())
     
     @staticmethod
     async def get_tariff_by_code(session: AsyncSession, code: str) -> Optional[Tariff]:
@@ -27,8 +42,7 @@ class TariffService:
     @staticmethod
     async def get_tariff_by_id(session: AsyncSession, tariff_id: int) -> Optional[Tariff]:
         """Получить тариф по ID"""
-        stmt = select(Tariff).where(Tariff.id == tariff_id)
-        result = await session.execute(stmt)
+        result = await session.execute(statements.TARIFF_BY_ID, {"tariff_id": tariff_id})
         return result.scalar_one_or_none()
 
     @staticmethod
@@ -47,13 +61,18 @@ class TariffService:
             {"code": "yearly", "name": "Годовой", "duration_months": 12, "price": 1999.00},
         ]
         
-        for tariff_data in default_tariffs:
-            stmt = select(Tariff).where(Tariff.code == tariff_data["code"])
-            result = await session.execute(stmt)
-            existing = result.scalar_one_or_none()
-            
-            if not existing:
-                tariff = Tariff(**tariff_data)
-                session.add(tariff)
+        # Одним запросом: какие коды уже есть
+        result = await session.execute(select(Tariff.code))
+        existing = set(result.scalars())
         
-        await session.commit()
+        missing = [Tariff(**tariff_data) for tariff_data in default_tariffs if tariff_data["code"] not in existing]
+        if missing:
+            session.add_all(missing)
+            await session.commit()
+            TariffService.invalidate_cache()
+    
+    @staticmethod
+    async def warm_up(session: AsyncSession):
+        """Создать недостающие тарифы и заполнить кэш (при старте)"""
+        await TariffService.init_default_tariffs(session)
+        await TariffService.get_all_active_tariffs(session)
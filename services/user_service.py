@@ -3,20 +3,42 @@
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from database.models import User
+from database import statements
+from database.base import upsert
+from database.models import User, Referral
+from services.referral_codes import encode_referral_code, is_valid_referral_code, normalize_referral_code
 from typing import Optional
-import secrets
-import string
 
 
 class UserService:
     """Сервис для работы с пользователями"""
     
     @staticmethod
-    def _generate_referral_code() -> str:
-        """Генерация уникального реферального кода"""
-        alphabet = string.ascii_uppercase + string.digits
-        return ''.join(secrets.choice(alphabet) for _ in range(8))
+    async def _find_referrer_id(
+        session: AsyncSession,
+        referrer_code: Optional[str],
+        telegram_id: int,
+    ) -> Optional[int]:
+        """ID реферера по коду (None для некорректного кода, неизвестного кода и самоприглашения)"""
+        if not is_valid_referral_code(referrer_code):
+            return None
+        stmt = select(User.id, User.telegram_id).where(
+            User.referral_code == normalize_referral_code(referrer_code)
+        )
+        referrer = (await session.execute(stmt)).first()
+        if referrer is None or referrer.telegram_id == telegram_id:  # Защита от самоприглашения
+            return None
+        return referrer.id
+    
+    @staticmethod
+    async def _add_referral(session: AsyncSession, referrer_id: int, referred_id: int):
+        """Запись о реферале; повтор для того же приглашённого ничего не меняет"""
+        stmt = upsert(Referral).values(
+            referrer_id=referrer_id,
+            referred_id=referred_id,
+            has_paid_subscription=False,
+        ).on_conflict_do_nothing(index_elements=[Referral.referred_id])
+        await session.execute(stmt)
     
     @staticmethod
     async def get_or_create_user(
@@ -28,56 +50,60 @@ class UserService:
         referrer_code: Optional[str] = None,
     ) -> tuple[User, bool]:
         """
-        Получить или создать пользователя
+        Получить или создать пользователя; по коду реферера создаётся и запись о реферале.
+        Всё в одной транзакции; если у существующего пользователя ничего не изменилось — без записи в БД.
         Returns: (user, is_new)
         """
         # Проверяем существование пользователя
-        stmt = select(User).where(User.telegram_id == telegram_id)
-        result = await session.execute(stmt)
+        result = await session.execute(statements.USER_BY_TELEGRAM_ID, {"telegram_id": telegram_id})
         user = result.scalar_one_or_none()
         
         if user:
             # Обновляем данные, если изменились
+            changed = False
             if username and user.username != username:
                 user.username = username
+                changed = True
             if first_name and user.first_name != first_name:
                 user.first_name = first_name
+                changed = True
             if last_name and user.last_name != last_name:
                 user.last_name = last_name
-            await session.commit()
+                changed = True
+            # Ещё не привязан к рефереру — привязываем
+            if referrer_code and not user.referrer_id:
+                referrer_id = await UserService._find_referrer_id(session, referrer_code, telegram_id)
+                if referrer_id and referrer_id != user.id:
+                    user.referrer_id = referrer_id
+                    await UserService._add_referral(session, referrer_id, user.id)
+                    changed = True
+            if changed:
+                await session.commit()
             return user, False
         
-        # Создаём нового пользователя
-        referral_code = UserService._generate_referral_code()
-        
-        # Проверяем уникальность кода
-        while True:
-            stmt = select(User).where(User.referral_code == referral_code)
-            result = await session.execute(stmt)
-            if result.scalar_one_or_none() is None:
-                break
-            referral_code = UserService._generate_referral_code()
+        referrer_id = await UserService._find_referrer_id(session, referrer_code, telegram_id)
         
-        # Ищем реферера, если указан код
-        referrer_id = None
-        if referrer_code:
-            stmt = select(User).where(User.referral_code == referrer_code)
-            result = await session.execute(stmt)
-            referrer = result.scalar_one_or_none()
-            if referrer and referrer.telegram_id != telegram_id:  # Защита от самоприглашения
-                referrer_id = referrer.id
-        
-        user = User(
+        # Код выводится из telegram_id и уникален без проверки в БД.
+        # ON CONFLICT: два одновременных /start одного пользователя не дают IntegrityError
+        stmt = upsert(User).values(
             telegram_id=telegram_id,
             username=username,
             first_name=first_name,
             last_name=last_name,
-            referral_code=referral_code,
+            referral_code=encode_referral_code(telegram_id),
             referrer_id=referrer_id,
-        )
-        session.add(user)
+        ).on_conflict_do_nothing(index_elements=[User.telegram_id]).returning(User)
+        user = (await session.scalars(stmt)).one_or_none()
+        
+        if user is None:
+            # Пользователя только что создал параллельный запрос
+            await session.rollback()
+            user = await UserService.get_user_by_telegram_id(session, telegram_id)
+            return user, False
+        
+        if referrer_id:
+            await UserService._add_referral(session, referrer_id, user.id)
         await session.commit()
-        await session.refresh(user)
         
         return user, True
     
@@ -87,8 +113,7 @@ class UserService:
         telegram_id: int,
     ) -> Optional[User]:
         """Получить пользователя по telegram_id"""
-        stmt = select(User).where(User.telegram_id == telegram_id)
-        result = await session.execute(stmt)
+        result = await session.execute(statements.USER_BY_TELEGRAM_ID, {"telegram_id": telegram_id})
         return result.scalar_one_or_none()
     
     @staticmethod
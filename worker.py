@@ -0,0 +1,108 @@
+"""
+Точка входа фонового воркера: планировщик задач и исходящие рассылки.
+Обработчики обновлений в этом процессе не запускаются — их обслуживает main.py
+(с RUN_SCHEDULER=false). Оба процесса работают с одной БД.
+"""
+import time
+
+STARTED_AT = time.perf_counter()
+
+import asyncio
+import logging
+import signal
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.enums import ParseMode
+from config import settings, load_bot_profiles, use_bot
+from database.base import dispose_engines, get_engine, init_db
+from scheduler.tasks import setup_scheduler
+from services import rendering
+from monitoring.health import HealthState, start_health_server
+from monitoring.watchdog import LoopWatchdog
+from monitoring.logs import setup_logging
+from monitoring.startup import StartupTimer
+from monitoring import sql as sql_monitoring
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Основная функция воркера"""
+    timer = StartupTimer(STARTED_AT)
+    timer.mark("imports")
+    profiles = load_bot_profiles()
+    for profile in profiles:
+        with use_bot(profile):
+            sql_monitoring.install(
+                get_engine(),
+                slow_query_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+                n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD,
+            )
+            with timer.phase("schema" if len(profiles) == 1 else f"schema[{profile.BOT_NAME}]"):
+                changed = await init_db()
+            logger.info("Database schema of %s %s", profile.BOT_NAME, "updated" if changed else "is up to date")
+
+    # Боты нужны только для исходящих сообщений — polling здесь не запускается
+    api_session = AiohttpSession()
+    bots = [
+        Bot(
+            token=profile.BOT_TOKEN,
+            session=api_session,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
+        for profile in profiles
+    ]
+
+    health = HealthState(
+        role="worker",
+        watchdog=LoopWatchdog(
+            stack_threshold=settings.LOOP_LAG_STACK_THRESHOLD_MS / 1000,
+            ready_threshold=settings.LOOP_LAG_READY_THRESHOLD_MS / 1000,
+        ),
+    )
+    with timer.phase("scheduler"):
+        scheduler = setup_scheduler(list(zip(profiles, bots)))
+        health.attach_to_scheduler(scheduler)
+        scheduler.start()
+    logger.info("Scheduler started")
+
+    health_runner = await start_health_server(health, settings.WORKER_HEALTH_PORT)
+    timer.log("Worker startup")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Stopping worker...")
+        scheduler.shutdown()
+        if health_runner:
+            await health_runner.cleanup()
+        await api_session.close()
+        await dispose_engines()
+        rendering.shutdown_pool()
+
+
+if __name__ == "__main__":
+    # Логи пишет отдельный поток из очереди: вывод в stdout не блокирует event loop
+    log_listener = setup_logging(
+        level=settings.LOG_LEVEL,
+        fmt=settings.LOG_FORMAT,
+        rate_limits=settings.LOG_RATE_LIMITS,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Worker stopped by user")
+    except Exception as e:
+        logger.error("Fatal error: %s", e, exc_info=True)
+    finally:
+        log_listener.stop()